@@ -0,0 +1,148 @@
+"""
+요청 수용 제어 - 임베딩/검색(CPU)과 LLM 호출을 각각 동시 실행 수가 정해진 풀로 제한
+
+- 풀이 가득 차면 세션별 대기열에 넣고, 자리가 나면 세션을 돌아가며 하나씩 들여보냄
+  (한 세션이 연달아 보낸 요청이 다른 세션을 밀어내지 않음)
+- 대기열이 상한을 넘거나 너무 오래 기다리면 AdmissionRejected로 거절 → 호출부가 "혼잡" 안내
+- 대기열 길이, 실행 중 수, 대기 시간(p50/p95), 거절 수를 metrics()로 내보냄
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from llm_resilience import percentile
+from config import (
+    ADMISSION_ENABLED, EMBED_POOL_CONCURRENCY, EMBED_POOL_MAX_QUEUE,
+    LLM_POOL_CONCURRENCY, LLM_POOL_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SEC,
+)
+
+
+class AdmissionRejected(RuntimeError):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청을 받지 않음"""
+
+
+# 검색 단계 안쪽(rag_system)에서 자리를 잡을 때 쓰는 세션 키 - 요청 입구에서 admission_session으로 지정
+_admission_session = contextvars.ContextVar("admission_session", default=None)
+
+
+@contextmanager
+def admission_session(session_id):
+    """이 블록 안에서 session_id 없이 slot()을 부르면 이 세션의 대기열로 들어감"""
+    token = _admission_session.set(session_id)
+    try:
+        yield
+    finally:
+        _admission_session.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class FairAdmissionPool:
+    """동시 실행 수 상한 + 세션별 라운드 로빈 대기열"""
+
+    def __init__(self, name, max_concurrency, max_queue, queue_timeout=ADMISSION_QUEUE_TIMEOUT_SEC, window=1000):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._queued = 0
+        # session_id → 대기자 deque (맨 앞 세션이 다음 차례)
+        self._queues = OrderedDict()
+        self._waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    def acquire(self, session_id=None):
+        """자리를 얻을 때까지 대기 (대기한 시간 반환) - 거절 시 AdmissionRejected"""
+        start_time = time.perf_counter()
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._queued:
+                self._in_flight += 1
+                self.counters["admitted"] += 1
+                self._waits.append(0.0)
+                return 0.0
+            if self._queued >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise AdmissionRejected(f"{self.name} 대기열 가득 참 ({self._queued}건)")
+            waiter = _Waiter()
+            self._queues.setdefault(session_id, deque()).append(waiter)
+            self._queued += 1
+            self.counters["queued"] += 1
+
+        if not waiter.event.wait(self.queue_timeout):
+            with self._lock:
+                # 타임아웃과 동시에 자리를 넘겨받았으면 그대로 진행
+                if not waiter.granted:
+                    queue = self._queues.get(session_id)
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[session_id]
+                    self._queued -= 1
+                    self.counters["timed_out"] += 1
+                    raise AdmissionRejected(f"{self.name} 대기 시간 초과 ({self.queue_timeout:g}초)")
+
+        waited = time.perf_counter() - start_time
+        with self._lock:
+            self.counters["admitted"] += 1
+            self._waits.append(waited)
+        return waited
+
+    def release(self):
+        """자리 반납 - 대기자가 있으면 다음 세션 차례의 맨 앞 요청에 그대로 넘김"""
+        with self._lock:
+            if self._queues:
+                session_id, queue = next(iter(self._queues.items()))
+                waiter = queue.popleft()
+                if queue:
+                    self._queues.move_to_end(session_id)
+                else:
+                    del self._queues[session_id]
+                self._queued -= 1
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self._in_flight -= 1
+
+    @contextmanager
+    def slot(self, session_id=None):
+        """with pool.slot(session_id): ... - 자리를 얻어 실행하고 끝나면 반납 (session_id가 없으면 admission_session 값)"""
+        if not ADMISSION_ENABLED:
+            yield 0.0
+            return
+        waited = self.acquire(session_id if session_id is not None else _admission_session.get())
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def metrics(self):
+        """실행 중/대기 중 수, 대기 세션 수, 대기 시간 p50/p95, 누계"""
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "in_flight": self._in_flight,
+                "queue_depth": self._queued,
+                "queued_sessions": len(self._queues),
+                "max_concurrency": self.max_concurrency,
+                "p50_wait": percentile(waits, 50),
+                "p95_wait": percentile(waits, 95),
+                **self.counters,
+            }
+
+
+# 프로세스 공용 풀 (Streamlit 스크립트 스레드들이 함께 사용)
+embed_pool = FairAdmissionPool("embed", EMBED_POOL_CONCURRENCY, EMBED_POOL_MAX_QUEUE)
+llm_pool = FairAdmissionPool("llm", LLM_POOL_CONCURRENCY, LLM_POOL_MAX_QUEUE)
+
+
+def admission_metrics():
+    return {pool.name: pool.metrics() for pool in (embed_pool, llm_pool)}
@@ -0,0 +1,158 @@
+"""
+예시 질문 답변 사전 계산 저장소
+
+사이드바 예시 질문처럼 자주 쓰이는 고정 질문의 답변을 빌드/시작 시점에 미리 만들어 두고
+(인덱스 버전, 모델, 프롬프트 버전) 조합이 같을 때만 즉시 제공합니다.
+조합이 바뀌면 백그라운드에서 다시 생성합니다.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import (
+    DATABASE_URLS, LEGAL_SHARD_ROOT, EMBEDDING_MODEL_NAME, OPENAI_MODEL, OPENAI_BASE_URL,
+    FAST_MODEL, MODEL_ROUTING_ENABLED,
+    ANSWER_PROMPT_VERSION, ANSWER_CACHE_PATH, EXAMPLE_QUESTIONS,
+    WARM_ANSWER_MAX_ATTEMPTS, WARM_ANSWER_RETRY_BASE_SEC,
+)
+
+
+def _dir_fingerprint(path):
+    """디렉토리 내 sqlite/인덱스 파일의 크기와 수정 시각"""
+    entries = []
+    if not os.path.isdir(path):
+        return entries
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if name.endswith((".sqlite3", ".bin", ".json")):
+                stat = os.stat(os.path.join(root, name))
+                entries.append(f"{os.path.relpath(os.path.join(root, name), path)}:{stat.st_size}:{int(stat.st_mtime)}")
+    return sorted(entries)
+
+
+def get_index_version():
+    """벡터 DB 파일 + 임베딩/답변 모델 + 프롬프트 버전으로 만든 버전 문자열"""
+    parts = [EMBEDDING_MODEL_NAME, OPENAI_MODEL, ANSWER_PROMPT_VERSION]
+    if MODEL_ROUTING_ENABLED:
+        parts.append(FAST_MODEL)
+    if OPENAI_BASE_URL:
+        parts.append(OPENAI_BASE_URL)
+    for path in list(DATABASE_URLS) + [LEGAL_SHARD_ROOT]:
+        parts.extend(_dir_fingerprint(path))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class WarmAnswerStore:
+    """고정 질문 답변 저장소 (JSON 파일)"""
+
+    def __init__(self, path=ANSWER_CACHE_PATH, questions=EXAMPLE_QUESTIONS):
+        self.path = path
+        self.questions = list(questions)
+        self.version = get_index_version()
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._answers = {}
+        self._failures = {}  # 질문 → {"attempts", "retry_at"} (현재 저장 버전에서 생성 실패한 질문)
+        self._stored_version = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._stored_version = data.get("version")
+            self._answers = data.get("answers", {})
+            self._failures = data.get("failures", {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 예시 답변 캐시 읽기 실패: {e}")
+
+    def _save(self, version, answers, failures):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "answers": answers, "failures": failures}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _retryable(failure, now):
+        """같은 버전에서 빠진 답변 - 실패 횟수가 남았고 재시도 시각이 지났을 때만 다시 생성"""
+        return failure is None or (failure["attempts"] < WARM_ANSWER_MAX_ATTEMPTS and now >= failure["retry_at"])
+
+    def is_stale(self):
+        with self._lock:
+            if self._stored_version != self.version:
+                return True
+            now = time.time()
+            return any(q not in self._answers and self._retryable(self._failures.get(q), now) for q in self.questions)
+
+    def get(self, question):
+        """현재 버전에서 만든 답변만 반환 (없으면 None)"""
+        with self._lock:
+            if self._stored_version != self.version:
+                return None
+            entry = self._answers.get(question)
+            return entry["answer"] if entry else None
+
+    def precompute(self, answer_fn, force=False):
+        """answer_fn(question) -> 답변 으로 고정 질문 답변 생성 후 저장
+
+        버전이 같으면(force 아님) 빠진 질문 중 재시도할 때가 된 것만 생성하고,
+        실패한 질문은 WARM_ANSWER_MAX_ATTEMPTS번까지 간격을 두 배씩 늘려 다시 시도
+        """
+        version = self.version
+        with self._lock:
+            same_version = self._stored_version == version and not force
+            answers = dict(self._answers) if same_version else {}
+            failures = dict(self._failures) if same_version else {}
+        now = time.time()
+        for question in self.questions:
+            if question in answers or not self._retryable(failures.get(question), now):
+                continue
+            start_time = time.perf_counter()
+            try:
+                answers[question] = {
+                    "answer": answer_fn(question),
+                    "created_at": time.time(),
+                    "elapsed_sec": round(time.perf_counter() - start_time, 2),
+                }
+                failures.pop(question, None)
+                print(f"✅ 예시 답변 생성: {question} ({answers[question]['elapsed_sec']}초)")
+            except Exception as e:
+                attempts = failures.get(question, {}).get("attempts", 0) + 1
+                failures[question] = {
+                    "attempts": attempts,
+                    "retry_at": time.time() + WARM_ANSWER_RETRY_BASE_SEC * 2 ** (attempts - 1),
+                }
+                print(f"⚠️ 예시 답변 생성 실패 ({attempts}/{WARM_ANSWER_MAX_ATTEMPTS}회): {question} - {e}")
+
+        with self._lock:
+            self._answers = answers
+            self._failures = failures
+            self._stored_version = version
+            self._save(version, answers, failures)
+        return answers
+
+    def refresh_in_background(self, answer_fn):
+        """버전이 바뀌었으면 백그라운드 스레드에서 재생성 (이미 진행 중이면 무시)"""
+        if not self.is_stale():
+            return False
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(
+                target=self.precompute, args=(answer_fn,), daemon=True, name="warm-answers"
+            )
+            self._refresh_thread.start()
+        print("🔄 예시 답변 백그라운드 재생성 시작")
+        return True
+
+
+def make_answer_fn(rag_system):
+    """대화 기록 없이 고정 질문에 답하는 함수 (사전 계산용) - 저하 모드 응답은 저장하지 않도록 예외로 받음"""
+    from chat_chain import create_user_friendly_chat_chain
+
+    chain = create_user_friendly_chat_chain(rag_system, raise_on_degraded=True)
+    return lambda question: chain.invoke({"question": question, "chat_history": []})
@@ -1,37 +1,84 @@
 """
 채팅 체인 및 메모리 관리
 """
+import inspect
+import time
+
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_openai import ChatOpenAI
 from rag_system import optimized_retrieve_and_format
-from config import OPENAI_MODEL, OPENAI_TEMPERATURE, MAX_TOKENS
+from llm_usage import chat_usage_tracker
+from llm_resilience import get_llm_caller
+from admission_control import AdmissionRejected, admission_session, llm_pool
+from model_router import TIERS, extract_route_features, route_request, routing_log
+from memory_compaction import RollingSummaryCompactor, trim_history
+from session_backend import create_session_store
+from tracing import tracer
+from config import (
+    OPENAI_TEMPERATURE, OPENAI_BASE_URL, PROMPT_CACHE_MODE,
+    LLM_CLIENT_TIMEOUT_SEC, CHAT_FIRST_TOKEN_TIMEOUT_SEC,
+    MEMORY_COMPACTION_ENABLED, MEMORY_MAX_MESSAGES,
+)
+
+
+DEGRADED_ANSWER_NOTICE = (
+    "⚠️ 지금은 AI 답변 생성이 원활하지 않아 검색된 참고자료를 먼저 보여드립니다. "
+    "잠시 후 다시 질문해 주세요.\n\n"
+)
+# 저하 모드 응답(안내 + 참고자료 전문)은 대화 기록에 이 짧은 문구로 대신 저장
+DEGRADED_HISTORY_PLACEHOLDER = "(AI 답변 생성 실패 - 참고자료만 표시됨)"
 
 
-# 메모리 관리
-store = {}
+# 메모리 관리 (SESSION_BACKEND: 공유 SQLite/Redis 또는 프로세스 메모리 TTL + LRU)
+store = create_session_store()
+_compactor = None
 
 
 def get_session_history(session_id):
     """세션 기록 관리"""
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    history = store[session_id]
-    if len(history.messages) > 20:
-        history.messages = history.messages[-20:]
+    history = store.get(session_id)
+    trim_history(history, MEMORY_MAX_MESSAGES)
     return history
 
 
-def create_user_friendly_chat_chain(rag_system):
-    """사용자 친화적 채팅 체인 생성"""
-    llm = ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=OPENAI_TEMPERATURE,
-        max_tokens=MAX_TOKENS,
-    )
+def session_store_gauges():
+    """세션 저장소 지표 (세션 수, 추정 바이트, 축출 누계) - /health와 상태 패널용"""
+    return store.gauges()
+
+
+def finish_turn(session_id):
+    """응답이 끝난 뒤 호출 - 저장소 크기 반영 후 오래된 턴을 백그라운드에서 요약으로 접음"""
+    global _compactor
+    store.refresh(session_id)
+    history = store.peek(session_id)
+    if not MEMORY_COMPACTION_ENABLED or history is None:
+        return
+    if _compactor is None:
+        _compactor = RollingSummaryCompactor()
+    _compactor.schedule(session_id, history)
+
+
+def create_answer_chain(raise_on_degraded=False):
+    """답변 생성 체인 - 입력: context(참고자료), question, chat_history, route(라우팅 결정, 없으면 기본 모델)
+
+    raise_on_degraded: 첫 토큰 전에 실패하면 저하 모드 응답 대신 예외 (미리 계산처럼 결과를 저장하는 호출부용)
+    """
+    llms = {
+        tier: ChatOpenAI(
+            model=model,
+            temperature=OPENAI_TEMPERATURE,
+            max_tokens=max_tokens,
+            base_url=OPENAI_BASE_URL,
+            timeout=LLM_CLIENT_TIMEOUT_SEC,
+            max_retries=0,  # 재시도는 복원력 계층에서 지터를 넣어 처리
+            stream_usage=True,
+            callbacks=[chat_usage_tracker],
+        )
+        for tier, (model, max_tokens) in TIERS.items()
+    }
 
     system_message = """
     당신은 부동산 임대차, 전세사기, 법령해석, 생활법령 Q&A, 뉴스 기사 등 다양한 법률 데이터를 바탕으로 청년을 돕는 법률 전문가 AI 챗봇입니다.  
@@ -105,39 +152,146 @@ def create_user_friendly_chat_chain(rag_system):
     """
 
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_message),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{question}"),
-        ("system", "참고자료:\n{context}")
-    ])
+    if PROMPT_CACHE_MODE:
+        # 프롬프트 캐시 적중용 배치: 바이트가 항상 같은 지시문 → 대화 기록(이전 턴과 접두가 같음)
+        # → 참고자료(식별자 순 정렬) → 질문. 변하는 부분은 모두 뒤쪽에 둡니다.
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", inspect.cleandoc(system_message)),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("system", "참고자료:\n{context}"),
+            ("human", "{question}"),
+        ])
+    else:
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_message),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{question}"),
+            ("system", "참고자료:\n{context}")
+        ])
+    
+    # 티어마다 지연 분포가 달라 헤징 기준(p95)과 브레이커를 따로 둠
+    chat_callers = {
+        "full": get_llm_caller("chat", CHAT_FIRST_TOKEN_TIMEOUT_SEC),
+        "fast": get_llm_caller("chat-fast", CHAT_FIRST_TOKEN_TIMEOUT_SEC),
+    }
+    
+    def generate_answer(inputs, config):
+        """복원력 계층을 거쳐 답변 스트리밍 - 첫 토큰 전에 실패하면 참고자료만 보여주는 저하 모드"""
+        route = inputs.get("route")
+        tier = route.tier if route is not None else "full"
+        llm = llms[tier]
+        messages = prompt.invoke(inputs, config)
+        session_id = (config.get("configurable") or {}).get("session_id")
+        # 생성기는 토큰마다 나눠 실행되므로 현재 스팬으로 지정하지 않고 부모(턴 스팬)를 직접 지정
+        turn_span = inputs.get("turn_span")
+        try:
+            # LLM 풀 자리를 얻은 뒤부터 스트리밍이 끝날 때까지 점유 (대기열 초과 시 AdmissionRejected)
+            with llm_pool.slot(session_id):
+                start_time = time.perf_counter()
+                ttft = None
+                degraded = False
+                llm_span = tracer.start_span("llm.generate", {
+                    "llm.tier": tier, "llm.model": route.model if route is not None else None,
+                }, parent=turn_span)
+                ttft_span = tracer.start_span("llm.ttft", parent=llm_span)
+                try:
+                    for chunk in chat_callers[tier].stream(lambda: llm.stream(messages, config)):
+                        if chunk.content:
+                            if ttft is None:
+                                ttft = time.perf_counter() - start_time
+                                ttft_span.end()
+                            yield chunk.content
+                except Exception as e:
+                    if ttft is not None or raise_on_degraded:
+                        llm_span.record_error(e)
+                        raise
+                    print(f"⚠️ 답변 생성 실패 - 저하 모드 응답: {e}")
+                    ttft_span.record_error(e)
+                    degraded = True
+                    yield DEGRADED_ANSWER_NOTICE + inputs["context"]
+                finally:
+                    ttft_span.end()
+                    llm_span.set_attributes({
+                        "llm.ttft_ms": None if ttft is None else round(ttft * 1000, 1),
+                        "llm.degraded": degraded,
+                    })
+                    llm_span.end()
+                    if route is not None:
+                        routing_log.record(route, ttft, time.perf_counter() - start_time, degraded)
+        except Exception as e:
+            if turn_span is not None:
+                turn_span.record_error(e)
+            raise
+        finally:
+            if turn_span is not None:
+                turn_span.end()
+    
+    return RunnableLambda(generate_answer)
+
+
+def create_user_friendly_chat_chain(rag_system, raise_on_degraded=False):
+    """사용자 친화적 채팅 체인 생성 (raise_on_degraded는 create_answer_chain 참고)"""
+    answer_chain = create_answer_chain(raise_on_degraded)
     
-    def user_friendly_retrieve_and_format(query):
+    def user_friendly_retrieve_and_format(query, trace, session_id=None):
         """사용자 친화적 검색 및 포맷팅 - 전처리 포함"""
         try:
-            formatted_result = optimized_retrieve_and_format(query, rag_system)
+            formatted_result = optimized_retrieve_and_format(
+                query, rag_system, order_by_id=PROMPT_CACHE_MODE, trace=trace, session_id=session_id
+            )
             return formatted_result
+        except AdmissionRejected:
+            raise  # 호출부에서 혼잡 안내
         except Exception as e:
             print(f"❌ 검색 오류: {e}")
             return "검색 중 오류가 발생했습니다."
     
-    chain = (
-        {
-            "context": RunnableLambda(lambda x: user_friendly_retrieve_and_format(x["question"])),
-            "question": RunnableLambda(lambda x: x["question"]),
-            "chat_history": RunnableLambda(lambda x: x.get("chat_history", [])),
+    def retrieve_and_route(inputs, config):
+        """참고자료 검색(세션이 있으면 후속 질문 재사용) 후 질문/검색 특징으로 답변 모델 티어 결정"""
+        trace = {}
+        session_id = (config.get("configurable") or {}).get("session_id")
+        # 질문 한 턴의 루트 스팬 - 답변 생성(generate_answer)이 끝날 때 종료
+        turn_span = tracer.start_span("chat.turn", {"session.id": session_id})
+        try:
+            with tracer.activate(turn_span):
+                # 임베딩/검색 단계는 이 세션 대기열로 CPU 풀 자리를 얻어 실행 (대기열 초과 시 AdmissionRejected)
+                with admission_session(session_id):
+                    context = user_friendly_retrieve_and_format(inputs["question"], trace, session_id)
+                route = route_request(extract_route_features(inputs["question"], trace))
+        except Exception as e:
+            turn_span.record_error(e)
+            turn_span.end()
+            raise
+        turn_span.set_attributes({"rag.search_type": trace.get("search_type"), "llm.tier": route.tier})
+        return {
+            "context": context,
+            "question": inputs["question"],
+            "chat_history": inputs.get("chat_history", []),
+            "route": route,
+            "turn_span": turn_span,
         }
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    
+    chain = RunnableLambda(retrieve_and_route) | answer_chain
     return chain
 
 
+class _DegradedAwareMessageHistory(RunnableWithMessageHistory):
+    """저하 모드 응답은 참고자료 전문 대신 짧은 표시만 대화 기록에 남김 (다음 턴 프롬프트/저장소 크기 보호)"""
+
+    def _get_output_messages(self, output_val):
+        messages = super()._get_output_messages(output_val)
+        return [
+            AIMessage(content=DEGRADED_HISTORY_PLACEHOLDER)
+            if isinstance(message.content, str) and message.content.startswith(DEGRADED_ANSWER_NOTICE)
+            else message
+            for message in messages
+        ]
+
+
 def create_chat_chain_with_memory(rag_system):
     """메모리 기능이 있는 채팅 체인"""
     base_chain = create_user_friendly_chat_chain(rag_system)
-    chain_with_history = RunnableWithMessageHistory(
+    chain_with_history = _DegradedAwareMessageHistory(
         base_chain,
         get_session_history,
         input_messages_key="question",
@@ -0,0 +1,139 @@
+"""
+토큰 예산 기반 참고자료 패커
+
+문서를 관련도 순서대로 넣으면서 로컬 토크나이저로 토큰 수를 세고,
+예산을 넘는 문서는 문장 경계에서 잘라 넣습니다.
+"""
+import hashlib
+import re
+
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_DOC_MAX_TOKENS, CONTEXT_MIN_DOC_TOKENS
+from document_formatter import (
+    classify_doc, build_doc_label, build_context_header, new_label_counters,
+)
+from diversifier import get_dedup_key
+from token_utils import count_tokens
+
+
+CLASS_ORDER = ["precedent", "interpretation", "qa", "other", "news"]
+
+
+# 문장 끝 (마침표/물음표/느낌표 뒤 공백, 또는 줄바꿈)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。])\s+|\n+")
+
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+def _cut_by_ratio(text, max_tokens):
+    """글자 수 비율로 잘라 max_tokens 이내가 될 때까지 다시 세며 반복 (토큰당 글자 수가 고르지 않으므로)"""
+    while len(text) > 1:
+        tokens = count_tokens(text)
+        if tokens <= max_tokens:
+            break
+        text = text[:max(min(int(len(text) * max_tokens / tokens), len(text) - 1), 1)]
+    return text
+
+
+def trim_to_tokens(text, max_tokens):
+    """문장 단위로 max_tokens 이내까지 자름 - (잘린 텍스트, 잘렸는지 여부)"""
+    if count_tokens(text) <= max_tokens:
+        return text, False
+
+    kept = []
+    used = 0
+    for sentence in split_sentences(text):
+        sentence_tokens = count_tokens(sentence) + 1
+        if used + sentence_tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += sentence_tokens
+
+    if not kept:
+        # 첫 문장부터 예산을 넘으면 글자 수 비율로 자름
+        sentences = split_sentences(text)
+        return _cut_by_ratio(sentences[0] if sentences else text, max_tokens), True
+
+    trimmed = " ".join(kept)
+    # 문장별 합은 근사치라 이어 붙인 결과를 다시 세어 넘으면 더 자름
+    if count_tokens(trimmed) > max_tokens:
+        trimmed = _cut_by_ratio(trimmed, max_tokens)
+    return trimmed, True
+
+
+def get_stable_doc_key(doc):
+    """실행마다 바뀌지 않는 문서 정렬 키 (Chroma id → 원문 식별자 → 본문 해시)"""
+    if getattr(doc, "id", None):
+        return str(doc.id)
+    dedup_key = get_dedup_key(doc)
+    if dedup_key:
+        return dedup_key
+    return hashlib.sha1(str(doc.page_content or "").encode("utf-8")).hexdigest()
+
+
+def pack_context(docs, token_budget=CONTEXT_TOKEN_BUDGET, doc_max_tokens=CONTEXT_DOC_MAX_TOKENS,
+                 order_by_id=False):
+    """관련도 순서대로 토큰 예산을 채운 참고자료 문자열과 토큰 통계 반환
+
+    order_by_id=True 이면 선택은 관련도 순으로 하되 출력은 문서 식별자 순으로 정렬합니다.
+    """
+    stats = {
+        "budget": token_budget,
+        "docs_in": len(docs),
+        "docs_packed": 0,
+        "docs_trimmed": 0,
+        "docs_dropped": 0,
+        "header_tokens": 0,
+        "context_tokens": 0,
+    }
+    if not docs:
+        text = "관련 자료를 찾을 수 없습니다."
+        stats["context_tokens"] = count_tokens(text)
+        return text, stats
+
+    # 모든 유형이 들어갈 때의 머리말 크기만큼 미리 확보
+    all_classes = {classify_doc(doc.metadata or {}) for doc in docs}
+    reserved = count_tokens(build_context_header(
+        {doc_class: len(docs) for doc_class in all_classes | {"precedent"}}, compact=True
+    ))
+    remaining = token_budget - reserved
+
+    # 1단계: 관련도 순으로 예산 안에 들어갈 문서와 본문 선택
+    selected = []
+    for doc in docs:
+        meta = doc.metadata or {}
+        doc_class = classify_doc(meta)
+        label = build_doc_label(meta, doc_class, new_label_counters())
+        label_tokens = count_tokens(label) + 2
+
+        content_budget = min(doc_max_tokens, remaining - label_tokens)
+        if content_budget < CONTEXT_MIN_DOC_TOKENS:
+            stats["docs_dropped"] += 1
+            continue
+
+        content, trimmed = trim_to_tokens(str(doc.page_content or ""), content_budget)
+        selected.append((doc, doc_class, content, trimmed))
+        remaining -= label_tokens + count_tokens(content) + 4
+        stats["docs_packed"] += 1
+        stats["docs_trimmed"] += int(trimmed)
+
+    # 프롬프트 캐시용: 같은 문서 묶음이면 항상 같은 순서/바이트가 되도록 식별자 순 정렬
+    if order_by_id:
+        selected.sort(key=lambda item: (CLASS_ORDER.index(item[1]), get_stable_doc_key(item[0])))
+
+    # 2단계: 최종 순서대로 번호를 매겨 조립
+    entries = []
+    counters = new_label_counters()
+    class_counts = {}
+    for doc, doc_class, content, trimmed in selected:
+        label = build_doc_label(doc.metadata or {}, doc_class, counters)
+        entries.append(label + f"내용: {content}{'…' if trimmed else ''}\n")
+        class_key = "precedent" if doc_class == "other" else doc_class
+        class_counts[class_key] = class_counts.get(class_key, 0) + 1
+
+    header = build_context_header(class_counts, compact=True)
+    text = header + "\n\n".join(entries)
+    stats["header_tokens"] = count_tokens(header)
+    stats["context_tokens"] = count_tokens(text)
+    return text, stats
@@ -0,0 +1,223 @@
+"""
+쿼리 변환 캐시 - 크기 제한 LRU (메모리) / 워커 간 공유 SQLite 저장소
+
+키는 (모델명, 프롬프트 버전, 원본 쿼리)의 해시라서
+모델이나 변환 프롬프트가 바뀌면 기존 항목은 자동으로 무효화됩니다.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    OPENAI_MODEL, OPENAI_BASE_URL, CONVERSION_PROMPT_VERSION, CONVERSION_CACHE_BACKEND,
+    CONVERSION_CACHE_PATH, CONVERSION_CACHE_MAX_ENTRIES, CONVERSION_CACHE_TOUCH_SEC,
+    CONVERSION_COST_PER_CALL_USD,
+)
+
+
+def make_cache_key(query, model_name=OPENAI_MODEL, prompt_version=CONVERSION_PROMPT_VERSION, endpoint=OPENAI_BASE_URL):
+    raw = f"{model_name}\x1f{prompt_version}\x1f{query}"
+    if endpoint:
+        # 로컬 스텁 등 다른 엔드포인트의 변환 결과와 섞이지 않게 분리
+        raw = f"{endpoint}\x1f{raw}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ConversionCache(ABC):
+    """변환 캐시 공통 인터페이스 + 적중/미스/절감 비용 지표"""
+
+    def __init__(self, model_name=OPENAI_MODEL, prompt_version=CONVERSION_PROMPT_VERSION):
+        self.model_name = model_name
+        self.prompt_version = prompt_version
+        self.hits = 0
+        self.misses = 0
+        self._conversions = 0
+        self._conversion_seconds = 0.0
+        self._metrics_lock = threading.Lock()
+
+    def _key(self, query):
+        return make_cache_key(query, self.model_name, self.prompt_version)
+
+    def get(self, query):
+        value = self._get(self._key(query))
+        with self._metrics_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, query, value, elapsed_seconds=0.0):
+        """변환 결과 저장 (elapsed_seconds: 이번 GPT 호출에 걸린 시간, 절감 시간 추정용)"""
+        with self._metrics_lock:
+            self._conversions += 1
+            self._conversion_seconds += elapsed_seconds
+        self._set(self._key(query), query, value)
+
+    def stats(self):
+        with self._metrics_lock:
+            lookups = self.hits + self.misses
+            avg_conversion_seconds = self._conversion_seconds / self._conversions if self._conversions else 0.0
+            return {
+                "backend": type(self).__name__,
+                "entries": self._size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "cost_saved_usd": self.hits * CONVERSION_COST_PER_CALL_USD,
+                "latency_saved_sec": self.hits * avg_conversion_seconds,
+            }
+
+    @abstractmethod
+    def _get(self, key):
+        """저장된 변환 결과 (없으면 None)"""
+
+    @abstractmethod
+    def _set(self, key, query, value):
+        """변환 결과 저장 (크기 상한을 넘으면 오래된 항목 제거)"""
+
+    @abstractmethod
+    def _size(self):
+        """저장된 항목 수"""
+
+
+class MemoryConversionCache(ConversionCache):
+    """프로세스 내 LRU 캐시"""
+
+    def __init__(self, max_entries=CONVERSION_CACHE_MAX_ENTRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, query, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteConversionCache(ConversionCache):
+    """여러 워커 프로세스가 공유하는 SQLite(WAL) 캐시 - last_used_at 기준 LRU 제거
+
+    적중할 때마다 쓰면 읽기 위주 부하에서도 WAL 쓰기 잠금을 잡으므로, last_used_at이
+    touch_sec보다 오래된 항목만 갱신하고 그 사이 적중 수는 프로세스 안에 모았다가 함께 반영
+    """
+
+    def __init__(self, path=CONVERSION_CACHE_PATH, max_entries=CONVERSION_CACHE_MAX_ENTRIES,
+                 touch_sec=CONVERSION_CACHE_TOUCH_SEC, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_sec = touch_sec
+        self._local = threading.local()
+        self._pending_hits = {}
+        self._pending_lock = threading.Lock()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_conversions (
+                cache_key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                converted TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_query_conversions_lru ON query_conversions (last_used_at)")
+        conn.commit()
+
+    def _connect(self):
+        # sqlite3 연결은 스레드 간 공유하지 않음
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT converted, last_used_at FROM query_conversions WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        converted, last_used_at = row
+        now = time.time()
+        with self._pending_lock:
+            hits = self._pending_hits.pop(key, 0) + 1
+            if now - last_used_at < self.touch_sec:
+                self._pending_hits[key] = hits
+                return converted
+        conn.execute(
+            "UPDATE query_conversions SET last_used_at = ?, hit_count = hit_count + ? WHERE cache_key = ?",
+            (now, hits, key),
+        )
+        conn.commit()
+        return converted
+
+    def _set(self, key, query, value):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT INTO query_conversions (cache_key, query, converted, model, prompt_version, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET converted = excluded.converted, last_used_at = excluded.last_used_at
+            """,
+            (key, query, value, self.model_name, self.prompt_version, now, now),
+        )
+        conn.execute(
+            """
+            DELETE FROM query_conversions WHERE cache_key IN (
+                SELECT cache_key FROM query_conversions ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+        conn.commit()
+
+    def _size(self):
+        return self._connect().execute("SELECT COUNT(*) FROM query_conversions").fetchone()[0]
+
+    def stats(self):
+        result = super().stats()
+        # 모든 워커의 누적 적중 수 (프로세스 재시작 후에도 유지)
+        total_hits = self._connect().execute(
+            "SELECT COALESCE(SUM(hit_count), 0) FROM query_conversions"
+        ).fetchone()[0]
+        with self._pending_lock:
+            total_hits += sum(self._pending_hits.values())  # 아직 반영하지 않은 이 프로세스의 적중
+        result["shared_hits"] = total_hits
+        result["shared_cost_saved_usd"] = total_hits * CONVERSION_COST_PER_CALL_USD
+        return result
+
+
+def create_conversion_cache():
+    """설정에 맞는 변환 캐시 생성"""
+    if CONVERSION_CACHE_BACKEND == "sqlite":
+        try:
+            return SQLiteConversionCache()
+        except sqlite3.Error as e:
+            print(f"⚠️ SQLite 변환 캐시 열기 실패, 메모리 캐시 사용: {e}")
+    return MemoryConversionCache()
@@ -0,0 +1,105 @@
+"""
+검색 결과 다양화 - 판례 단위 중복 제거 및 MMR 재선택
+"""
+import numpy as np
+
+
+# 같은 원문에서 나온 청크를 묶을 때 사용하는 메타데이터 키 (우선순위 순)
+# source는 언론사/출처 이름이라 그것만으로는 원문을 가리키지 않으므로 title과 함께만 사용
+DEDUP_KEYS = ["case_id", "interpretation_id", "qa_id", "url", "title"]
+
+
+def get_dedup_key(doc):
+    """문서가 속한 원문(판례/해석례/Q&A/기사) 식별 키"""
+    meta = doc.metadata or {}
+    for key in DEDUP_KEYS:
+        value = str(meta.get(key, "")).strip()
+        if value:
+            if key == "title":
+                source = str(meta.get("source", "")).strip()
+                return f"title:{source}|{value}" if source else f"title:{value}"
+            return f"{key}:{value}"
+    return None
+
+
+def _collapse_indices(hits):
+    """원문마다 처음 나온 청크의 인덱스 (입력 순서 유지)"""
+    seen = set()
+    indices = []
+    for index, hit in enumerate(hits):
+        key = get_dedup_key(hit.doc)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        indices.append(index)
+    return indices
+
+
+def collapse_by_case(hits):
+    """같은 원문의 청크 중 가장 앞 순위 하나만 남김 (입력 순서 유지 - 거리순 또는 융합 순위)"""
+    return [hits[i] for i in _collapse_indices(hits)]
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(query_vector, candidate_vectors, k, lambda_mult=0.7, relevance=None):
+    """Maximal Marginal Relevance 선택 - 선택된 인덱스 목록 반환
+
+    relevance: 후보별 관련도 (없으면 query_vector와의 코사인 유사도) - 최댓값이 1이 되도록 맞춰 사용
+    """
+    candidates = np.atleast_2d(np.asarray(candidate_vectors, dtype=np.float32))
+    n = candidates.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    if n <= k:
+        k = n
+
+    candidates = _normalize_rows(candidates)
+    query = _normalize_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+
+    if relevance is None:
+        relevance = candidates @ query
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+        top = relevance.max()
+        if top > 0:
+            relevance = relevance / top
+    pairwise = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    # 각 후보가 이미 선택된 문서들과 가지는 최대 유사도 (점진적으로 갱신)
+    max_redundancy = pairwise[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_redundancy, pairwise[best], out=max_redundancy)
+
+    return selected
+
+
+def diversify_hits(query_vector, hits, k, lambda_mult=0.7, relevance=None):
+    """원문 단위 중복 제거 후 MMR로 k개 선택
+
+    relevance: hits와 같은 순서의 관련도 (여러 변형 쿼리를 융합했으면 RRF 점수 - 원본 쿼리 벡터만으로 다시 매기지 않음)
+    """
+    indices = _collapse_indices(hits)
+    collapsed = [hits[i] for i in indices]
+    if len(collapsed) <= k:
+        return collapsed
+
+    vectors = np.stack([hit.vector for hit in collapsed])
+    if relevance is not None:
+        relevance = [relevance[i] for i in indices]
+    selected = mmr_select(query_vector, vectors, k, lambda_mult, relevance)
+    return [collapsed[i] for i in selected]
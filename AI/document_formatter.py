@@ -1,6 +1,84 @@
 """
 문서 포맷팅 유틸리티
 """
+from term_engine import TermAutomaton
+
+# 문서 유형 판별 기준 (doc_type 키워드, 메타데이터 키)
+PRECEDENT_KEYWORDS = ["판례", "판결", "대법원", "고등법원", "지방법원"]
+PRECEDENT_META_KEYS = ["판결요지", "판시사항", "case_id", "court"]
+INTERPRETATION_KEYWORDS = ["법령해석", "해석례", "유권해석", "행정해석"]
+INTERPRETATION_META_KEYS = ["해석내용", "법령명", "interpretation_id"]
+QA_KEYWORDS = ["백문백답", "생활법령", "qa", "질의응답", "faq"]
+QA_META_KEYS = ["질문", "답변", "question", "answer", "qa_id"]
+
+# doc_type 키워드를 한 번에 훑는 자동자 (키워드 → 문서 유형)
+DOC_TYPE_AUTOMATON = TermAutomaton({
+    **{keyword: "precedent" for keyword in PRECEDENT_KEYWORDS},
+    **{keyword: "interpretation" for keyword in INTERPRETATION_KEYWORDS},
+    **{keyword: "qa" for keyword in QA_KEYWORDS},
+})
+
+
+def classify_doc(meta):
+    """메타데이터로 문서 유형 판별 (news/precedent/interpretation/qa/other)"""
+    meta = meta or {}
+    if ('url' in meta and 'title' in meta) or ('date' in meta and 'title' in meta):
+        return "news"
+
+    doc_type = str(meta.get("doc_type", "")).lower()
+    doc_type_classes = {match.payload for match in DOC_TYPE_AUTOMATON.find_all(doc_type)}
+    if "precedent" in doc_type_classes or any(key in meta for key in PRECEDENT_META_KEYS):
+        return "precedent"
+    if "interpretation" in doc_type_classes or any(key in meta for key in INTERPRETATION_META_KEYS):
+        return "interpretation"
+    if "qa" in doc_type_classes or any(key in meta for key in QA_META_KEYS):
+        return "qa"
+    return "other"
+
+
+def has_value(meta, key):
+    value = str(meta.get(key, ""))
+    return bool(value and value.strip() != "")
+
+
+def build_doc_label(meta, doc_class, counters):
+    """문서 머리글 (유형 표기 + 식별자) - counters: 식별자 없는 문서의 유형별 번호"""
+    if doc_class == "news":
+        counters["news"] += 1
+        title = str(meta.get("title", "제목없음"))[:80]
+        date = str(meta.get("date", "날짜미상"))
+        source = str(meta.get("source", "뉴스"))
+        
+        label = f"[뉴스-{counters['news']}] 📰 뉴스\n"
+        label += f"제목: {title}\n"
+        label += f"출처: {source} | 날짜: {date}\n"
+        return label
+    
+    if doc_class == "precedent":
+        if has_value(meta, "case_id"):
+            return f"[판례-{meta['case_id']}] 🏛️ 판례\n"
+        counters["precedent"] += 1
+        return f"[판례-{counters['precedent']}] 🏛️ 판례\n"
+    
+    if doc_class == "interpretation":
+        if has_value(meta, "interpretation_id"):
+            return f"[법령해석례-{meta['interpretation_id']}] ⚖️ 법령해석례\n"
+        counters["interpretation"] += 1
+        return f"[법령해석례-{counters['interpretation']}] ⚖️ 법령해석례\n"
+    
+    if doc_class == "qa":
+        if has_value(meta, "qa_id"):
+            return f"[백문백답-{meta['qa_id']}] 💡 생활법령 Q&A\n"
+        counters["qa"] += 1
+        return f"[백문백답-{counters['qa']}] 💡 생활법령 Q&A\n"
+    
+    counters["precedent"] += 1
+    source = str(meta.get("doc_type", "법률자료"))
+    return f"[법률-{counters['precedent']}] 📋 {source}\n"
+
+
+def new_label_counters():
+    return {"news": 0, "precedent": 0, "interpretation": 0, "qa": 0}
 
 
 def format_docs_optimized(docs, search_type):
@@ -9,73 +87,15 @@ def format_docs_optimized(docs, search_type):
         return "관련 자료를 찾을 수 없습니다."
     
     formatted_docs = []
-    news_count = 0
-    precedent_count = 0
-    interpretation_count = 0
-    qa_count = 0
+    counters = new_label_counters()
     
     for i, doc in enumerate(docs):
         try:
             meta = doc.metadata if doc.metadata else {}
             content = str(doc.page_content)[:1000] if doc.page_content else ""
             
-            is_news = ('url' in meta and 'title' in meta) or ('date' in meta and 'title' in meta)
-            
-            if is_news:
-                news_count += 1
-                title = str(meta.get("title", "제목없음"))[:80]
-                date = str(meta.get("date", "날짜미상"))
-                source = str(meta.get("source", "뉴스"))
-                
-                formatted = f"[뉴스-{news_count}] 📰 뉴스\n"
-                formatted += f"제목: {title}\n"
-                formatted += f"출처: {source} | 날짜: {date}\n"
-                formatted += f"내용: {content}...\n"
-                
-            else:
-                doc_type = str(meta.get("doc_type", "")).lower()
-                
-                if any(keyword in doc_type for keyword in ["판례", "판결", "대법원", "고등법원", "지방법원"]) or \
-                   any(key in meta for key in ["판결요지", "판시사항", "case_id", "court"]):
-                    
-                    case_id = str(meta.get("case_id", ""))
-                    if case_id and case_id.strip() != "":
-                        formatted = f"[판례-{case_id}] 🏛️ 판례\n"
-                    else:
-                        precedent_count += 1
-                        formatted = f"[판례-{precedent_count}] 🏛️ 판례\n"
-                    
-                    formatted += f"내용: {content}...\n"
-                    
-                elif any(keyword in doc_type for keyword in ["법령해석", "해석례", "유권해석", "행정해석"]) or \
-                     any(key in meta for key in ["해석내용", "법령명", "interpretation_id"]):
-                    
-                    interpretation_id = str(meta.get("interpretation_id", ""))
-                    if interpretation_id and interpretation_id.strip() != "":
-                        formatted = f"[법령해석례-{interpretation_id}] ⚖️ 법령해석례\n"
-                    else:
-                        interpretation_count += 1
-                        formatted = f"[법령해석례-{interpretation_count}] ⚖️ 법령해석례\n"
-                    
-                    formatted += f"내용: {content}...\n"
-                    
-                elif any(keyword in doc_type for keyword in ["백문백답", "생활법령", "qa", "질의응답", "faq"]) or \
-                     any(key in meta for key in ["질문", "답변", "question", "answer", "qa_id"]):
-                    
-                    qa_id = str(meta.get("qa_id", ""))
-                    if qa_id and qa_id.strip() != "":
-                        formatted = f"[백문백답-{qa_id}] 💡 생활법령 Q&A\n"
-                    else:
-                        qa_count += 1
-                        formatted = f"[백문백답-{qa_count}] 💡 생활법령 Q&A\n"
-                    
-                    formatted += f"내용: {content}...\n"
-                    
-                else:
-                    precedent_count += 1
-                    source = str(meta.get("doc_type", "법률자료"))
-                    formatted = f"[법률-{precedent_count}] 📋 {source}\n"
-                    formatted += f"내용: {content}...\n"
+            formatted = build_doc_label(meta, classify_doc(meta), counters)
+            formatted += f"내용: {content}...\n"
             
             formatted_docs.append(formatted)
             
@@ -88,6 +108,20 @@ def format_docs_optimized(docs, search_type):
                 continue
     
     # 결과 조합 - 유형별 개수 표시
+    header = build_context_header(counters)
+    
+    result = header + "\n\n".join(formatted_docs)
+    
+    return result
+
+
+def build_context_header(counts, compact=False):
+    """참고자료 머리말 - 포함된 자료 유형만 표시"""
+    precedent_count = counts.get("precedent", 0)
+    interpretation_count = counts.get("interpretation", 0)
+    qa_count = counts.get("qa", 0)
+    news_count = counts.get("news", 0)
+    
     header_parts = []
     if precedent_count > 0:
         header_parts.append(f"판례 {precedent_count}개")
@@ -98,6 +132,18 @@ def format_docs_optimized(docs, search_type):
     if news_count > 0:
         header_parts.append(f"뉴스 {news_count}개")
     
+    if compact:
+        formats = []
+        if precedent_count > 0:
+            formats.append("[판례-번호] 🏛️")
+        if interpretation_count > 0:
+            formats.append("[법령해석례-번호] ⚖️")
+        if qa_count > 0:
+            formats.append("[백문백답-번호] 💡")
+        if news_count > 0:
+            formats.append("[뉴스-번호] 📰")
+        return f"📋 검색결과: {', '.join(header_parts)} (자료 표기: {', '.join(formats)})\n\n"
+    
     header = f"📋 검색결과: {', '.join(header_parts)}\n"
     header += "="*60 + "\n"
     header += "⚠️ AI가 아래 자료 유형을 정확히 확인하고 답변하세요:\n"
@@ -112,7 +158,4 @@ def format_docs_optimized(docs, search_type):
         header += f"• 뉴스 자료: [뉴스-번호] 📰 뉴스 형태로 표시됨\n"
     
     header += "="*60 + "\n\n"
-    
-    result = header + "\n\n".join(formatted_docs)
-    
-    return result
+    return header
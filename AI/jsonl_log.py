@@ -0,0 +1,35 @@
+"""
+크기 상한이 있는 JSONL 로그 파일 - 상한을 넘으면 path.1, path.2 ... 로 밀어내고 새 파일에 이어 씀
+
+여러 워커 프로세스가 같은 파일에 줄 단위로 추가해도 되도록 쓸 때마다 열고 닫음
+(교체는 os.replace라 다른 프로세스가 쓰던 줄은 이전 파일에 남음).
+"""
+import os
+
+
+def rotate_if_needed(path, incoming_bytes, max_bytes, backups):
+    """path가 이번에 쓸 크기까지 더해 max_bytes를 넘으면 path → path.1 → ... → path.{backups} 로 밀어냄"""
+    if not max_bytes:
+        return
+    try:
+        if os.path.getsize(path) + incoming_bytes <= max_bytes:
+            return
+    except OSError:
+        return  # 아직 파일 없음
+    if backups <= 0:
+        os.remove(path)
+        return
+    for index in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{index}"):
+            os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def append_lines(path, lines, max_bytes=0, backups=0):
+    """줄 목록을 한 번에 추가 (max_bytes가 0이면 상한 없음) - 호출부에서 프로세스 안 잠금"""
+    data = "".join(lines)
+    if not data:
+        return
+    rotate_if_needed(path, len(data.encode("utf-8")), max_bytes, backups)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(data)
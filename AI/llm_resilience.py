@@ -0,0 +1,296 @@
+"""
+LLM 호출 복원력 계층 - 타임아웃, 지터 재시도, 헤징, 서킷 브레이커
+
+- 타임아웃: 호출(스트리밍은 첫 토큰)마다 제한 시간
+- 재시도: full jitter 지수 백오프
+- 헤징: 최근 성공 지연의 p95가 지나도 응답이 없으면 같은 요청을 한 번 더 보내고 먼저 온 결과 사용
+- 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 즉시 실패 → 호출부가 저하 모드로 응답
+- 호출 스레드가 모두 차 있으면 대기열에 쌓지 않고 즉시 LLMSaturatedError (헤지는 보내지 않음)
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import (
+    LLM_MAX_RETRIES, LLM_RETRY_BASE_SEC, LLM_RETRY_MAX_SEC,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_MIN_DELAY_SEC,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_SEC, LLM_CALL_THREADS,
+)
+
+
+# 첫 응답 대기/헤징용 공용 스레드 풀 (멈춘 호출은 클라이언트 타임아웃으로 결국 풀림)
+# 빈 스레드 수만큼만 제출해 호출이 실행기 큐에서 제한 시간을 다 쓰지 않게 함
+_call_executor = ThreadPoolExecutor(max_workers=LLM_CALL_THREADS, thread_name_prefix="llm-call")
+_call_slots = threading.BoundedSemaphore(LLM_CALL_THREADS)
+
+
+class LLMTimeoutError(TimeoutError):
+    """제한 시간 안에 LLM 응답(스트리밍은 첫 토큰)이 오지 않음"""
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷 브레이커가 열려 있어 호출하지 않고 즉시 실패"""
+
+
+class LLMSaturatedError(RuntimeError):
+    """호출 스레드가 모두 사용 중 - 업스트림 장애가 아니므로 재시도/브레이커에 반영하지 않음"""
+
+
+class _CallJob:
+    """호출 스레드에서 실행되는 LLM 호출 - 실제로 시작된 시각을 기록"""
+
+    def __init__(self, fn):
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = None
+        self._fn = fn
+        self._context = contextvars.copy_context()
+
+    def run(self):
+        self.started_at = time.monotonic()
+        self.started.set()
+        try:
+            return self._context.run(self._fn)
+        finally:
+            _call_slots.release()
+
+
+def _submit_call(fn):
+    """빈 호출 스레드가 있을 때만 제출 (없으면 None)"""
+    if not _call_slots.acquire(blocking=False):
+        return None
+    job = _CallJob(fn)
+    try:
+        job.future = _call_executor.submit(job.run)
+    except BaseException:
+        _call_slots.release()
+        raise
+    return job
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+class CircuitBreaker:
+    """연속 실패 기반 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, recovery_sec=BREAKER_RECOVERY_SEC):
+        self.failure_threshold = failure_threshold
+        self.recovery_sec = recovery_sec
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """호출 가능 여부 - open 상태에서 복구 시간이 지나면 시험 호출 하나만 허용"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.recovery_sec:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """시험 호출을 보내지 못했을 때(호출 스레드 포화) - half_open이면 다음 호출이 다시 시험하도록 자리 반납"""
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"🚨 LLM 서킷 브레이커 열림 - {self.recovery_sec:.0f}초 동안 저하 모드")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class ResilientLLMCaller:
+    """호출 지점(채팅 답변, 쿼리 변환)별 복원력 정책과 지표"""
+
+    def __init__(self, name, timeout, max_retries=LLM_MAX_RETRIES, hedge=LLM_HEDGE_ENABLED, breaker=None):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0, "successes": 0, "failures": 0, "timeouts": 0, "retries": 0,
+            "hedges_sent": 0, "hedge_wins": 0, "rejected": 0, "saturated": 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def hedge_delay(self):
+        """헤지 요청을 보낼 시점 - 최근 성공 지연의 p95 (표본이 적으면 헤징 안 함)"""
+        if not self.hedge:
+            return None
+        with self._lock:
+            recent = sorted(self._latencies)
+        if len(recent) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return max(percentile(recent, LLM_HEDGE_PERCENTILE), LLM_HEDGE_MIN_DELAY_SEC)
+
+    def _race(self, fn, discard=None):
+        """fn을 제한 시간 안에 실행 - p95가 지나면 헤지 요청 추가, 먼저 성공한 결과 반환
+
+        제한 시간과 지연은 호출이 스레드에서 실제로 시작된 때부터 (빈 스레드가 없으면 LLMSaturatedError)
+        """
+        job = _submit_call(fn)
+        if job is None:
+            self._count("saturated")
+            raise LLMSaturatedError(f"{self.name} LLM 호출 스레드 {LLM_CALL_THREADS}개 모두 사용 중")
+        job.started.wait()
+        start_time = job.started_at
+        deadline = start_time + self.timeout
+
+        futures = [job.future]
+        primary = job.future
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is not None and hedge_delay < self.timeout:
+            done, _ = wait(futures, timeout=max(start_time + hedge_delay - time.monotonic(), 0))
+            if not done:
+                hedge = _submit_call(fn)
+                if hedge is not None:
+                    futures.append(hedge.future)
+                    self._count("hedges_sent")
+
+        last_error = None
+        while futures:
+            remaining = deadline - time.monotonic()
+            done, _ = wait(futures, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                futures.remove(future)
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                if future is not primary:
+                    self._count("hedge_wins")
+                # 늦게 끝나는 나머지 요청의 결과는 정리만 함
+                for loser in futures:
+                    if discard is not None:
+                        loser.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+                with self._lock:
+                    self._latencies.append(time.monotonic() - start_time)
+                return future.result()
+
+        if last_error is not None and not futures:
+            raise last_error
+        for loser in futures:
+            if discard is not None:
+                loser.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+        self._count("timeouts")
+        raise LLMTimeoutError(f"{self.name} LLM 응답 {self.timeout:.1f}초 초과")
+
+    def _with_retries(self, fn, discard=None):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name} LLM 서킷 브레이커 열림")
+
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._race(fn, discard)
+            except LLMSaturatedError:
+                # 업스트림 결과가 아니므로 브레이커 상태는 그대로 두고 시험 호출 자리만 반납
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    raise
+                self._count("retries")
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_SEC, LLM_RETRY_BASE_SEC * 2 ** attempt))
+                print(f"🔁 {self.name} LLM 재시도 {attempt + 1}/{self.max_retries} ({backoff:.2f}초 후): {e}")
+                time.sleep(backoff)
+
+    def invoke(self, call):
+        """call(): 응답 전체를 돌려주는 LLM 호출"""
+        result = self._with_retries(call)
+        self._count("successes")
+        self.breaker.record_success()
+        return result
+
+    def stream(self, open_stream):
+        """open_stream(): 새 스트림 이터레이터 - 첫 토큰까지만 타임아웃/재시도/헤징 적용"""
+        def first_chunk():
+            iterator = iter(open_stream())
+            return iterator, next(iterator)
+
+        def close_stream(result):
+            close = getattr(result[0], "close", None)
+            if close is not None:
+                close()
+
+        iterator, first = self._with_retries(first_chunk, discard=close_stream)
+        # 첫 토큰이 왔으면 업스트림은 응답 가능한 상태로 봄
+        self._count("successes")
+        self.breaker.record_success()
+        try:
+            yield first
+            yield from iterator
+        except GeneratorExit:
+            close_stream((iterator, None))
+            raise
+        except Exception:
+            # 첫 토큰 이후 실패는 이미 일부를 보냈으므로 재시도하지 않음
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+
+    def metrics(self):
+        with self._lock:
+            recent = sorted(self._latencies)
+            counters = dict(self.counters)
+        return {
+            "name": self.name,
+            "breaker_state": self.breaker.state,
+            **counters,
+            "p50_sec": percentile(recent, 50),
+            "p95_sec": percentile(recent, 95),
+            "p99_sec": percentile(recent, 99),
+        }
+
+
+_callers = {}
+_callers_lock = threading.Lock()
+
+
+def get_llm_caller(name, timeout):
+    """호출 지점별 공유 인스턴스 (세션/체인이 여러 개여도 지표와 브레이커는 하나)"""
+    with _callers_lock:
+        if name not in _callers:
+            _callers[name] = ResilientLLMCaller(name, timeout)
+        return _callers[name]
+
+
+def llm_resilience_metrics():
+    with _callers_lock:
+        return [caller.metrics() for caller in _callers.values()]
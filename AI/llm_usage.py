@@ -0,0 +1,69 @@
+"""
+LLM 토큰 사용량 집계 - 프롬프트 캐시 적중 토큰 포함
+"""
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+def extract_usage(response):
+    """LLMResult에서 (입력, 캐시 적중 입력, 출력) 토큰 수 추출"""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                details = usage.get("input_token_details") or {}
+                return usage.get("input_tokens", 0), details.get("cache_read", 0) or 0, usage.get("output_tokens", 0)
+
+    # 스트리밍이 아닌 호출은 llm_output에 OpenAI 원본 사용량이 담김
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    prompt_details = token_usage.get("prompt_tokens_details") or {}
+    return (
+        token_usage.get("prompt_tokens", 0),
+        prompt_details.get("cached_tokens", 0) or 0,
+        token_usage.get("completion_tokens", 0),
+    )
+
+
+class PromptCacheUsageTracker(BaseCallbackHandler):
+    """LLM 호출별 입력/캐시 적중/출력 토큰 누적"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.last_call = None
+
+    def on_llm_end(self, response, **kwargs):
+        input_tokens, cached_tokens, output_tokens = extract_usage(response)
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached_tokens
+            self.output_tokens += output_tokens
+            self.last_call = {
+                "input_tokens": input_tokens,
+                "cached_tokens": cached_tokens,
+                "output_tokens": output_tokens,
+            }
+        if input_tokens:
+            print(f"💾 프롬프트 캐시: 입력 {input_tokens} 토큰 중 {cached_tokens} 토큰 적중 "
+                  f"({cached_tokens / input_tokens:.0%})")
+
+    def summary(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "output_tokens": self.output_tokens,
+                "cache_hit_ratio": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+                "last_call": self.last_call,
+            }
+
+
+# 답변 생성 LLM 사용량 (프로세스 전체)
+chat_usage_tracker = PromptCacheUsageTracker()
@@ -0,0 +1,151 @@
+"""
+대화 기록 롤링 요약 압축
+
+응답이 끝난 뒤 백그라운드에서 오래된 턴을 하나의 요약 메시지로 접고,
+최근 몇 턴만 토큰 예산 안에서 원문 그대로 남겨 매 턴 입력 토큰을 줄입니다.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import SystemMessage
+from langchain_openai import ChatOpenAI
+
+from token_utils import count_tokens
+from session_backend import same_messages
+from config import (
+    MEMORY_SUMMARY_MODEL, MEMORY_SUMMARY_MAX_TOKENS, MEMORY_RECENT_TOKEN_BUDGET,
+    MEMORY_MIN_RECENT_MESSAGES, MEMORY_MAX_RECENT_MESSAGES, OPENAI_BASE_URL, LLM_CLIENT_TIMEOUT_SEC,
+)
+
+
+SUMMARY_MESSAGE_ID = "rolling-summary"
+SUMMARY_PREFIX = "이전 대화 요약:\n"
+
+# 프로세스 메모리 기록에서 잘라내기와 요약 교체가 겹치지 않게 하는 잠금
+# (공유 백엔드는 백엔드 안에서 비교 후 교체)
+_history_lock = threading.Lock()
+
+
+def is_summary_message(message):
+    return getattr(message, "id", None) == SUMMARY_MESSAGE_ID
+
+
+def message_tokens(message):
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return count_tokens(content) + 4
+
+
+def split_recent_messages(messages, token_budget=MEMORY_RECENT_TOKEN_BUDGET,
+                          min_messages=MEMORY_MIN_RECENT_MESSAGES, max_messages=MEMORY_MAX_RECENT_MESSAGES):
+    """(접을 메시지 수, 남길 최근 메시지 목록) - 최근 메시지는 턴 단위(질문부터)로 예산 안에서 유지"""
+    keep = 0
+    used = 0
+    for i in range(len(messages) - 1, -1, -1):
+        used += message_tokens(messages[i])
+        count = len(messages) - i
+        if count > max_messages or (count > min_messages and used > token_budget):
+            break
+        # 사람 메시지에서 시작하는 지점까지만 자름 (질문 없이 답변만 남지 않게)
+        if messages[i].type == "human" or count <= min_messages:
+            keep = count
+    return len(messages) - keep, messages[len(messages) - keep:]
+
+
+def replace_prefix(history, expected, messages):
+    """기록 앞부분이 아직 expected이면 그 부분만 messages로 교체 - 그사이 앞부분이 바뀌었으면 False
+
+    공유 백엔드 기록은 백엔드 트랜잭션 안에서 비교/교체하므로 다른 워커가 그사이 추가한 메시지도 유지됨
+    """
+    if hasattr(history, "replace_prefix"):
+        return history.replace_prefix(expected, messages)
+    with _history_lock:
+        current = history.messages
+        if not same_messages(current[:len(expected)], expected):
+            return False
+        history.messages = list(messages) + current[len(expected):]
+        return True
+
+
+def trim_history(history, max_messages):
+    """요약 압축이 밀렸을 때의 상한 - 앞쪽 요약 메시지는 유지"""
+    messages = history.messages
+    if len(messages) <= max_messages:
+        return
+    summary = [messages[0]] if is_summary_message(messages[0]) else []
+    cut = len(messages) - (max_messages - len(summary))
+    replace_prefix(history, messages[:cut], summary)
+
+
+class RollingSummaryCompactor:
+    """세션별 대화 기록을 백그라운드에서 요약 압축"""
+
+    def __init__(self, llm=None, max_workers=2):
+        self.llm = llm or ChatOpenAI(
+            model=MEMORY_SUMMARY_MODEL,
+            temperature=0,
+            max_tokens=MEMORY_SUMMARY_MAX_TOKENS,
+            base_url=OPENAI_BASE_URL,
+            timeout=LLM_CLIENT_TIMEOUT_SEC,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-compact")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self.compactions = 0
+        self.tokens_saved = 0
+
+    def _summarize(self, previous_summary, messages):
+        transcript = "\n".join(
+            f"{'사용자' if m.type == 'human' else '상담봇'}: {m.content}" for m in messages
+        )
+        prompt = f"""다음은 법률 상담 대화의 이전 요약과 그 뒤에 이어진 대화입니다.
+            후속 질문에 답할 때 필요한 사실관계(계약 형태, 금액, 날짜, 당사자, 이미 안내한 조치)와
+            사용자의 상황만 남겨 한국어로 간결하게 요약을 갱신하세요. 판례 원문이나 긴 설명은 빼세요.
+            이전 요약: {previous_summary or "(없음)"}
+            이어진 대화:
+            {transcript}
+            갱신된 요약:"""
+        response = self.llm.invoke([{"role": "user", "content": prompt}])
+        return response.content.strip()
+
+    def compact(self, history):
+        """오래된 턴을 요약으로 접음 - 접을 것이 없거나 도중에 기록이 바뀌면 그대로 둠"""
+        snapshot = list(history.messages)
+        start = 1 if snapshot and is_summary_message(snapshot[0]) else 0
+        fold_until, _ = split_recent_messages(snapshot[start:])
+        if fold_until == 0:
+            return False
+
+        fold_until += start
+        previous_summary = snapshot[0].content[len(SUMMARY_PREFIX):] if start else ""
+        folded = snapshot[start:fold_until]
+        summary = self._summarize(previous_summary, folded)
+        summary_message = SystemMessage(content=SUMMARY_PREFIX + summary, id=SUMMARY_MESSAGE_ID)
+
+        # 요약하는 동안 앞부분이 잘렸으면 이번 결과는 버림 (다음 턴에 다시 시도)
+        if not replace_prefix(history, snapshot[:fold_until], [summary_message]):
+            return False
+
+        saved = sum(message_tokens(m) for m in snapshot[:fold_until]) - message_tokens(summary_message)
+        with self._lock:
+            self.compactions += 1
+            self.tokens_saved += max(saved, 0)
+        print(f"🗜️ 대화 기록 압축: 메시지 {fold_until}개 → 요약 1개 ({saved:+d} 토큰 절감)")
+        return True
+
+    def schedule(self, session_id, history):
+        """응답 뒤 백그라운드에서 압축 (같은 세션은 한 번에 하나만)"""
+        with self._lock:
+            if session_id in self._in_flight:
+                return
+            self._in_flight.add(session_id)
+
+        def run():
+            try:
+                self.compact(history)
+            except Exception as e:
+                print(f"⚠️ 대화 기록 압축 실패 (원문 유지): {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(session_id)
+
+        self._executor.submit(run)
@@ -0,0 +1,88 @@
+"""
+메모리 맵 벡터 인덱스 - 검색 워커 프로세스들이 같은 인덱스 파일을 공유
+
+Chroma 컬렉션을 내보낸 파일 구성 (tools/export_mmap_index.py):
+    vectors.npy   float32 (문서 수, 차원) 저장 벡터
+    norms.npy     float32 (문서 수,) 벡터 제곱 노름
+    records.bin   문서별 JSON 한 줄 {"id", "text", "meta"}
+    offsets.npy   int64 (문서 수 + 1,) records.bin 안의 위치
+
+모든 파일을 mmap으로 열어 워커 수만큼 복사하지 않고 OS 페이지 캐시를 함께 씀.
+거리는 Chroma 기본(l2)과 같은 제곱 L2라 기존 라우팅 임계값을 그대로 사용.
+"""
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from vector_search import SearchHit
+
+
+INDEX_FILES = ("vectors.npy", "norms.npy", "records.bin", "offsets.npy")
+
+
+def index_exists(index_dir):
+    return bool(index_dir) and all(os.path.exists(os.path.join(index_dir, name)) for name in INDEX_FILES)
+
+
+class MmapVectorIndex:
+    """브루트포스 제곱 L2 검색 (정확한 top-k, 행렬곱 한 번)"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        self.norms = np.load(os.path.join(index_dir, "norms.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+        self.records = np.memmap(os.path.join(index_dir, "records.bin"), dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def record(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self.records[start:end].tobytes().decode("utf-8"))
+
+    def search(self, query_vectors, k):
+        """쿼리 벡터별 SearchHit 목록 (가까운 순) - query_with_vectors와 같은 형태"""
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        k = min(k, len(self))
+        # ||d - q||^2 = ||d||^2 - 2 d·q + ||q||^2
+        distances = self.norms[None, :] - 2.0 * (query_vectors @ self.vectors.T)
+        distances += np.einsum("ij,ij->i", query_vectors, query_vectors)[:, None]
+
+        hits_per_query = []
+        for row_distances in distances:
+            top = np.argpartition(row_distances, k - 1)[:k] if k < len(row_distances) else np.arange(len(row_distances))
+            top = top[np.argsort(row_distances[top])]
+            hits = []
+            for row in top:
+                record = self.record(row)
+                hits.append(SearchHit(
+                    doc=Document(id=record["id"], page_content=record["text"], metadata=record["meta"]),
+                    distance=float(max(row_distances[row], 0.0)),
+                    vector=np.array(self.vectors[row]),
+                ))
+            hits_per_query.append(hits)
+        return hits_per_query
+
+
+def write_index(out_dir, batches):
+    """(ids, texts, metadatas, embeddings) 배치들로 인덱스 파일 작성 - 문서 수 반환"""
+    os.makedirs(out_dir, exist_ok=True)
+    vector_chunks = []
+    offsets = [0]
+    with open(os.path.join(out_dir, "records.bin"), "wb") as records:
+        for ids, texts, metadatas, embeddings in batches:
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                line = json.dumps({"id": doc_id, "text": text or "", "meta": meta or {}}, ensure_ascii=False)
+                data = (line + "\n").encode("utf-8")
+                records.write(data)
+                offsets.append(offsets[-1] + len(data))
+            vector_chunks.append(np.asarray(embeddings, dtype=np.float32))
+
+    vectors = np.concatenate(vector_chunks) if vector_chunks else np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(out_dir, "vectors.npy"), vectors)
+    np.save(os.path.join(out_dir, "norms.npy"), np.einsum("ij,ij->i", vectors, vectors).astype(np.float32))
+    np.save(os.path.join(out_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    return len(offsets) - 1
@@ -0,0 +1,120 @@
+"""
+복잡도 기반 모델 라우팅 - 간단한 질문은 빠른 모델 티어, 복잡한 사례는 기본 모델
+
+로컬에서 바로 구할 수 있는 특징(질문 길이, 용어 매칭 수, 검색 거리, 참고자료 유형)으로
+복잡도 점수를 매기고, 결정과 티어별 지연은 JSONL로 남겨 임계값 튜닝에 사용합니다.
+"""
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import NamedTuple
+
+from term_engine import get_term_engine
+from llm_resilience import percentile
+from jsonl_log import append_lines
+from config import (
+    OPENAI_MODEL, MAX_TOKENS, FAST_MODEL, FAST_MAX_TOKENS, MODEL_ROUTING_ENABLED,
+    ROUTING_SIMPLE_MAX_CHARS, ROUTING_SIMPLE_MAX_TERM_HITS, ROUTING_SIMPLE_MAX_DISTANCE,
+    ROUTING_COMPLEX_MIN_PRECEDENTS, ROUTING_FAST_MAX_SCORE, ROUTING_LOG_PATH,
+    ROUTING_LOG_MAX_BYTES, ROUTING_LOG_BACKUPS,
+)
+
+
+TIERS = {
+    "fast": (FAST_MODEL, FAST_MAX_TOKENS),
+    "full": (OPENAI_MODEL, MAX_TOKENS),
+}
+
+
+class RouteDecision(NamedTuple):
+    """라우팅 결정 (tier: fast/full, reasons: 복잡도 점수에 더해진 항목)"""
+    tier: str
+    model: str
+    max_tokens: int
+    score: int
+    reasons: tuple
+    features: dict
+
+
+def extract_route_features(question, trace=None):
+    """질문과 검색 trace(doc_classes, top_distance)에서 라우팅 특징 추출"""
+    trace = trace or {}
+    scan = get_term_engine().scan(question)
+    doc_classes = trace.get("doc_classes", [])
+    return {
+        "query_chars": len(question.strip()),
+        "term_hits": len(scan.dictionary_terms()),
+        "top_distance": trace.get("top_distance"),
+        "precedents": doc_classes.count("precedent"),
+        "doc_classes": sorted(set(doc_classes)),
+    }
+
+
+def route_request(features):
+    """특징별로 복잡도 점수를 더해 티어 결정 (점수가 낮으면 fast)"""
+    reasons = []
+    if features["query_chars"] > ROUTING_SIMPLE_MAX_CHARS:
+        reasons.append("long_query")
+    if features["term_hits"] > ROUTING_SIMPLE_MAX_TERM_HITS:
+        reasons.append("many_terms")
+    if features["top_distance"] is None or features["top_distance"] > ROUTING_SIMPLE_MAX_DISTANCE:
+        reasons.append("weak_retrieval")
+    if features["precedents"] >= ROUTING_COMPLEX_MIN_PRECEDENTS:
+        reasons.append("case_heavy")
+
+    tier = "fast" if MODEL_ROUTING_ENABLED and len(reasons) <= ROUTING_FAST_MAX_SCORE else "full"
+    model, max_tokens = TIERS[tier]
+    return RouteDecision(tier, model, max_tokens, len(reasons), tuple(reasons), features)
+
+
+class RoutingLog:
+    """라우팅 결정과 티어별 지연 기록 (메모리 요약 + 크기 상한이 있는 JSONL 파일)"""
+
+    def __init__(self, path=ROUTING_LOG_PATH, window=1000, max_bytes=ROUTING_LOG_MAX_BYTES,
+                 backups=ROUTING_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, decision, ttft, total, degraded=False):
+        entry = {
+            "ts": round(time.time(), 3),
+            "tier": decision.tier,
+            "model": decision.model,
+            "score": decision.score,
+            "reasons": list(decision.reasons),
+            **decision.features,
+            "ttft": None if ttft is None else round(ttft, 4),
+            "total": round(total, 4),
+            "degraded": degraded,
+        }
+        with self._lock:
+            if not degraded:
+                self._latencies[decision.tier].append((ttft, total))
+            if self.path:
+                append_lines(self.path, [json.dumps(entry, ensure_ascii=False) + "\n"], self.max_bytes, self.backups)
+        ttft_text = "-" if ttft is None else f"{ttft:.2f}초"
+        print(f"🧭 모델 라우팅: {decision.tier} ({decision.model}) 점수 {decision.score} "
+              f"{list(decision.reasons)} - 첫 토큰 {ttft_text}, 전체 {total:.2f}초")
+
+    def summary(self):
+        """티어별 요청 수와 지연 중앙값/p95"""
+        result = {}
+        with self._lock:
+            snapshot = {tier: list(values) for tier, values in self._latencies.items()}
+        for tier, values in snapshot.items():
+            totals = sorted(total for _, total in values)
+            ttfts = sorted(ttft for ttft, _ in values if ttft is not None)
+            result[tier] = {
+                "requests": len(values),
+                "p50_total": percentile(totals, 50),
+                "p95_total": percentile(totals, 95),
+                "p50_ttft": percentile(ttfts, 50),
+            }
+        return result
+
+
+routing_log = RoutingLog()
@@ -0,0 +1,51 @@
+"""
+쿼리 확장 - 동의어를 이어 붙이는 대신 변형 쿼리 여러 개를 만들어 결과를 융합
+"""
+from config import NEWS_EXPANSION_QUERY, MAX_QUERY_VARIANTS, QUERY_VARIANT_WEIGHT, RRF_K
+from term_engine import get_term_engine
+
+
+def build_legal_query_variants(query, max_variants=MAX_QUERY_VARIANTS, scan=None):
+    """법률 검색용 변형 쿼리 목록 (첫 번째는 항상 원본 쿼리)"""
+    scan = scan or get_term_engine().scan(query)
+    variants = [query]
+    for trigger, terms in scan.expansion_triggers():
+        for term in terms:
+            variant = scan.expand(trigger, term)
+            if variant not in variants:
+                variants.append(variant)
+            if len(variants) >= max_variants:
+                return variants
+    return variants
+
+
+def build_news_query_variants(query, scan=None):
+    """뉴스 검색용 변형 쿼리 목록 (부동산 관련 쿼리면 주제 쿼리 추가)"""
+    scan = scan or get_term_engine().scan(query)
+    if scan.has_news_trigger() and NEWS_EXPANSION_QUERY not in query:
+        return [query, NEWS_EXPANSION_QUERY]
+    return [query]
+
+
+def fuse_variant_hits(hits_per_variant, limit, variant_weight=QUERY_VARIANT_WEIGHT, rrf_k=RRF_K,
+                      with_scores=False):
+    """변형 쿼리별 검색 결과를 가중 RRF로 융합 (원본 쿼리 가중치 1.0)
+
+    with_scores: (융합 순 hits, 같은 순서의 RRF 점수) 반환 - MMR 관련도 항으로 사용
+    """
+    scores = {}
+    best_hits = {}
+    for variant_index, hits in enumerate(hits_per_variant):
+        weight = 1.0 if variant_index == 0 else variant_weight
+        for rank, hit in enumerate(hits):
+            doc_key = hit.doc.id or hit.doc.page_content
+            scores[doc_key] = scores.get(doc_key, 0.0) + weight / (rrf_k + rank + 1)
+            # 같은 문서는 가장 가까운 거리를 대표값으로 사용
+            if doc_key not in best_hits or hit.distance < best_hits[doc_key].distance:
+                best_hits[doc_key] = hit
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    fused = [best_hits[doc_key] for doc_key in ranked]
+    if with_scores:
+        return fused, [scores[doc_key] for doc_key in ranked]
+    return fused
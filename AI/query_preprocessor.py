@@ -1,41 +1,46 @@
 """
 법률 쿼리 전처리 클래스
 """
-import functools
+import time
 from langchain_openai import ChatOpenAI
-from config import TERM_MAPPING, LEGAL_INDICATORS, OPENAI_MODEL
+from llm_resilience import get_llm_caller
+from config import TERM_MAPPING, OPENAI_MODEL, OPENAI_BASE_URL, LLM_CLIENT_TIMEOUT_SEC, CONVERSION_TIMEOUT_SEC
+from term_engine import get_term_engine
+from conversion_cache import create_conversion_cache
+from tracing import tracer
 
 
 class LegalQueryPreprocessor:
     """일상어를 법률 용어로 변환하는 전처리기"""
     
-    def __init__(self):
+    def __init__(self, conversion_cache=None):
         self.llm = ChatOpenAI(
             model=OPENAI_MODEL,
             temperature=0.1,
             max_tokens=200,
+            base_url=OPENAI_BASE_URL,
+            timeout=LLM_CLIENT_TIMEOUT_SEC,
+            max_retries=0,
         )
+        # 타임아웃/재시도/헤징/서킷 브레이커 (브레이커가 열리면 룰 기반 변환으로 대체됨)
+        self.llm_caller = get_llm_caller("conversion", CONVERSION_TIMEOUT_SEC)
         
-        self._query_cache = {}
+        # GPT 변환 결과 캐시 (크기 제한, 설정에 따라 워커 간 공유)
+        self.conversion_cache = conversion_cache or create_conversion_cache()
         self.term_mapping = TERM_MAPPING
+        self.term_engine = get_term_engine()
     
     def _apply_rule_based_conversion(self, query: str) -> str:
-        """룰 기반 용어 변환"""
-        converted_query = query
-        for common_term, legal_term in self.term_mapping.items():
-            if common_term in converted_query:
-                converted_query = converted_query.replace(common_term, legal_term)
-        return converted_query
+        """룰 기반 용어 변환 (leftmost-longest 단일 패스)"""
+        return self.term_engine.scan(query).replace_terms()
     
     def _is_already_legal_query(self, query: str) -> bool:
         """이미 법률 용어인지 확인"""
-        return any(term in query for term in LEGAL_INDICATORS)
+        return self.term_engine.scan(query).has_legal_indicator()
     
-    @functools.lru_cache(maxsize=100)
     def _gpt_convert_to_legal_terms(self, user_query: str) -> str:
-        """GPT를 이용한 법률 용어 변환"""
-        try:
-            prompt = f"""다음 일상어 질문을 법률 검색에 적합한 전문 용어로 변환해주세요.
+        """GPT를 이용한 법률 용어 변환 (프롬프트를 바꾸면 CONVERSION_PROMPT_VERSION도 올릴 것)"""
+        prompt = f"""다음 일상어 질문을 법률 검색에 적합한 전문 용어로 변환해주세요.
             원래 질문: {user_query}
             변환 규칙:
             1. 일상어를 정확한 법률 용어로 바꾸기
@@ -44,39 +49,58 @@ class LegalQueryPreprocessor:
             4. 원래 의미는 유지하면서 더 정확하고 전문적으로 표현
             변환된 검색 쿼리:"""
 
-            messages = [{"role": "user", "content": prompt}]
-            response = self.llm.invoke(messages)
-            
-            converted = response.content.strip()
-            if "변환된 검색 쿼리:" in converted:
-                converted = converted.split("변환된 검색 쿼리:")[-1].strip()
-            
-            return converted
-            
-        except Exception as e:
-            print(f"⚠️ GPT 변환 실패, 룰베이스 변환 사용: {e}")
-            return self._apply_rule_based_conversion(user_query)
+        messages = [{"role": "user", "content": prompt}]
+        response = self.llm_caller.invoke(lambda: self.llm.invoke(messages))
+        
+        converted = response.content.strip()
+        if "변환된 검색 쿼리:" in converted:
+            converted = converted.split("변환된 검색 쿼리:")[-1].strip()
+        
+        return converted
+    
+    def convert_query_fast(self, user_query: str):
+        """LLM 호출 없이 끝나는 변환 (지표어/캐시/룰 기반) - GPT 변환이 필요하면 None"""
+        scan = self.term_engine.scan(user_query)
+        if scan.has_legal_indicator():
+            return user_query, "no_conversion"
+        
+        rule_converted = scan.replace_terms()
+        
+        if len(rule_converted) != len(user_query) or rule_converted != user_query:
+            return rule_converted, "rule_based"
+        
+        cached = self.conversion_cache.get(user_query)
+        if cached is not None:
+            return cached, "cached"
+        
+        return None
+    
+    def convert_with_gpt(self, user_query: str) -> tuple[str, str]:
+        """GPT 변환 후 결과 캐싱"""
+        print("🔄 정교한 법률 용어 변환 중...")
+        start_time = time.monotonic()
+        with tracer.span("rag.preprocess.gpt") as span:
+            try:
+                gpt_converted = self._gpt_convert_to_legal_terms(user_query)
+            except Exception as e:
+                # 실패한 변환은 캐시하지 않음
+                print(f"⚠️ GPT 변환 실패, 룰베이스 변환 사용: {e}")
+                span.record_error(e)
+                span.set_attribute("rag.conversion_method", "rule_based")
+                return self._apply_rule_based_conversion(user_query), "rule_based"
+            span.set_attribute("rag.conversion_method", "gpt_converted")
+        
+        self.conversion_cache.set(user_query, gpt_converted, time.monotonic() - start_time)
+        return gpt_converted, "gpt_converted"
     
     def convert_query(self, user_query: str) -> tuple[str, str]:
         """쿼리 변환 메인 함수"""
         try:
-            if self._is_already_legal_query(user_query):
-                return user_query, "no_conversion"
-            
-            if user_query in self._query_cache:
-                return self._query_cache[user_query], "cached"
-            
-            rule_converted = self._apply_rule_based_conversion(user_query)
-            
-            if len(rule_converted) != len(user_query) or rule_converted != user_query:
-                self._query_cache[user_query] = rule_converted
-                return rule_converted, "rule_based"
-            
-            print("🔄 정교한 법률 용어 변환 중...")
-            gpt_converted = self._gpt_convert_to_legal_terms(user_query)
+            fast_result = self.convert_query_fast(user_query)
+            if fast_result is not None:
+                return fast_result
             
-            self._query_cache[user_query] = gpt_converted
-            return gpt_converted, "gpt_converted"
+            return self.convert_with_gpt(user_query)
             
         except Exception as e:
             print(f"⚠️ 쿼리 변환 오류: {e}")
@@ -1,20 +1,92 @@
 """
 RAG 시스템 구현
 """
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
 from query_preprocessor import LegalQueryPreprocessor
-from document_formatter import format_docs_optimized
-from config import LEGAL_SEARCH_K, NEWS_SEARCH_K, MAX_LEGAL_DOCS, MAX_NEWS_DOCS
+from document_formatter import format_docs_optimized, classify_doc
+from context_packer import pack_context, get_stable_doc_key
+from vector_search import encode_queries, query_with_vectors, remember_doc_vectors
+from diversifier import diversify_hits
+from query_expansion import build_legal_query_variants, build_news_query_variants, fuse_variant_hits
+from term_engine import get_term_engine
+from session_retrieval import SessionRetrievalCache, rerank_docs
+from tracing import tracer
+from admission_control import AdmissionRejected, embed_pool
+from config import (
+    LEGAL_SEARCH_K, NEWS_SEARCH_K, MAX_LEGAL_DOCS, MAX_NEWS_DOCS,
+    DIVERSIFY_ENABLED, MMR_FETCH_K, MMR_LAMBDA,
+    SPECULATIVE_RETRIEVAL, GPT_CONVERSION_TIMEOUT_SEC, SPECULATIVE_MERGE_MODE, QUERY_CONVERSION_THREADS,
+    CONTEXT_PACKING_ENABLED, SESSION_RETRIEVAL_REUSE,
+)
+
+
+# GPT 쿼리 변환을 검색과 동시에 실행하기 위한 공용 스레드 풀
+# 시간 초과된 변환도 끝까지 돌기 때문에, 빈 스레드가 없으면 대기열에 쌓지 않고 변환을 건너뜀
+_conversion_executor = ThreadPoolExecutor(
+    max_workers=QUERY_CONVERSION_THREADS, thread_name_prefix="query-convert"
+)
+_conversion_slots = threading.BoundedSemaphore(QUERY_CONVERSION_THREADS)
+
+
+def _submit_conversion(fn, *args):
+    """빈 변환 스레드가 있을 때만 제출 (없으면 None) - 끝나면 자리 반납"""
+    if not _conversion_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _conversion_executor.submit(fn, *args)
+    except BaseException:
+        _conversion_slots.release()
+        raise
+    future.add_done_callback(lambda _: _conversion_slots.release())
+    return future
+
+
+def merge_doc_lists(primary, secondary, limit):
+    """두 검색 결과를 번갈아 합치며 중복 제거 (primary 우선)"""
+    merged = []
+    seen = set()
+    for i in range(max(len(primary), len(secondary))):
+        for docs in (primary, secondary):
+            if i >= len(docs):
+                continue
+            doc_key = docs[i].id or docs[i].page_content
+            if doc_key not in seen:
+                seen.add(doc_key)
+                merged.append(docs[i])
+    return merged[:limit]
 
 
 class OptimizedConditionalRAGSystem:
     """최적화된 조건부 RAG 시스템"""
     
-    def __init__(self, legal_db, news_db):
+    def __init__(self, legal_db, news_db, embedding_model=None, legal_shards=None, retrieval_pool=None):
         print("🚀 RAG 시스템 초기화 중...")
         
         # 데이터베이스 연결
         self.legal_db = legal_db
         self.news_db = news_db
+        self.embedding_model = embedding_model
+        
+        # 샤딩된 법률 DB (ShardedLegalSearcher, 없으면 단일 컬렉션 사용)
+        self.legal_shards = legal_shards if embedding_model is not None else None
+        
+        # 검색 CPU 단계 프로세스 풀 (RetrievalProcessPool, 없으면 요청 스레드에서 검색)
+        self.retrieval_pool = retrieval_pool if embedding_model is not None else None
+        
+        # 세션별 직전 검색 컨텍스트 (후속 질문 재사용, 저장 벡터가 있어야 사용)
+        self.session_retrieval = (
+            SessionRetrievalCache(embedding_model)
+            if SESSION_RETRIEVAL_REUSE and embedding_model is not None else None
+        )
+        
+        # 요청별 참고자료 토큰 통계 (최근 1000건)
+        self.context_stats = deque(maxlen=1000)
         
         # 쿼리 전처리기 초기화
         self.query_preprocessor = LegalQueryPreprocessor()
@@ -37,51 +109,210 @@ class OptimizedConditionalRAGSystem:
         else:
             self.news_vector_retriever = None
     
-    def search_legal_db(self, query):
+    def _vector_search(self, db, queries, k, shards=None, index_name=None, known_vectors=None):
+        """변형 쿼리 배치 임베딩 → 다중 쿼리 1회 검색(샤드면 scatter-gather) → 융합 → 중복 제거 + MMR
+
+        index_name: 프로세스 풀에 같은 이름의 메모리 맵 인덱스가 있으면 이 단계 전체를 워커 프로세스에서 실행
+        CPU 풀(embed_pool) 자리는 이 단계 동안만 잡음 - GPT 변환 대기나 포맷팅은 자리를 차지하지 않음
+        (대기열 초과 시 AdmissionRejected)
+        known_vectors: 요청 안에서 이미 만든 쿼리 벡터 (encode_queries의 known, 요청 스레드 검색에서만 사용)
+        """
+        with embed_pool.slot():
+            selected = self._select_hits(db, queries, k, shards, index_name, known_vectors)
+
+        # 검색 거리는 모델 라우팅 특징으로, 저장 벡터는 후속 질문 재정렬에 사용
+        for hit in selected:
+            hit.doc.metadata["distance"] = hit.distance
+        remember_doc_vectors(selected)
+        return [hit.doc for hit in selected]
+
+    def _select_hits(self, db, queries, k, shards, index_name, known_vectors):
+        if self.retrieval_pool is not None and self.retrieval_pool.has_index(index_name):
+            # 임베딩/검색/점수 계산이 워커에서 한 번에 실행되므로 스팬 하나
+            try:
+                with tracer.span("rag.pool_search", {"rag.index": index_name, "rag.query_variants": len(queries)}) as span:
+                    selected = self.retrieval_pool.search(index_name, queries, k)
+                    span.set_attribute("rag.doc_count", len(selected))
+            except (FutureTimeoutError, BrokenProcessPool) as e:
+                # 시간 초과나 워커 종료 - 이번 검색은 요청 스레드에서 (깨진 풀은 풀이 알아서 내리고 다시 띄움)
+                print(f"⚠️ 검색 프로세스 풀 실패, 요청 스레드에서 검색: {type(e).__name__} {e}")
+                selected = self._vector_search_in_thread(db, queries, k, shards, index_name, known_vectors)
+            return selected
+        return self._vector_search_in_thread(db, queries, k, shards, index_name, known_vectors)
+
+    def _vector_search_in_thread(self, db, queries, k, shards=None, index_name=None, known_vectors=None):
+        with tracer.span("rag.embed", {"rag.index": index_name, "rag.query_variants": len(queries)}):
+            query_vectors = encode_queries(self.embedding_model, queries, known=known_vectors)
+        
+        fetch_k = max(MMR_FETCH_K, k) if DIVERSIFY_ENABLED else k
+        with tracer.span("rag.vector_search", {"rag.index": index_name, "rag.fetch_k": fetch_k,
+                                               "rag.sharded": shards is not None}) as span:
+            # 살아 있는 샤드가 하나도 없으면 단일 컬렉션으로
+            if shards is not None and (shards.available or db is None):
+                hits_per_variant = shards.search(query_vectors, fetch_k)
+            else:
+                hits_per_variant = query_with_vectors(db, query_vectors, fetch_k)
+            span.set_attribute("rag.hit_count", sum(len(hits) for hits in hits_per_variant))
+
+        with tracer.span("rag.scoring", {"rag.index": index_name, "rag.diversify": DIVERSIFY_ENABLED}) as span:
+            if len(queries) > 1:
+                print(f"🔀 변형 쿼리 {len(queries)}개 결과 융합: {queries[1:]}")
+                hits, relevance = fuse_variant_hits(hits_per_variant, fetch_k, with_scores=True)
+            else:
+                hits, relevance = hits_per_variant[0], None
+
+            if DIVERSIFY_ENABLED:
+                # MMR 관련도는 융합했으면 RRF 점수, 아니면 원본 쿼리 벡터와의 유사도
+                selected = diversify_hits(query_vectors[0], hits, k, MMR_LAMBDA, relevance)
+                print(f"🧬 다양화: 후보 {len(hits)}개 → {len(selected)}개 선택")
+            else:
+                selected = hits[:k]
+            span.set_attributes({"rag.candidate_count": len(hits), "rag.doc_count": len(selected)})
+        return selected
+
+    def search_legal_db(self, query, scan=None, known_vectors=None):
         """법률 DB 검색"""
-        if self.legal_vector_retriever is None:
+        if self.legal_vector_retriever is None and self.legal_shards is None:
             return [], 0.0
         
-        try:
-            legal_docs = self.legal_vector_retriever.invoke(query)
-            print(f"📄 법률 검색 결과: {len(legal_docs)}개 문서")
-            return legal_docs, 0.8
-        except Exception as e:
-            print(f"❌ 법률 DB 검색 오류: {e}")
-            return [], 0.0
+        with tracer.span("rag.legal_search") as span:
+            try:
+                if self.embedding_model is not None:
+                    legal_docs = self._vector_search(
+                        self.legal_db, build_legal_query_variants(query, scan=scan), LEGAL_SEARCH_K,
+                        shards=self.legal_shards, index_name="legal", known_vectors=known_vectors,
+                    )
+                else:
+                    legal_docs = self.legal_vector_retriever.invoke(query)
+                print(f"📄 법률 검색 결과: {len(legal_docs)}개 문서")
+                span.set_attribute("rag.doc_count", len(legal_docs))
+                return legal_docs, 0.8
+            except AdmissionRejected:
+                raise  # 혼잡은 빈 결과가 아니라 거절로 전달
+            except Exception as e:
+                print(f"❌ 법률 DB 검색 오류: {e}")
+                span.record_error(e)
+                return [], 0.0
     
-    def search_news_db(self, query):
+    def search_news_db(self, query, scan=None, known_vectors=None):
         """뉴스 DB 검색"""
         if self.news_vector_retriever is None:
             return [], 0.0
         
+        with tracer.span("rag.news_search") as span:
+            try:
+                if self.embedding_model is not None:
+                    news_docs = self._vector_search(
+                        self.news_db, build_news_query_variants(query, scan=scan), NEWS_SEARCH_K, index_name="news",
+                        known_vectors=known_vectors,
+                    )
+                else:
+                    news_docs = self.news_vector_retriever.invoke(query)
+                print(f"📰 뉴스 검색 결과: {len(news_docs)}개")
+                span.set_attribute("rag.doc_count", len(news_docs))
+                return news_docs, 0.7
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                print(f"❌ 뉴스 DB 검색 오류: {e}")
+                span.record_error(e)
+                return [], 0.0
+    
+    def record_context_stats(self, stats):
+        self.context_stats.append(stats)
+
+    def context_stats_summary(self):
+        """최근 요청들의 참고자료 토큰 요약 (예산 튜닝용)"""
+        recent = list(self.context_stats)
+        if not recent:
+            return {}
+        tokens = sorted(s["context_tokens"] for s in recent)
+        return {
+            "requests": len(recent),
+            "avg_context_tokens": sum(tokens) / len(tokens),
+            "p95_context_tokens": tokens[int(0.95 * (len(tokens) - 1))],
+            "avg_docs_packed": sum(s["docs_packed"] for s in recent) / len(recent),
+            "trimmed_ratio": sum(s["docs_trimmed"] for s in recent) / max(sum(s["docs_packed"] for s in recent), 1),
+            "dropped_docs": sum(s["docs_dropped"] for s in recent),
+        }
+
+    def _search_all(self, search_query, known_vectors=None):
+        """법률 DB + 뉴스 DB 검색 (쿼리 용어 스캔과 같은 쿼리 임베딩은 한 번만)"""
+        scan = get_term_engine().scan(search_query)
+        known_vectors = {} if known_vectors is None else known_vectors
+        legal_docs, _ = self.search_legal_db(search_query, scan, known_vectors)
+        news_docs, _ = self.search_news_db(search_query, scan, known_vectors)
+        return legal_docs, news_docs
+
+    def _speculative_retrieve(self, original_query, known_vectors=None):
+        """GPT 변환이 도는 동안 원본 쿼리로 먼저 검색하고, 시간 내에 변환이 오면 결과를 병합/교체"""
+        start_time = time.monotonic()
+        # 변환 스팬이 현재 검색 스팬 아래에 이어지도록 컨텍스트를 복사해 실행
+        conversion_future = _submit_conversion(
+            contextvars.copy_context().run, self.query_preprocessor.convert_with_gpt, original_query
+        )
+        
+        legal_docs, news_docs = self._search_all(original_query, known_vectors)
+        if conversion_future is None:
+            print("⏭️ GPT 변환 스레드 포화 - 변환 없이 원본 쿼리 검색 결과 사용")
+            return legal_docs, news_docs
+        
+        remaining = GPT_CONVERSION_TIMEOUT_SEC - (time.monotonic() - start_time)
         try:
-            news_docs = self.news_vector_retriever.invoke(query)
-            print(f"📰 뉴스 검색 결과: {len(news_docs)}개")
-            return news_docs, 0.7
+            converted_query, _ = conversion_future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            # 변환은 백그라운드에서 계속 진행되어 다음 요청부터 캐시로 사용됨
+            print(f"⏱️ GPT 변환 {GPT_CONVERSION_TIMEOUT_SEC:.1f}초 초과 - 원본 쿼리 검색 결과 사용")
+            return legal_docs, news_docs
         except Exception as e:
-            print(f"❌ 뉴스 DB 검색 오류: {e}")
-            return [], 0.0
-    
-    def conditional_retrieve(self, original_query):
-        """조건부 검색"""
+            print(f"⚠️ GPT 변환 실패 - 원본 쿼리 검색 결과 사용: {e}")
+            return legal_docs, news_docs
+        
+        if converted_query == original_query:
+            return legal_docs, news_docs
+        
+        print(f"🔄 변환된 쿼리: {converted_query}")
+        converted_legal, converted_news = self._search_all(converted_query, known_vectors)
+        if SPECULATIVE_MERGE_MODE == "substitute":
+            return converted_legal, converted_news
+        
+        return (
+            merge_doc_lists(converted_legal, legal_docs, MAX_LEGAL_DOCS),
+            merge_doc_lists(converted_news, news_docs, MAX_NEWS_DOCS),
+        )
+
+    def conditional_retrieve(self, original_query, timings=None, known_vectors=None):
+        """조건부 검색 (timings: 단계별 소요 시간(초)을 기록할 dict, known_vectors: 요청 안에서 만든 쿼리 벡터)"""
+        if timings is None:
+            timings = {}
         try:
             print(f"🔍 검색 쿼리: {original_query}")
             
-            # 쿼리 전처리
-            converted_query, conversion_method = self.query_preprocessor.convert_query(original_query)
-            
-            if conversion_method != "no_conversion":
-                print(f"🔄 변환된 쿼리: {converted_query}")
-                search_query = converted_query
-            else:
-                search_query = original_query
-            
-            # 법률 DB 검색
-            legal_docs, legal_score = self.search_legal_db(search_query)
+            # 쿼리 전처리 (LLM 없이 끝나는 변환 먼저)
+            stage_start = time.perf_counter()
+            with tracer.span("rag.preprocess") as span:
+                conversion = self.query_preprocessor.convert_query_fast(original_query)
+                if conversion is None and not SPECULATIVE_RETRIEVAL:
+                    conversion = self.query_preprocessor.convert_query(original_query)
+                # 추측 검색이면 GPT 변환은 검색과 겹쳐 실행 (rag.preprocess.gpt 스팬)
+                span.set_attribute("rag.conversion_method", conversion[1] if conversion else "speculative")
+            timings["convert"] = time.perf_counter() - stage_start
             
-            # 뉴스 DB 검색
-            news_docs, news_score = self.search_news_db(search_query)
+            stage_start = time.perf_counter()
+            with tracer.span("rag.search") as span:
+                if conversion is None:
+                    # GPT 변환 대기 시간은 검색과 겹치므로 검색 단계에 포함
+                    legal_docs, news_docs = self._speculative_retrieve(original_query, known_vectors)
+                else:
+                    converted_query, conversion_method = conversion
+                    if conversion_method != "no_conversion":
+                        print(f"🔄 변환된 쿼리: {converted_query}")
+                        search_query = converted_query
+                    else:
+                        search_query = original_query
+                    legal_docs, news_docs = self._search_all(search_query, known_vectors)
+                span.set_attributes({"rag.legal_doc_count": len(legal_docs), "rag.news_doc_count": len(news_docs)})
+            timings["search"] = time.perf_counter() - stage_start
             
             # 결과 결합
             combined_docs = []
@@ -95,21 +326,117 @@ class OptimizedConditionalRAGSystem:
             print(f"🎯 최종 결과: {len(combined_docs)}개 문서 ({search_type})")
             return combined_docs, search_type
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
             print(f"❌ 검색 오류: {e}")
             return [], "error"
 
+    def retrieve_for_session(self, original_query, session_id, timings=None):
+        """세션 단위 검색 - 후속 질문이면 직전 문서 재사용(reuse) 또는 변환 없는 좁은 검색(narrow)"""
+        if self.session_retrieval is None:
+            return self.conditional_retrieve(original_query, timings)
+        if timings is None:
+            timings = {}
+        
+        # 후속 질문 판정과 검색이 같은 질문을 두 번 임베딩하지 않도록 벡터 공유
+        known_vectors = {}
+        stage_start = time.perf_counter()
+        with tracer.span("rag.followup_check") as span:
+            mode, query_vector, previous, similarity = self.session_retrieval.classify(
+                session_id, original_query, known_vectors
+            )
+            span.set_attributes({"rag.followup_mode": mode, "rag.followup_similarity": similarity})
+        timings["followup_check"] = time.perf_counter() - stage_start
+        
+        if mode == "new":
+            docs, search_type = self.conditional_retrieve(original_query, timings, known_vectors)
+        else:
+            print(f"♻️ 후속 질문 감지 ({mode}, 직전 질문 유사도 {similarity:.2f}): {previous.query}")
+            stage_start = time.perf_counter()
+            with tracer.span("rag.search", {"rag.followup_mode": mode}):
+                previous_docs = rerank_docs(previous.docs, query_vector)
+                if mode == "reuse":
+                    docs, search_type = previous_docs, previous.search_type
+                else:
+                    # GPT 변환 없이 원문 질문으로만 검색해 직전 문서 뒤에 보충
+                    legal_docs, news_docs = self._search_all(original_query, known_vectors)
+                    fresh_docs = legal_docs[:MAX_LEGAL_DOCS] + news_docs[:MAX_NEWS_DOCS]
+                    docs = merge_doc_lists(previous_docs, fresh_docs, MAX_LEGAL_DOCS + MAX_NEWS_DOCS)
+                    search_type = previous.search_type
+            timings["search"] = time.perf_counter() - stage_start
+        
+        if search_type != "error":
+            if query_vector is None:
+                # 직전 컨텍스트가 없던 세션 - 검색에서 원문 질문을 임베딩했으면 그 벡터, 아니면(변환 쿼리만 검색) 지금 한 번
+                if original_query not in known_vectors:
+                    with embed_pool.slot():
+                        encode_queries(self.embedding_model, [original_query], known=known_vectors)
+                query_vector = known_vectors[original_query]
+            self.session_retrieval.remember(session_id, mode, original_query, query_vector, docs, search_type)
+        return docs, search_type
+
 
-def optimized_retrieve_and_format(query, rag_system):
-    """최적화된 검색 및 포맷팅 - 전처리 포함"""
+def optimized_retrieve_and_format(query, rag_system, order_by_id=False, trace=None, session_id=None):
+    """최적화된 검색 및 포맷팅 - 전처리 포함
+
+    order_by_id: 프롬프트 캐시용 문서 정렬
+    trace: 단계별 소요 시간(timings), 검색 문서 id(doc_ids), 검색 유형을 기록할 dict
+    session_id: 있으면 후속 질문일 때 세션의 직전 검색 결과 재사용
+    """
+    if trace is None:
+        trace = {}
+    with tracer.span("rag.retrieve", {"session.id": session_id}) as span:
+        context = _retrieve_and_format(query, rag_system, order_by_id, trace, session_id)
+        span.set_attributes({
+            "rag.search_type": trace.get("search_type"),
+            "rag.doc_count": len(trace.get("doc_ids", [])),
+            "rag.context_tokens": trace.get("context_tokens"),
+        })
+        return context
+
+
+def _retrieve_and_format(query, rag_system, order_by_id, trace, session_id):
+    timings = trace.setdefault("timings", {})
     try:
-        docs, search_type = rag_system.conditional_retrieve(query)
+        if session_id is not None:
+            docs, search_type = rag_system.retrieve_for_session(query, session_id, timings)
+        else:
+            docs, search_type = rag_system.conditional_retrieve(query, timings)
         
         if not isinstance(docs, list):
             return f"검색 결과 형식 오류: {type(docs)}"
         
-        return format_docs_optimized(docs, search_type)
+        trace["search_type"] = search_type
+        trace["doc_ids"] = [get_stable_doc_key(doc) for doc in docs]
+        trace["doc_classes"] = [classify_doc(doc.metadata) for doc in docs]
+        distances = [doc.metadata["distance"] for doc in docs if doc.metadata and "distance" in doc.metadata]
+        trace["top_distance"] = min(distances) if distances else None
+        
+        stage_start = time.perf_counter()
+        with tracer.span("rag.format", {"rag.search_type": search_type, "rag.doc_count": len(docs)}) as span:
+            if not CONTEXT_PACKING_ENABLED:
+                if order_by_id:
+                    docs = sorted(docs, key=get_stable_doc_key)
+                context = format_docs_optimized(docs, search_type)
+                timings["format"] = time.perf_counter() - stage_start
+                return context
+            
+            context, stats = pack_context(docs, order_by_id=order_by_id)
+            span.set_attributes({
+                "rag.context_tokens": stats["context_tokens"],
+                "rag.docs_packed": stats["docs_packed"],
+                "rag.docs_trimmed": stats["docs_trimmed"],
+            })
+        timings["format"] = time.perf_counter() - stage_start
+        trace["context_tokens"] = stats["context_tokens"]
+        rag_system.record_context_stats(stats)
+        print(f"🧮 참고자료 {stats['context_tokens']}/{stats['budget']} 토큰 "
+              f"(문서 {stats['docs_packed']}/{stats['docs_in']}개, 잘림 {stats['docs_trimmed']}개)")
+        return context
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"❌ 검색 오류: {e}")
         return f"검색 중 오류가 발생했습니다: {str(e)}"
@@ -0,0 +1,140 @@
+"""
+검색 CPU 단계 프로세스 풀 - 임베딩, 벡터 점수 계산, 변형 쿼리 융합, MMR을 워커 프로세스에서 실행
+
+Streamlit 요청 스레드에서는 GIL 때문에 동시 세션이 코어 하나를 나눠 쓰므로,
+워커마다 임베딩 모델을 따로 올리고 메모리 맵 인덱스(mmap_index.py)를 공유해 코어 수만큼 병렬로 검색합니다.
+워커 안에서는 토치 스레드를 제한해 프로세스끼리 코어를 두고 경쟁하지 않게 합니다.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from vector_search import encode_queries
+from diversifier import diversify_hits
+from query_expansion import fuse_variant_hits
+from mmap_index import MmapVectorIndex, index_exists
+from config import (
+    EMBEDDING_MODEL_NAME, DIVERSIFY_ENABLED, MMR_FETCH_K, MMR_LAMBDA,
+    RETRIEVAL_POOL_WORKERS, RETRIEVAL_POOL_TIMEOUT_SEC, RETRIEVAL_WORKER_TORCH_THREADS,
+    RETRIEVAL_POOL_MAX_RESTARTS,
+)
+
+
+def search_index(embedding_model, index, queries, k):
+    """변형 쿼리 배치 임베딩 → 인덱스 검색 → 융합 → 중복 제거 + MMR (SearchHit 목록)"""
+    query_vectors = encode_queries(embedding_model, queries)
+    fetch_k = max(MMR_FETCH_K, k) if DIVERSIFY_ENABLED else k
+    hits_per_variant = index.search(query_vectors, fetch_k)
+    if len(queries) > 1:
+        hits, relevance = fuse_variant_hits(hits_per_variant, fetch_k, with_scores=True)
+    else:
+        hits, relevance = hits_per_variant[0], None
+    if DIVERSIFY_ENABLED:
+        return diversify_hits(query_vectors[0], hits, k, MMR_LAMBDA, relevance)
+    return hits[:k]
+
+
+# 워커 프로세스 전역 상태 (initializer에서 한 번 로드)
+_worker_model = None
+_worker_indexes = {}
+
+
+def _init_worker(model_name, index_dirs, torch_threads):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(torch_threads)
+    _worker_model = SentenceTransformer(model_name)
+    for name, index_dir in index_dirs.items():
+        _worker_indexes[name] = MmapVectorIndex(index_dir)
+
+
+def _worker_search(index_name, queries, k):
+    return search_index(_worker_model, _worker_indexes[index_name], queries, k)
+
+
+def _worker_ping():
+    return sorted(_worker_indexes)
+
+
+class RetrievalProcessPool:
+    """인덱스 이름("legal"/"news")별 검색을 워커 프로세스에 분배
+
+    워커가 죽어 풀이 깨지면(BrokenProcessPool) 그동안은 has_index가 False가 되어 요청 스레드 검색으로 넘어가고,
+    백그라운드에서 풀을 다시 띄움 (RETRIEVAL_POOL_MAX_RESTARTS번까지, 넘으면 계속 꺼둠)
+    """
+
+    def __init__(self, index_dirs, workers=RETRIEVAL_POOL_WORKERS, model_name=EMBEDDING_MODEL_NAME,
+                 timeout=RETRIEVAL_POOL_TIMEOUT_SEC, torch_threads=RETRIEVAL_WORKER_TORCH_THREADS,
+                 max_restarts=RETRIEVAL_POOL_MAX_RESTARTS):
+        self.index_dirs = {name: path for name, path in index_dirs.items() if index_exists(path)}
+        self.workers = workers
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._initargs = (model_name, self.index_dirs, torch_threads)
+        self._lock = threading.Lock()
+        self._executor = self._start_executor()
+        self._available = True
+        print(f"✅ 검색 프로세스 풀 준비 완료: 워커 {workers}개, 인덱스 {', '.join(self.index_dirs)}")
+
+    def _start_executor(self):
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=self._initargs,
+        )
+        # 모든 워커를 미리 띄워 첫 요청이 모델 로딩을 기다리지 않게 함
+        try:
+            for future in [executor.submit(_worker_ping) for _ in range(self.workers)]:
+                future.result()
+        except Exception:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        return executor
+
+    def has_index(self, index_name):
+        return self._available and index_name in self.index_dirs
+
+    def search(self, index_name, queries, k):
+        """워커에서 검색한 SearchHit 목록 (시간 초과 시 TimeoutError, 풀이 깨졌으면 BrokenProcessPool)"""
+        executor = self._executor
+        try:
+            future = executor.submit(_worker_search, index_name, list(queries), k)
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._handle_broken(executor)
+            raise
+
+    def _handle_broken(self, executor):
+        """깨진 풀을 내리고 (횟수가 남았으면) 백그라운드에서 다시 띄움 - 여러 요청이 동시에 알아도 한 번만"""
+        with self._lock:
+            if executor is not self._executor or not self._available:
+                return
+            self._available = False
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self.restarts >= self.max_restarts:
+                print(f"❌ 검색 프로세스 풀이 {self.restarts}번 재시작 후에도 깨져 끕니다 (요청 스레드에서 검색)")
+                return
+            self.restarts += 1
+        print(f"⚠️ 검색 프로세스 풀 워커 종료 감지 - 재시작 {self.restarts}/{self.max_restarts} (그동안 요청 스레드에서 검색)")
+        threading.Thread(target=self._restart, daemon=True).start()
+
+    def _restart(self):
+        try:
+            executor = self._start_executor()
+        except Exception as e:
+            print(f"❌ 검색 프로세스 풀 재시작 실패, 요청 스레드에서 검색: {e}")
+            return
+        with self._lock:
+            self._executor = executor
+            self._available = True
+        print("✅ 검색 프로세스 풀 재시작 완료")
+
+    def close(self):
+        with self._lock:
+            self._available = False
+            self._executor.shutdown(wait=False, cancel_futures=True)
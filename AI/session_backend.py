@@ -0,0 +1,335 @@
+"""
+여러 워커가 공유하는 세션 대화 기록 백엔드 - SQLite(WAL) / Redis 호환 저장소
+
+워커 프로세스 어디로 요청이 가도 같은 기록을 읽으므로 스티키 세션 없이 수평 확장할 수 있고,
+워커가 재시작돼도 대화 맥락이 유지됩니다. 메시지는 짧은 JSON 배열로 직렬화하고
+한 턴의 질문/답변은 한 번의 쓰기로 추가합니다.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, message_to_dict, messages_from_dict
+
+from session_store import SessionHistoryStore
+from config import (
+    SESSION_BACKEND, SESSION_DB_PATH, SESSION_REDIS_URL, SESSION_PERSIST_TTL_SEC, SESSION_SWEEP_INTERVAL_SEC,
+)
+
+
+# 자주 쓰는 메시지 유형은 한 글자 코드로 저장
+_TYPE_CODES = {"human": "h", "ai": "a", "system": "s"}
+_MESSAGE_CLASSES = {"h": HumanMessage, "a": AIMessage, "s": SystemMessage}
+
+
+def encode_message(message):
+    """[코드, 내용] 또는 [코드, 내용, id] - 그 외 메시지는 LangChain dict 그대로"""
+    code = _TYPE_CODES.get(message.type)
+    if code is not None and isinstance(message.content, str) and not message.additional_kwargs:
+        row = [code, message.content] + ([message.id] if message.id else [])
+    else:
+        row = ["x", message_to_dict(message)]
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_message(raw):
+    row = json.loads(raw)
+    if row[0] == "x":
+        return messages_from_dict([row[1]])[0]
+    return _MESSAGE_CLASSES[row[0]](content=row[1], id=row[2] if len(row) > 2 else None)
+
+
+def same_messages(stored, expected):
+    """유형/내용이 같은 메시지 목록인지 (백엔드는 읽을 때마다 새 객체를 만들므로 값으로 비교)"""
+    return len(stored) == len(expected) and all(
+        (a.type, a.content) == (b.type, b.content) for a, b in zip(stored, expected)
+    )
+
+
+class SQLiteSessionBackend:
+    """SQLite(WAL) 세션 기록 - 같은 파일을 여러 워커 프로세스가 공유"""
+
+    def __init__(self, path=SESSION_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                body TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, seq)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions (updated_at)")
+        conn.commit()
+
+    def _connect(self):
+        # sqlite3 연결은 스레드 간 공유하지 않음
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        rows = self._connect().execute(
+            "SELECT body FROM chat_messages WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [decode_message(body) for (body,) in rows]
+
+    def _touch(self, conn, session_id):
+        conn.execute(
+            "INSERT INTO chat_sessions (session_id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, time.time()),
+        )
+
+    def append(self, session_id, messages):
+        """메시지 묶음을 한 트랜잭션으로 추가"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO chat_messages (session_id, body) VALUES (?, ?)",
+                [(session_id, encode_message(m)) for m in messages],
+            )
+            self._touch(conn, session_id)
+
+    def replace(self, session_id, messages):
+        """기록 전체 교체 (요약 압축/상한 잘라내기)"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            conn.executemany(
+                "INSERT INTO chat_messages (session_id, body) VALUES (?, ?)",
+                [(session_id, encode_message(m)) for m in messages],
+            )
+            self._touch(conn, session_id)
+
+    def replace_prefix(self, session_id, expected, messages):
+        """기록 앞부분이 아직 expected이면 그 부분만 messages로 교체 (비교와 교체를 한 트랜잭션에서)
+
+        그 뒤에 다른 워커가 추가한 메시지는 그대로 두고, 앞부분이 바뀌었으면 아무것도 하지 않고 False.
+        messages는 expected보다 길 수 없음 (접힌 행의 seq를 다시 써서 순서를 유지).
+        """
+        if len(messages) > len(expected):
+            raise ValueError("교체할 메시지가 기존 앞부분보다 많음")
+        if not expected:
+            return True
+        conn = self._connect()
+        # 읽기부터 쓰기 잠금을 잡아 다른 워커의 교체/잘라내기가 끼어들지 못하게 함
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT seq, body FROM chat_messages WHERE session_id = ? ORDER BY seq LIMIT ?",
+                (session_id, len(expected)),
+            ).fetchall()
+            if not same_messages([decode_message(body) for _, body in rows], expected):
+                conn.rollback()
+                return False
+            seqs = [seq for seq, _ in rows]
+            conn.executemany(
+                "UPDATE chat_messages SET body = ? WHERE seq = ?",
+                [(encode_message(m), seq) for m, seq in zip(messages, seqs)],
+            )
+            conn.execute(
+                "DELETE FROM chat_messages WHERE session_id = ? AND seq > ? AND seq <= ?",
+                (session_id, seqs[len(messages) - 1] if messages else -1, seqs[-1]),
+            )
+            self._touch(conn, session_id)
+            conn.commit()
+            return True
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def exists(self, session_id):
+        return self._connect().execute(
+            "SELECT 1 FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone() is not None
+
+    def prune(self, ttl):
+        """ttl초 넘게 쓰지 않은 세션 삭제"""
+        cutoff = time.time() - ttl
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM chat_messages WHERE session_id IN "
+                "(SELECT session_id FROM chat_sessions WHERE updated_at < ?)", (cutoff,)
+            )
+            deleted = conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        return deleted
+
+    def gauges(self):
+        conn = self._connect()
+        sessions = conn.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+        approx_bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM chat_messages").fetchone()[0]
+        return {"sessions": sessions, "approx_bytes": approx_bytes}
+
+
+class RedisSessionBackend:
+    """Redis 호환 저장소 - 세션마다 리스트 하나, 만료 시간으로 유휴 세션 정리"""
+
+    def __init__(self, url=SESSION_REDIS_URL, ttl=SESSION_PERSIST_TTL_SEC, prefix="chat:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def _key(self, session_id):
+        return f"{self.prefix}{session_id}"
+
+    def load(self, session_id):
+        return [decode_message(raw) for raw in self.client.lrange(self._key(session_id), 0, -1)]
+
+    def append(self, session_id, messages):
+        key = self._key(session_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(key, *[encode_message(m) for m in messages])
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def replace(self, session_id, messages):
+        key = self._key(session_id)
+        pipe = self.client.pipeline()  # MULTI/EXEC로 원자적 교체
+        pipe.delete(key)
+        if messages:
+            pipe.rpush(key, *[encode_message(m) for m in messages])
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def replace_prefix(self, session_id, expected, messages, retries=3):
+        """기록 앞부분이 아직 expected이면 그 부분만 messages로 교체 (WATCH/MULTI - 그사이 키가 바뀌면 다시 비교)"""
+        import redis
+
+        if not expected:
+            return True
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            for _ in range(retries):
+                try:
+                    pipe.watch(key)
+                    stored = [decode_message(raw) for raw in pipe.lrange(key, 0, len(expected) - 1)]
+                    if not same_messages(stored, expected):
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.ltrim(key, len(expected), -1)
+                    if messages:
+                        pipe.lpush(key, *[encode_message(m) for m in reversed(messages)])
+                    pipe.expire(key, self.ttl)
+                    pipe.execute()
+                    return True
+                except redis.WatchError:
+                    continue  # 다른 워커가 메시지를 추가함 - 앞부분은 그대로일 수 있으니 다시 비교
+        return False
+
+    def exists(self, session_id):
+        return bool(self.client.exists(self._key(session_id)))
+
+    def prune(self, ttl):
+        return 0  # 키 만료로 정리됨
+
+    def gauges(self):
+        sessions = sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}*", count=1000))
+        return {"sessions": sessions, "approx_bytes": None}
+
+
+class BackendChatMessageHistory(BaseChatMessageHistory):
+    """RunnableWithMessageHistory용 기록 - 읽을 때마다 백엔드에서 로드, 추가는 묶음 쓰기"""
+
+    def __init__(self, session_id, backend):
+        self.session_id = session_id
+        self.backend = backend
+
+    @property
+    def messages(self):
+        return self.backend.load(self.session_id)
+
+    @messages.setter
+    def messages(self, messages):
+        self.backend.replace(self.session_id, list(messages))
+
+    def add_messages(self, messages):
+        messages = list(messages)
+        if messages:
+            self.backend.append(self.session_id, messages)
+
+    def replace_prefix(self, expected, messages):
+        return self.backend.replace_prefix(self.session_id, list(expected), list(messages))
+
+    def add_message(self, message):
+        self.add_messages([message])
+
+    def clear(self):
+        self.backend.replace(self.session_id, [])
+
+
+class SharedSessionStore:
+    """공유 백엔드용 세션 저장소 - 메모리 저장소(SessionHistoryStore)와 같은 인터페이스"""
+
+    def __init__(self, backend, ttl=SESSION_PERSIST_TTL_SEC, sweep_interval=SESSION_SWEEP_INTERVAL_SEC):
+        self.backend = backend
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self.evicted = {"ttl": 0, "lru": 0}
+        self._gauges = None  # (측정 시각, 값) - 상태 패널이 주기적으로 읽으므로 전체 집계는 잠시 재사용
+        self.gauges_ttl = 5.0
+
+    def get(self, session_id):
+        return BackendChatMessageHistory(session_id, self.backend)
+
+    def peek(self, session_id):
+        return self.get(session_id) if self.backend.exists(session_id) else None
+
+    def refresh(self, session_id):
+        """유휴 세션 정리는 주기적으로만 (여러 워커가 돌려도 결과는 같음)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        deleted = self.backend.prune(self.ttl)
+        with self._lock:
+            self.evicted["ttl"] += deleted
+
+    def __contains__(self, session_id):
+        return self.backend.exists(session_id)
+
+    def gauges(self):
+        now = time.monotonic()
+        cached = self._gauges
+        if cached is None or now - cached[0] > self.gauges_ttl:
+            cached = self._gauges = (now, self.backend.gauges())
+        return {**cached[1], "evicted_ttl": self.evicted["ttl"], "evicted_lru": 0}
+
+
+def create_session_store():
+    """설정에 맞는 세션 저장소 생성 (redis 연결 실패 시 로컬 SQLite로 대체)"""
+    if SESSION_BACKEND == "redis":
+        try:
+            return SharedSessionStore(RedisSessionBackend())
+        except Exception as e:
+            print(f"⚠️ Redis 세션 백엔드 연결 실패, 로컬 SQLite 사용: {e}")
+            return SharedSessionStore(SQLiteSessionBackend())
+    if SESSION_BACKEND == "sqlite":
+        try:
+            return SharedSessionStore(SQLiteSessionBackend())
+        except sqlite3.Error as e:
+            print(f"⚠️ SQLite 세션 백엔드 열기 실패, 메모리 저장소 사용: {e}")
+    return SessionHistoryStore()
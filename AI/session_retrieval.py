@@ -0,0 +1,109 @@
+"""
+세션별 검색 컨텍스트 재사용 - 후속 질문 감지
+
+직전 턴의 질문 벡터와 검색 문서를 세션마다 기억해 두고,
+"그럼 그 판례에서는?" 같은 후속 질문이면 이전 문서를 재정렬해 그대로 쓰거나(reuse)
+GPT 변환 없이 좁은 검색만 더해(narrow) 중복 검색/변환 비용을 줄입니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from vector_search import encode_queries, lookup_doc_vector
+from admission_control import embed_pool
+from config import (
+    FOLLOWUP_CUES, FOLLOWUP_MAX_CHARS, FOLLOWUP_MIN_SIMILARITY, FOLLOWUP_REUSE_SIMILARITY, FOLLOWUP_NARROW_SIMILARITY,
+    FOLLOWUP_CONTEXT_TTL_SEC, SESSION_RETRIEVAL_MAX_SESSIONS,
+)
+
+
+class RetrievalContext(NamedTuple):
+    """세션의 직전 검색 결과"""
+    query: str
+    query_vector: np.ndarray
+    docs: list
+    search_type: str
+    updated_at: float
+
+
+def has_followup_cue(query):
+    return any(cue in query for cue in FOLLOWUP_CUES)
+
+
+def rerank_docs(docs, query_vector):
+    """저장 벡터가 있는 문서는 새 질문과의 유사도 순, 없는 문서는 원래 순서로 뒤에
+
+    metadata["distance"]도 새 질문 기준으로 다시 계산 (검색과 같은 제곱 L2, 라우팅 특징용) - 벡터가 없으면 지움
+    """
+    scored = []
+    rest = []
+    for doc in docs:
+        vector = lookup_doc_vector(doc)
+        if vector is None:
+            if doc.metadata:
+                doc.metadata.pop("distance", None)
+            rest.append(doc)
+        else:
+            doc.metadata["distance"] = float(np.sum((vector - query_vector) ** 2))
+            scored.append((float(np.dot(vector, query_vector)), doc))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [doc for _, doc in scored] + rest
+
+
+class SessionRetrievalCache:
+    """세션별 직전 검색 컨텍스트 (세션 수 상한 LRU + TTL)"""
+
+    def __init__(self, embedding_model, max_sessions=SESSION_RETRIEVAL_MAX_SESSIONS, ttl=FOLLOWUP_CONTEXT_TTL_SEC):
+        self.embedding_model = embedding_model
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"new": 0, "reuse": 0, "narrow": 0}
+
+    def _get(self, session_id):
+        with self._lock:
+            context = self._contexts.get(session_id)
+            if context is not None and time.monotonic() - context.updated_at > self.ttl:
+                del self._contexts[session_id]
+                return None
+            return context
+
+    def classify(self, session_id, query, known_vectors=None):
+        """(모드, 질문 벡터, 직전 컨텍스트, 유사도) - 모드: new / reuse / narrow
+
+        직전 컨텍스트가 없으면 임베딩하지 않고 ("new", None, None, None) - 벡터는 검색에서 만든 것을 씀
+        known_vectors: encode_queries의 known (이어지는 검색이 같은 질문을 다시 임베딩하지 않게)
+        """
+        previous = self._get(session_id)
+        if previous is None:
+            return "new", None, None, None
+
+        with embed_pool.slot():
+            query_vector = encode_queries(self.embedding_model, [query], known=known_vectors)[0]
+
+        similarity = float(np.dot(query_vector, previous.query_vector))
+        cue = has_followup_cue(query)
+        short_followup = cue and len(query.strip()) <= FOLLOWUP_MAX_CHARS and similarity >= FOLLOWUP_MIN_SIMILARITY
+        if short_followup or similarity >= FOLLOWUP_REUSE_SIMILARITY:
+            mode = "reuse"
+        elif cue or similarity >= FOLLOWUP_NARROW_SIMILARITY:
+            mode = "narrow"
+        else:
+            mode = "new"
+        return mode, query_vector, previous, similarity
+
+    def remember(self, session_id, mode, query, query_vector, docs, search_type):
+        with self._lock:
+            self.counters[mode] += 1
+            self._contexts[session_id] = RetrievalContext(query, query_vector, docs, search_type, time.monotonic())
+            self._contexts.move_to_end(session_id)
+            while len(self._contexts) > self.max_sessions:
+                self._contexts.popitem(last=False)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._contexts.pop(session_id, None)
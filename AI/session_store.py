@@ -0,0 +1,127 @@
+"""
+세션 대화 기록 저장소 - 유휴 TTL, 세션 수/메모리 상한 LRU 축출, 스레드 안전
+
+브라우저 탭마다 새 session_id가 생기므로 오래 쓰지 않은 세션은 정리해
+프로세스 메모리가 재시작 전까지 계속 늘어나지 않게 합니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+
+from config import (
+    SESSION_IDLE_TTL_SEC, SESSION_STORE_MAX_SESSIONS, SESSION_STORE_MAX_BYTES, SESSION_SWEEP_INTERVAL_SEC,
+)
+
+
+MESSAGE_OVERHEAD_BYTES = 200  # 메시지 객체 자체의 대략적인 크기
+
+
+def estimate_history_bytes(history):
+    total = 0
+    for message in history.messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        total += len(content.encode("utf-8")) + MESSAGE_OVERHEAD_BYTES
+    return total
+
+
+class SessionHistoryStore:
+    """session_id → 대화 기록 (최근 사용 순)"""
+
+    def __init__(self, ttl=SESSION_IDLE_TTL_SEC, max_sessions=SESSION_STORE_MAX_SESSIONS,
+                 max_bytes=SESSION_STORE_MAX_BYTES, sweep_interval=SESSION_SWEEP_INTERVAL_SEC,
+                 history_factory=ChatMessageHistory):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.history_factory = history_factory
+        # session_id → [history, 마지막 사용 시각, 추정 바이트]
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        self.evicted = {"ttl": 0, "lru": 0}
+
+    def get(self, session_id):
+        """세션 기록 반환 (없으면 생성) - 호출할 때마다 최근 사용으로 갱신"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = [self.history_factory(), now, 0]
+                self._entries[session_id] = entry
+            else:
+                self._entries.move_to_end(session_id)
+                entry[1] = now
+                # 기록은 체인이 바깥에서 추가하므로 크기는 사용할 때마다 다시 잼
+                self._resize(entry)
+            self._evict(now)
+            return entry[0]
+
+    def peek(self, session_id):
+        """최근 사용 시각을 바꾸지 않고 조회 (없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return entry[0] if entry is not None else None
+
+    def refresh(self, session_id):
+        """턴이 끝난 뒤 호출 - 추가된 메시지를 크기에 반영하고 상한 확인"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._resize(entry)
+                self._evict(time.monotonic())
+
+    def pop(self, session_id):
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._total_bytes -= entry[2]
+                return entry[0]
+            return None
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _resize(self, entry):
+        size = estimate_history_bytes(entry[0])
+        self._total_bytes += size - entry[2]
+        entry[2] = size
+
+    def _evict(self, now):
+        # 유휴 세션 정리는 주기적으로만 (가장 오래된 것부터 보므로 만료 안 된 항목에서 멈춤)
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            while self._entries:
+                session_id, entry = next(iter(self._entries.items()))
+                if now - entry[1] <= self.ttl:
+                    break
+                self._drop(session_id, "ttl")
+
+        # 상한 초과 시 가장 오래 쓰지 않은 세션부터 (방금 사용한 세션은 남김)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_sessions or self._total_bytes > self.max_bytes
+        ):
+            self._drop(next(iter(self._entries)), "lru")
+
+    def _drop(self, session_id, reason):
+        entry = self._entries.pop(session_id)
+        self._total_bytes -= entry[2]
+        self.evicted[reason] += 1
+
+    def gauges(self):
+        """세션 수, 추정 메모리(바이트), 축출 누계"""
+        with self._lock:
+            return {
+                "sessions": len(self._entries),
+                "approx_bytes": self._total_bytes,
+                "evicted_ttl": self.evicted["ttl"],
+                "evicted_lru": self.evicted["lru"],
+            }
@@ -0,0 +1,263 @@
+"""
+샤딩된 법률 DB 분산 검색 (scatter-gather)
+
+샤드마다 별도 워커 프로세스가 Chroma 컬렉션을 열어 두고,
+조정자(coordinator)는 쿼리 벡터를 모든 샤드에 동시에 보낸 뒤
+샤드별 타임아웃 안에 도착한 결과만 모아 전역 top-k로 병합합니다.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from vector_search import SearchHit
+
+
+SHARD_MANIFEST = "shard.json"
+
+
+def discover_shards(shard_root):
+    """샤드 루트 아래에서 매니페스트가 있는 샤드 디렉토리 목록 반환"""
+    if not shard_root or not os.path.isdir(shard_root):
+        return []
+    return sorted(
+        os.path.join(shard_root, name)
+        for name in os.listdir(shard_root)
+        if os.path.exists(os.path.join(shard_root, name, SHARD_MANIFEST))
+    )
+
+
+def read_shard_manifest(shard_dir):
+    with open(os.path.join(shard_dir, SHARD_MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _shard_worker(shard_dir, request_queue, response_queue):
+    """샤드 워커 프로세스 - 요청 큐에서 쿼리 벡터를 받아 검색 결과를 돌려줌"""
+    try:
+        import chromadb
+
+        manifest = read_shard_manifest(shard_dir)
+        client = chromadb.PersistentClient(path=shard_dir)
+        collection = client.get_collection(manifest["collection"])
+        shard_name = manifest.get("key", os.path.basename(shard_dir))
+    except Exception as e:
+        # 기동 실패는 바로 알려 조정자가 시간 초과까지 기다리지 않게 함
+        response_queue.put(("failed", shard_dir, f"{type(e).__name__}: {e}"))
+        return
+
+    response_queue.put(("ready", shard_dir, shard_name))
+
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+
+        request_id, query_vectors, k, where = request
+        try:
+            kwargs = {
+                "query_embeddings": query_vectors,
+                "n_results": k,
+                "include": ["documents", "metadatas", "distances", "embeddings"],
+            }
+            if where:
+                kwargs["where"] = where
+            result = collection.query(**kwargs)
+            payload = {
+                "ids": result["ids"],
+                "documents": result["documents"],
+                "metadatas": result["metadatas"],
+                "distances": result["distances"],
+                "embeddings": [np.asarray(e, dtype=np.float32) for e in result["embeddings"]],
+            }
+            response_queue.put((request_id, shard_name, payload))
+        except Exception as e:
+            response_queue.put((request_id, shard_name, {"error": str(e)}))
+
+
+class ShardedLegalSearcher:
+    """샤드 워커 프로세스 풀과 scatter-gather 검색"""
+
+    def __init__(self, shard_dirs, timeout=2.0, startup_timeout=120.0):
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._response_queue = self._context.Queue()
+        self._request_queues = {}
+        self._processes = {}
+        self._shard_names = {}
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self.timeout_count = 0
+
+        for shard_dir in shard_dirs:
+            request_queue = self._context.Queue()
+            process = self._context.Process(
+                target=_shard_worker,
+                args=(shard_dir, request_queue, self._response_queue),
+                daemon=True,
+            )
+            process.start()
+            self._request_queues[shard_dir] = request_queue
+            self._processes[shard_dir] = process
+
+        self._shard_names = self._wait_until_ready(startup_timeout)
+        if not self._shard_names:
+            self.close()
+            raise RuntimeError("준비된 샤드 워커가 없음")
+
+        # 응답 큐를 읽어 요청별 대기 큐로 분배하는 스레드
+        self._dispatcher = threading.Thread(target=self._dispatch_responses, daemon=True)
+        self._dispatcher.start()
+        print(f"✅ 법률 DB 샤드 {len(self._shard_names)}개 준비 완료: {', '.join(self.shard_names)}")
+
+    def _wait_until_ready(self, startup_timeout):
+        """샤드별 준비/실패 보고를 기다림 - 실패했거나 프로세스가 죽었거나 시간 안에 준비되지 않은 샤드는 제외
+
+        반환: 준비된 샤드 디렉토리 → 샤드 이름
+        """
+        ready = {}
+        waiting = set(self._processes)
+        deadline = time.monotonic() + startup_timeout
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for shard_dir in waiting:
+                    print(f"⚠️ 샤드 워커가 {startup_timeout:.0f}초 안에 준비되지 않아 제외: {shard_dir}")
+                break
+            try:
+                status, shard_dir, detail = self._response_queue.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                # 보고 없이 죽은 워커 (import 단계 크래시, OOM 등)
+                for shard_dir in [d for d in waiting if not self._processes[d].is_alive()]:
+                    print(f"⚠️ 샤드 워커 종료 (exitcode {self._processes[shard_dir].exitcode}), 제외: {shard_dir}")
+                    waiting.discard(shard_dir)
+                continue
+            if shard_dir not in waiting:
+                continue
+            waiting.discard(shard_dir)
+            if status == "ready":
+                ready[shard_dir] = detail
+            else:
+                print(f"⚠️ 샤드 워커 기동 실패, 제외: {shard_dir} - {detail}")
+
+        for shard_dir in [d for d in self._processes if d not in ready]:
+            self._remove_shard(shard_dir)
+        return ready
+
+    def _remove_shard(self, shard_dir):
+        """샤드를 scatter 대상에서 빼고 프로세스 정리"""
+        self._request_queues.pop(shard_dir, None)
+        self._shard_names.pop(shard_dir, None)
+        process = self._processes.pop(shard_dir, None)
+        if process is not None and process.is_alive():
+            process.terminate()
+
+    def _prune_dead_shards(self):
+        """검색 전에 프로세스가 죽은 샤드 제외 (매번 타임아웃까지 기다리지 않도록)"""
+        for shard_dir, process in list(self._processes.items()):
+            if not process.is_alive():
+                print(f"⚠️ 샤드 워커 종료 (exitcode {process.exitcode}), 제외: {self._shard_names.get(shard_dir, shard_dir)}")
+                self._remove_shard(shard_dir)
+
+    @property
+    def shard_names(self):
+        return list(self._shard_names.values())
+
+    @property
+    def available(self):
+        """살아 있는 샤드가 하나라도 있는지"""
+        return bool(self._request_queues)
+
+    def _dispatch_responses(self):
+        while True:
+            try:
+                request_id, shard_name, payload = self._response_queue.get()
+            except (EOFError, OSError):
+                return
+            with self._pending_lock:
+                waiter = self._pending.get(request_id)
+            # 타임아웃으로 이미 포기한 요청의 늦은 응답은 버림
+            if waiter is not None:
+                waiter.put((shard_name, payload))
+
+    def search(self, query_vectors, k, where=None):
+        """모든 샤드에 동시에 검색 요청 후 전역 top-k 병합 (쿼리 벡터별 SearchHit 목록)"""
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        self._prune_dead_shards()
+        request_id = next(self._request_ids)
+        waiter = queue.Queue()
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+
+        try:
+            # 다른 요청 스레드가 죽은 샤드를 빼는 중일 수 있으므로 복사본에 scatter
+            request_queues = list(self._request_queues.values())
+            for request_queue in request_queues:
+                request_queue.put((request_id, query_vectors.tolist(), k, where))
+
+            responses = {}
+            deadline = time.monotonic() + self.timeout
+            while len(responses) < len(request_queues):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    shard_name, payload = waiter.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                responses[shard_name] = payload
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+        missing = len(request_queues) - len(responses)
+        if missing:
+            self.timeout_count += 1
+            print(f"⚠️ 샤드 {missing}개 응답 시간 초과 ({self.timeout:.1f}초) - 도착한 결과만 병합")
+
+        return self._merge(responses, len(query_vectors), k)
+
+    @staticmethod
+    def _merge(responses, num_queries, k):
+        merged = [[] for _ in range(num_queries)]
+        for shard_name, payload in responses.items():
+            if "error" in payload:
+                print(f"⚠️ 샤드 {shard_name} 검색 오류: {payload['error']}")
+                continue
+            for i in range(num_queries):
+                metadatas = payload["metadatas"][i] or [{}] * len(payload["ids"][i])
+                for doc_id, text, meta, distance, vector in zip(
+                    payload["ids"][i], payload["documents"][i], metadatas,
+                    payload["distances"][i], payload["embeddings"][i],
+                ):
+                    meta = dict(meta or {})
+                    meta.setdefault("shard", shard_name)
+                    merged[i].append(SearchHit(
+                        doc=Document(id=doc_id, page_content=text or "", metadata=meta),
+                        distance=float(distance),
+                        vector=np.asarray(vector, dtype=np.float32),
+                    ))
+        return [sorted(hits, key=lambda h: h.distance)[:k] for hits in merged]
+
+    @property
+    def processes(self):
+        return dict(self._processes)
+
+    def close(self):
+        """워커 프로세스 종료"""
+        for request_queue in list(self._request_queues.values()):
+            try:
+                request_queue.put(None)
+            except (OSError, ValueError):
+                pass
+        for process in list(self._processes.values()):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
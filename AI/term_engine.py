@@ -0,0 +1,175 @@
+"""
+법률 용어 엔진 - Aho-Corasick 다중 패턴 자동자
+
+용어 매핑, 법률 지표어, 쿼리 확장 트리거를 하나의 자동자로 컴파일해
+쿼리를 한 번만 훑어서 탐지/치환/확장 조회를 모두 처리합니다.
+"""
+import functools
+from collections import deque
+from typing import NamedTuple
+
+from config import TERM_MAPPING, LEGAL_INDICATORS, QUERY_EXPANSION_RULES, NEWS_EXPANSION_TRIGGERS
+
+
+class TermMatch(NamedTuple):
+    """자동자 매칭 결과 (text[start:end] == term)"""
+    start: int
+    end: int
+    term: str
+    payload: object
+
+
+class TermAutomaton:
+    """Aho-Corasick 자동자 - {패턴: payload} 로 생성"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for term, payload in patterns.items():
+            if not term:
+                continue
+            node = 0
+            for ch in term:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][ch] = next_node
+                node = next_node
+            self._output[node].append((term, payload))
+
+        # BFS로 실패 링크 구성, 출력은 실패 링크를 따라 합쳐 둠
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                pending.append(child)
+
+        # 실패 전이를 미리 펼쳐 결정적 자동자(DFA)로 변환 - 스캔 시 문자당 dict 조회 1회
+        self._delta = [dict(edges) for edges in self._goto]
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, target in self._delta[self._fail[node]].items():
+                self._delta[node].setdefault(ch, target)
+            pending.extend(self._goto[node].values())
+
+    def find_all(self, text):
+        """겹치는 매칭을 포함해 모든 매칭을 끝 위치 순으로 반환"""
+        delta, output = self._delta, self._output
+        make_match = tuple.__new__
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            node = delta[node].get(ch, 0)
+            if output[node]:
+                for term, payload in output[node]:
+                    matches.append(make_match(TermMatch, (i + 1 - len(term), i + 1, term, payload)))
+        return matches
+
+
+def select_leftmost_longest(matches):
+    """겹치지 않는 leftmost-longest 매칭만 선택"""
+    selected = []
+    last_end = 0
+    for match in sorted(matches, key=lambda m: (m.start, m.start - m.end)):
+        if match.start >= last_end:
+            selected.append(match)
+            last_end = match.end
+    return selected
+
+
+class TermScan:
+    """쿼리 한 번 스캔한 결과 - 탐지/치환/확장 조회에 재사용"""
+
+    def __init__(self, text, matches):
+        self.text = text
+        self.matches = matches
+
+    def _with(self, tag):
+        return [m for m in self.matches if tag in m.payload]
+
+    def dictionary_terms(self):
+        """사전 용어(매핑/지표어/트리거)로 매칭된 용어 집합 - 확장 대체 용어 매칭은 제외"""
+        return {m.term for m in self.matches if set(m.payload) - {"expansion_target"}}
+
+    def has_legal_indicator(self):
+        return any("indicator" in m.payload for m in self.matches)
+
+    def has_news_trigger(self):
+        return any("news_trigger" in m.payload for m in self.matches)
+
+    def _splice(self, replacements):
+        """겹치지 않는 (매칭, 대체 문자열) 목록을 위치 기준으로 치환"""
+        parts = []
+        cursor = 0
+        for match, replacement in replacements:
+            parts.append(self.text[cursor:match.start])
+            parts.append(replacement)
+            cursor = match.end
+        parts.append(self.text[cursor:])
+        return "".join(parts)
+
+    def replace_terms(self):
+        """일상어 → 법률 용어 치환 (leftmost-longest, 치환 결과는 다시 치환하지 않음)"""
+        replacements = select_leftmost_longest(self._with("mapping"))
+        if not replacements:
+            return self.text
+        return self._splice([(match, match.payload["mapping"]) for match in replacements])
+
+    def _expansion_matches(self):
+        """확장 트리거 매칭 (leftmost-longest) - 이미 대체 용어 안에 있는 트리거(임대차보증금의 보증금)는 제외"""
+        candidates = [m for m in self.matches if "expansion" in m.payload or "expansion_target" in m.payload]
+        return [m for m in select_leftmost_longest(candidates) if "expansion" in m.payload]
+
+    def expansion_triggers(self):
+        """쿼리에 포함된 확장 트리거와 대체 용어 목록 (설정 순서)"""
+        found = {m.term: m.payload for m in self._expansion_matches()}
+        ordered = sorted(found.items(), key=lambda item: item[1]["expansion_order"])
+        return [(term, payload["expansion"]) for term, payload in ordered]
+
+    def expand(self, trigger, term):
+        """트리거가 선택된 위치만 대체 용어로 바꾼 쿼리"""
+        return self._splice([(m, term) for m in self._expansion_matches() if m.term == trigger])
+
+
+class LegalTermEngine:
+    """설정의 용어 사전을 하나의 자동자로 컴파일한 엔진"""
+
+    def __init__(self, term_mapping, legal_indicators, expansion_rules, news_triggers):
+        patterns = {}
+
+        def tag(term, key, value):
+            patterns.setdefault(term, {})[key] = value
+
+        for common_term, legal_term in term_mapping.items():
+            tag(common_term, "mapping", legal_term)
+        for term in legal_indicators:
+            tag(term, "indicator", True)
+        for order, (trigger, terms) in enumerate(expansion_rules.items()):
+            tag(trigger, "expansion", terms)
+            tag(trigger, "expansion_order", order)
+            for term in terms:
+                tag(term, "expansion_target", True)
+        for term in news_triggers:
+            tag(term, "news_trigger", True)
+
+        self.automaton = TermAutomaton(patterns)
+
+    def scan(self, text):
+        return TermScan(text, self.automaton.find_all(text))
+
+
+@functools.lru_cache(maxsize=1)
+def get_term_engine():
+    """설정 기반 용어 엔진 (프로세스당 한 번 컴파일)"""
+    return LegalTermEngine(TERM_MAPPING, LEGAL_INDICATORS, QUERY_EXPANSION_RULES, NEWS_EXPANSION_TRIGGERS)
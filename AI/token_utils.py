@@ -0,0 +1,29 @@
+"""
+토큰 수 계산 유틸리티
+"""
+import functools
+
+from config import OPENAI_MODEL
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken이 없으면 문자 수 기반 추정 사용
+    tiktoken = None
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoding(model_name):
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model_name: str = OPENAI_MODEL) -> int:
+    """로컬 토크나이저로 토큰 수 계산"""
+    if not text:
+        return 0
+    if tiktoken is None:
+        # 한글 위주 텍스트는 대략 1.5자당 1토큰
+        return int(len(text) / 1.5) + 1
+    return len(_get_encoding(model_name).encode(text))
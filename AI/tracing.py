@@ -0,0 +1,229 @@
+"""
+단계별 지연 추적 - 검색/답변 파이프라인 단계마다 스팬 하나를 남겨 로컬 파일로 내보내기
+
+형식: 한 줄에 OTLP/JSON ExportTraceServiceRequest 하나 (OpenTelemetry Collector file 익스포터와 같은 형태라
+otlpjsonfile 리시버로 Jaeger/Tempo 등에 그대로 넘길 수 있음). 집계는 python tools/trace_report.py.
+
+부모 스팬은 contextvars로 전달 - 스레드 풀에 넘길 때는 contextvars.copy_context().run으로 감싸야 이어짐.
+끝난 스팬은 큐에 넣고 백그라운드 스레드가 주기마다 모아 트레이스별로 한 줄씩 씀 (요청 스레드는 파일을 열지 않음).
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from jsonl_log import append_lines
+from config import (
+    TRACING_ENABLED, TRACE_EXPORT_PATH, TRACE_SERVICE_NAME, TRACE_FLUSH_INTERVAL_SEC, TRACE_QUEUE_MAX_SPANS,
+    TRACE_EXPORT_MAX_BYTES, TRACE_EXPORT_BACKUPS,
+)
+
+
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+SPAN_KIND_INTERNAL = 1
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _attribute_value(value):
+    """OTLP AnyValue 변환"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_attribute_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes):
+    return [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    """단계 하나 (시작/종료 시각, 속성, 상태)"""
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+        self.set_attributes(attributes or {})
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error):
+        self.status_code = STATUS_ERROR
+        self.status_message = str(error)
+        self.attributes["exception.type"] = type(error).__name__
+
+    def end(self):
+        """종료 시각 기록 후 내보내기 (두 번 호출해도 한 번만)"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.tracer.export(self)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self.attributes),
+            "status": {"code": self.status_code, "message": self.status_message} if self.status_message
+            else {"code": self.status_code},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """추적을 끈 경우 - 같은 인터페이스, 아무것도 기록하지 않음"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """스팬 생성 + OTLP/JSON 파일 내보내기 (프로세스당 하나, 여러 워커가 같은 파일에 줄 단위로 추가)"""
+
+    def __init__(self, path=TRACE_EXPORT_PATH, service_name=TRACE_SERVICE_NAME, enabled=TRACING_ENABLED,
+                 scope_name="switchon.rag", flush_interval=TRACE_FLUSH_INTERVAL_SEC, max_queue=TRACE_QUEUE_MAX_SPANS,
+                 max_bytes=TRACE_EXPORT_MAX_BYTES, backups=TRACE_EXPORT_BACKUPS):
+        self.path = path
+        self.enabled = enabled and bool(path)
+        self.service_name = service_name
+        self.scope_name = scope_name
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()        # 파일 쓰기 (백그라운드 스레드와 flush)
+        self._writer_lock = threading.Lock()
+        self._writer_pid = None              # 포크된 워커는 스레드를 새로 띄움
+        self._export_failed = False
+        self.dropped = 0
+        atexit.register(self.flush)
+
+    def start_span(self, name, attributes=None, parent=None):
+        """스팬 시작 (현재 스팬으로 지정하지 않음 - 생성기처럼 여러 번 나눠 실행되는 곳용)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        return Span(self, name, parent if isinstance(parent, Span) else None, attributes)
+
+    @contextmanager
+    def activate(self, span):
+        """이 블록 안에서 만든 스팬의 부모로 지정"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name, attributes=None):
+        """현재 스팬의 자식 스팬 - 블록이 끝나면 종료, 예외는 오류 상태로 기록 후 다시 발생"""
+        span = self.start_span(name, attributes)
+        with self.activate(span):
+            try:
+                yield span
+            except Exception as e:
+                span.record_error(e)
+                raise
+            finally:
+                span.end()
+
+    def export(self, span):
+        """끝난 스팬을 쓰기 큐에 넣음 (큐가 가득 차면 버리고 dropped 증가)"""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(span.to_otlp())
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._writer_pid == os.getpid():
+            return
+        with self._writer_lock:
+            if self._writer_pid != os.getpid():
+                threading.Thread(target=self._write_loop, name="trace-export", daemon=True).start()
+                self._writer_pid = os.getpid()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _drain(self):
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                return spans
+
+    def flush(self):
+        """쌓인 스팬을 트레이스별로 묶어 한 줄씩 쓰기 (파일이 상한을 넘으면 교체)"""
+        spans = self._drain()
+        if not spans:
+            return
+        traces = {}
+        for span in spans:
+            traces.setdefault(span["traceId"], []).append(span)
+        resource = {"attributes": _attributes({"service.name": self.service_name, "process.pid": os.getpid()})}
+        lines = [
+            json.dumps({
+                "resourceSpans": [{
+                    "resource": resource,
+                    "scopeSpans": [{"scope": {"name": self.scope_name}, "spans": trace_spans}],
+                }]
+            }, ensure_ascii=False) + "\n"
+            for trace_spans in traces.values()
+        ]
+        try:
+            with self._lock:
+                append_lines(self.path, lines, self.max_bytes, self.backups)
+        except OSError as e:
+            if not self._export_failed:
+                self._export_failed = True
+                print(f"⚠️ 추적 파일 쓰기 실패 (이후 실패는 생략): {e}")
+
+
+tracer = Tracer()
@@ -0,0 +1,92 @@
+"""
+벡터 검색 유틸리티 - 저장된 임베딩을 포함한 Chroma 조회
+"""
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import DOC_VECTOR_CACHE_SIZE
+
+
+class SearchHit(NamedTuple):
+    """검색 결과 한 건 (문서, 거리, 저장 벡터)"""
+    doc: Document
+    distance: float
+    vector: np.ndarray
+
+
+def encode_queries(embedding_model, queries, known=None):
+    """쿼리 목록을 한 번의 배치로 임베딩
+
+    known: 쿼리 → 벡터 dict (요청 하나 안에서 공유) - 이미 있는 쿼리는 다시 임베딩하지 않고, 새로 만든 벡터는 추가
+    """
+    queries = list(queries)
+    if known is None:
+        vectors = embedding_model.encode(
+            queries,
+            batch_size=max(len(queries), 1),
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+
+    missing = list(dict.fromkeys(q for q in queries if q not in known))
+    if missing:
+        known.update(zip(missing, encode_queries(embedding_model, missing)))
+    return np.stack([known[q] for q in queries])
+
+
+def query_with_vectors(db, query_vectors, k, where=None):
+    """쿼리 벡터별 검색 결과를 저장 벡터와 함께 반환 (다중 쿼리 1회 호출)"""
+    query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+    kwargs = {
+        "query_embeddings": query_vectors.tolist(),
+        "n_results": k,
+        "include": ["documents", "metadatas", "distances", "embeddings"],
+    }
+    if where:
+        kwargs["where"] = where
+    result = db._collection.query(**kwargs)
+
+    hits_per_query = []
+    for i in range(len(query_vectors)):
+        ids = result["ids"][i]
+        documents = result["documents"][i]
+        metadatas = result["metadatas"][i] or [{}] * len(ids)
+        distances = result["distances"][i]
+        embeddings = result["embeddings"][i]
+
+        hits = [
+            SearchHit(
+                doc=Document(id=doc_id, page_content=text or "", metadata=meta or {}),
+                distance=float(distance),
+                vector=np.asarray(embedding, dtype=np.float32),
+            )
+            for doc_id, text, meta, distance, embedding in zip(ids, documents, metadatas, distances, embeddings)
+        ]
+        hits_per_query.append(hits)
+    return hits_per_query
+
+
+# 검색된 문서의 저장 벡터 (문서 id → 벡터, LRU) - 후속 질문에서 다시 검색하지 않고 재정렬할 때 사용
+_doc_vectors = OrderedDict()
+_doc_vectors_lock = threading.Lock()
+
+
+def remember_doc_vectors(hits):
+    with _doc_vectors_lock:
+        for hit in hits:
+            if hit.doc.id:
+                _doc_vectors[hit.doc.id] = hit.vector
+                _doc_vectors.move_to_end(hit.doc.id)
+        while len(_doc_vectors) > DOC_VECTOR_CACHE_SIZE:
+            _doc_vectors.popitem(last=False)
+
+
+def lookup_doc_vector(doc):
+    """문서의 저장 벡터 (검색된 적 없으면 None)"""
+    with _doc_vectors_lock:
+        return _doc_vectors.get(doc.id) if doc.id else None
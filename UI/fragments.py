@@ -0,0 +1,78 @@
+"""
+조각(st.fragment) 단위 재실행과 턴별 스크립트 실행 지표
+
+FRAGMENT_RERUNS가 켜져 있으면 채팅 입력/상태 갱신은 해당 조각만 다시 실행하고,
+꺼져 있으면 기존처럼 전체 스크립트를 다시 실행 (같은 코드로 전후 비교).
+실행마다 범위("app"/"chat"/"status")별 횟수와 스크립트 스레드 CPU 시간을 세션에 쌓아 턴이 바뀔 때 출력.
+"""
+import functools
+import threading
+import time
+
+import streamlit as st
+
+from config import FRAGMENT_RERUNS, RUN_METRICS_LOG
+
+
+# 전체 실행 중에 호출된 조각은 따로 세지 않도록 스크립트 스레드별로 표시
+_active = threading.local()
+
+
+def _new_turn_metrics(turn):
+    return {"turn": turn, "runs": {}, "cpu": 0.0}
+
+
+def _record_run(scope, cpu_seconds):
+    metrics = st.session_state.setdefault("run_metrics", _new_turn_metrics(0))
+    metrics["runs"][scope] = metrics["runs"].get(scope, 0) + 1
+    metrics["cpu"] += cpu_seconds
+
+
+def track_run(scope):
+    """실행 한 번을 범위별로 세고 CPU 시간 누적 (st.rerun 예외로 끝나도 기록)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_active, "scope", None):
+                return func(*args, **kwargs)
+            _active.scope = scope
+            start_cpu = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _active.scope = None
+                _record_run(scope, time.thread_time() - start_cpu)
+        return wrapper
+    return decorator
+
+
+def fragment(scope, run_every=None):
+    """st.fragment + 실행 지표 (FRAGMENT_RERUNS가 꺼져 있으면 일반 함수)"""
+    def decorator(func):
+        tracked = track_run(scope)(func)
+        if not FRAGMENT_RERUNS:
+            return tracked
+        return st.fragment(tracked, run_every=run_every)
+    return decorator
+
+
+def in_app_run():
+    """전체 스크립트 실행 중인지 (조각만 다시 실행 중이면 False) - 전체 실행에서 읽은 값을 조각이 재사용할 때"""
+    return getattr(_active, "scope", None) == "app"
+
+
+def rerun_fragment():
+    """현재 조각만 다시 실행 (조각 모드가 아니거나 전체 실행 중이면 전체)"""
+    if FRAGMENT_RERUNS and not in_app_run():
+        st.rerun(scope="fragment")
+    st.rerun()
+
+
+def start_turn():
+    """새 질문 입력 시 호출 - 직전 턴의 실행 횟수/CPU 시간 출력 후 초기화"""
+    metrics = st.session_state.get("run_metrics") or _new_turn_metrics(0)
+    if RUN_METRICS_LOG and metrics["turn"] > 0:
+        runs = ", ".join(f"{scope} {count}회" for scope, count in sorted(metrics["runs"].items()))
+        mode = "조각" if FRAGMENT_RERUNS else "전체"
+        print(f"📈 턴 {metrics['turn']} ({mode} 재실행): 스크립트 실행 {runs}, CPU {metrics['cpu'] * 1000:.1f}ms")
+    st.session_state.run_metrics = _new_turn_metrics(metrics["turn"] + 1)
@@ -0,0 +1,43 @@
+"""
+정적 파일 매니페스트 - 해시 파일명으로 미리 만든 CSS/광고 이미지의 URL 조회
+
+manifest.json (tools/build_static_assets.py 생성):
+    {"css": "app.<해시>.css", "images": {"<원본 이미지 URL>": "ad.<해시>.webp"}}
+매니페스트가 없으면 None을 돌려주고 호출하는 쪽이 기존 방식(인라인 CSS, 원격 이미지)으로 출력.
+"""
+import json
+import os
+from functools import lru_cache
+
+from config import STATIC_MANIFEST_PATH, STATIC_BASE_URL, STREAMLIT_STATIC_URL
+
+
+@lru_cache(maxsize=1)
+def load_manifest():
+    """매니페스트 (프로세스당 한 번 읽음 - 다시 빌드하면 앱 재시작)"""
+    if not os.path.exists(STATIC_MANIFEST_PATH):
+        return {}
+    try:
+        with open(STATIC_MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 정적 파일 매니페스트 읽기 실패: {e}")
+        return {}
+
+
+def static_url(filename):
+    return f"{STATIC_BASE_URL.rstrip('/')}/{filename}"
+
+
+def css_url():
+    """해시 CSS 파일 URL (빌드 전이거나 text/css로 보내지 않는 Streamlit 정적 경로면 None)"""
+    if STATIC_BASE_URL.rstrip("/") == STREAMLIT_STATIC_URL:
+        return None
+    filename = load_manifest().get("css")
+    return static_url(filename) if filename else None
+
+
+def image_url(source_url):
+    """축소해 둔 로컬 이미지 URL (없으면 원본 URL)"""
+    filename = load_manifest().get("images", {}).get(source_url)
+    return static_url(filename) if filename else source_url
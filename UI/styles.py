@@ -3,11 +3,11 @@ Streamlit 커스텀 CSS 스타일 정의
 """
 import streamlit as st
 
+from static_assets import css_url
 
-def load_custom_css():
-    """커스텀 CSS 스타일 로드"""
-    st.markdown("""
-    <style>
+
+# tools/build_static_assets.py가 이 내용으로 app.<해시>.css 생성
+CUSTOM_CSS = """
     /* 전체 배경 */
     .stApp {
         background: linear-gradient(135deg, #f5f3ff 0%, #faf9ff 50%, #fffbeb 100%);
@@ -209,5 +209,13 @@ def load_custom_css():
         background: linear-gradient(90deg, transparent 0%, #c4b5fd 50%, transparent 100%);
         margin: 2rem 0;
     }
-    </style>
-    """, unsafe_allow_html=True)
+"""
+
+
+def load_custom_css():
+    """커스텀 CSS 스타일 로드 - 빌드된 CSS가 있으면 캐시되는 파일 링크만 출력"""
+    href = css_url()
+    if href:
+        st.markdown(f'<link rel="stylesheet" href="{href}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{CUSTOM_CSS}</style>", unsafe_allow_html=True)
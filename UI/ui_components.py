@@ -1,7 +1,10 @@
 """
 UI 컴포넌트 관리
 """
+import time
 import streamlit as st
+from config import EXAMPLE_QUESTIONS, WINDOWED_CHAT_RENDER, CHAT_VISIBLE_MESSAGES, FRAGMENT_RERUNS
+from fragments import rerun_fragment, start_turn
 
 
 def render_header():
@@ -18,7 +21,7 @@ def render_header():
 
 
 def render_sidebar():
-    """사이드바 렌더링"""
+    """사이드바 머리말 렌더링 (버튼은 render_sidebar_actions - 채팅 조각에서 사이드바에 그림)"""
     with st.sidebar:
         st.markdown("""
         <div style="text-align: center; padding: 1rem;">
@@ -26,32 +29,36 @@ def render_sidebar():
         </div>
         """, unsafe_allow_html=True)
         
-        example_questions = [
-            "전세사기 당했을 때 대처방법은?",
-            "보증금을 돌려받을 수 있을까요?",
-            "임차권등기명령이란 무엇인가요?",
-            "집주인이 등기이전을 안 해줄 때 어떻게 하나요?",
-            "집이 경매로 넘어갔을 때 전세보증금은 어떻게 되나요?"
-        ]
-        
-        for i, q in enumerate(example_questions):
+        return True
+
+
+def render_sidebar_actions():
+    """사이드바 예시 질문/기록 초기화 버튼 - 채팅 조각 안에서 호출하면 눌러도 채팅 조각만 다시 실행
+
+    조각 밖 컨테이너(st.sidebar)에 그린 위젯은 그린 조각을 다시 실행하므로, 메시지 목록보다 먼저 호출하면
+    같은 실행 안에서 예시 질문 답변/초기화가 반영됨
+    """
+    with st.sidebar:
+        for i, q in enumerate(EXAMPLE_QUESTIONS):
             if st.button(f" {q}", key=f"example_{i}", use_container_width=True):
+                start_turn()
                 st.session_state["sidebar_prompt"] = q
-                st.rerun()
+                if not FRAGMENT_RERUNS:
+                    st.rerun()
 
         st.markdown("<br>", unsafe_allow_html=True)
         
         if st.button("↻ 대화 기록 초기화", use_container_width=True, type="secondary"):
             st.session_state.chat_history = []
-            st.rerun()
+            st.session_state.pop("chat_visible_messages", None)
+            if not FRAGMENT_RERUNS:
+                st.rerun()
 
         st.markdown("<hr>", unsafe_allow_html=True)
-        
-        return True
 
 
-def render_system_status(system_ready, legal_db, news_db):
-    """시스템 상태 표시"""
+def render_system_status(system_ready, legal_db, news_db, admission=None, sessions=None):
+    """시스템 상태 표시 (admission: 수용 제어 풀 지표, sessions: 세션 저장소 지표)"""
     st.markdown("""
     <div class="sidebar-card" style="border: 2px solid #10b981; background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%);">
         <h4 style="color: #065f46; margin-bottom: 1rem;">📊 시스템 상태</h4>
@@ -74,6 +81,18 @@ def render_system_status(system_ready, legal_db, news_db):
     else:
         st.warning("⚠️ 뉴스 DB 미연결")
 
+    # 수용 제어 풀 상태 (실행 중 / 대기 중, 최근 대기 p95)
+    for name, metrics in (admission or {}).items():
+        p95_wait = metrics["p95_wait"] or 0.0
+        st.caption(f"🚦 {name}: 실행 {metrics['in_flight']}/{metrics['max_concurrency']}, "
+                   f"대기 {metrics['queue_depth']}건, 대기 p95 {p95_wait:.2f}초")
+
+    # 세션 저장소 크기 (Redis는 바이트 추정 없음)
+    if sessions:
+        size_text = "" if sessions.get("approx_bytes") is None else f", 약 {sessions['approx_bytes'] / 1024 / 1024:.1f}MB"
+        st.caption(f"🗂️ 세션 {sessions['sessions']}개{size_text}, "
+                   f"축출 TTL {sessions['evicted_ttl']} / LRU {sessions['evicted_lru']}")
+
 
 def render_service_info():
     """서비스 안내 정보"""
@@ -103,32 +122,116 @@ def render_disclaimer():
     """, unsafe_allow_html=True)
 
 
-def render_chat_messages(chat_history):
-    """채팅 메시지 렌더링"""
-    st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-
-    for message in chat_history:
-        if message["role"] == "user":
-            st.markdown(f"""
+def get_user_bubble_html(content):
+    """사용자 말풍선 HTML"""
+    return f"""
             <div class="user-message">
                 <div class="user-bubble">
-                    {message["content"]}
+                    {content}
                 </div>
             </div>
-            """, unsafe_allow_html=True)
+            """
 
-        elif message["role"] == "assistant":
-            st.markdown(f"""
+
+def get_ai_bubble_html(content):
+    """AI 말풍선 HTML"""
+    return f"""
             <div class="ai-message">
                 <div class="ai-bubble">
-                    {message["content"]}
+                    {content}
                 </div>
             </div>
-            """, unsafe_allow_html=True)
+            """
+
+
+def render_latency_caption(metrics):
+    """응답 지연 시간 표시 (첫 토큰 / 전체)"""
+    if not metrics:
+        return
+    if metrics.get("cached"):
+        st.caption("⚡ 미리 준비된 답변")
+    elif metrics.get("ttft") is not None:
+        st.caption(f"⚡ 첫 토큰 {metrics['ttft']:.2f}초 · 전체 {metrics['total']:.2f}초")
+    else:
+        st.caption(f"⏱️ 전체 {metrics['total']:.2f}초")
+
+
+def get_message_html(message):
+    """말풍선 HTML - 메시지에 저장해 두고 다시 그릴 때는 재사용"""
+    html = message.get("html")
+    if html is None:
+        if message["role"] == "user":
+            html = get_user_bubble_html(message["content"])
+        else:
+            html = get_ai_bubble_html(message["content"])
+        message["html"] = html
+    return html
+
+
+def window_chat_history(chat_history, on_expand=rerun_fragment):
+    """최근 CHAT_VISIBLE_MESSAGES개(펼친 만큼)만 남긴 목록 - 가려진 메시지가 있으면 "이전 대화 더 보기" 버튼 표시
+
+    다시 그릴 때마다 창 안의 메시지 전체를 다시 출력 (새 메시지만 덧붙이는 증분 렌더링이 아니라 창 크기로 비용 제한)
+    on_expand: 버튼을 눌러 창을 넓힌 뒤 다시 실행할 함수 (조각 밖에서는 st.rerun)
+    """
+    limit = st.session_state.get("chat_visible_messages", CHAT_VISIBLE_MESSAGES)
+    hidden = max(len(chat_history) - limit, 0)
+    if not hidden:
+        return chat_history
+    if st.button(f"⬆️ 이전 대화 {hidden}개 더 보기", key="chat_show_earlier", use_container_width=True):
+        st.session_state.chat_visible_messages = limit + CHAT_VISIBLE_MESSAGES
+        on_expand()
+    return chat_history[hidden:]
+
+
+def render_chat_messages(chat_history):
+    """채팅 메시지 렌더링 (WINDOWED_CHAT_RENDER: 최근 메시지 창만 - 대화가 길어져도 다시 그리는 비용 일정)"""
+    st.markdown('<div class="chat-container">', unsafe_allow_html=True)
+
+    visible = window_chat_history(chat_history) if WINDOWED_CHAT_RENDER else chat_history
+
+    for message in visible:
+        if message["role"] not in ("user", "assistant"):
+            continue
+        if WINDOWED_CHAT_RENDER:
+            html = get_message_html(message)
+        elif message["role"] == "user":
+            html = get_user_bubble_html(message["content"])
+        else:
+            html = get_ai_bubble_html(message["content"])
+        st.markdown(html, unsafe_allow_html=True)
+        if message["role"] == "assistant":
+            render_latency_caption(message.get("metrics"))
 
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+def render_streaming_answer(token_stream, start_time, render_interval=0.05):
+    """토큰 스트림을 AI 말풍선에 실시간 표시 - (최종 답변, 지연 지표) 반환"""
+    placeholder = st.empty()
+    placeholder.markdown(get_ai_bubble_html("🤖 판례를 검색하고 있습니다..."), unsafe_allow_html=True)
+
+    answer = ""
+    ttft = None
+    last_render = 0.0
+    for token in token_stream:
+        if not token:
+            continue
+        now = time.perf_counter()
+        if ttft is None:
+            ttft = now - start_time
+        answer += token
+        # 토큰마다 다시 그리지 않고 일정 간격으로만 갱신
+        if now - last_render >= render_interval:
+            placeholder.markdown(get_ai_bubble_html(answer + " ▌"), unsafe_allow_html=True)
+            last_render = now
+
+    placeholder.markdown(get_ai_bubble_html(answer), unsafe_allow_html=True)
+    metrics = {"ttft": ttft, "total": time.perf_counter() - start_time}
+    render_latency_caption(metrics)
+    return answer, metrics
+
+
 def render_chat_input():
     """채팅 입력 인터페이스"""
     st.markdown("""
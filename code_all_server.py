@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import functools
 import uuid
@@ -24,6 +25,11 @@ from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_openai import ChatOpenAI
 
+# 채팅 창 크기(CHAT_VISIBLE_MESSAGES)와 말풍선 도우미는 main.py와 같은 모듈 사용
+for _sub_dir in ("core", "UI"):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), _sub_dir))
+from ui_components import get_message_html, window_chat_history
+
 # 로그 레벨 감소
 logging.basicConfig(level=logging.WARNING)
 
@@ -1186,57 +1192,54 @@ def create_chat_chain_with_memory():
 
 import streamlit as st
 
-def display_ad_banner():
-    st.markdown("---")
-    st.markdown('<h5 style="color: #b45309;">✨ 추천 부동산 전문가</h5>', unsafe_allow_html=True)
+_AD_BANNER_HTML = None
 
-    ads = [
-        {
-            "img": "https://search.pstatic.net/common/?autoRotate=true&type=w560_sharpen&src=https%3A%2F%2Fldb-phinf.pstatic.net%2F20180518_269%2F1526627900915a2haI_PNG%2FDhZnKmpdc0bNIHMpMyeDLuUE.png",
-            "title": "🏢 대치래미안공인중개사사무소",
-            "phone": "0507-1408-0123",
-            "desc": "📍 서울 강남구 대치동",
-            "link": "https://naver.me/xslBVRJX"
-        },
-        {
-            "img": "https://search.pstatic.net/common/?src=https%3A%2F%2Fldb-phinf.pstatic.net%2F20250331_213%2F1743412607070OviNF_JPEG%2F1000049538.jpg",
-            "title": "🏡 메종공인중개사사무소",
-            "phone": "0507-1431-4203",
-            "desc": "🏠 전문 부동산 상담",
-            "link": "https://naver.me/IgJnnCcG"
-        },
-        {
-            "img": "https://search.pstatic.net/common/?autoRotate=true&type=w560_sharpen&src=https%3A%2F%2Fldb-phinf.pstatic.net%2F20200427_155%2F15879809374237E6dq_PNG%2FALH-zx7fy26wJg1T6EUOHC0W.png",
-            "title": "👑 로얄공인중개사사무소",
-            "phone": "02-569-8889",
-            "desc": "🌟 신뢰할 수 있는 거래",
-            "link": "https://naver.me/5GGPXQe8"
-        }
-    ]
 
-    for ad in ads:
-        st.markdown(f"""
-        <div style="
-            background-color: #fffbea;
-            border-radius: 15px;
-            padding: 15px;
-            margin-bottom: 20px;
-            box-shadow: 0 4px 10px rgba(0, 0, 0, 0.06);
-        ">
-            <div style="display: flex; align-items: center;">
-                <img src="{ad['img']}" style="width: 3cm; height: 2cm; object-fit: cover; border-radius: 8px; margin-right: 15px;" />
-                <div>
-                    <p style="margin-bottom: 5px; font-size: 16px; font-weight: 600;">{ad['title']}</p>
-                    <p style="margin: 0;">☎ <strong>{ad['phone']}</strong></p>
-                    <p style="margin: 0;">{ad['desc']}</p>
-                    <a href="{ad['link']}" target="_blank" style="color: #b45309; font-weight: bold;">🔗 바로가기</a>
-                </div>
-            </div>
+def display_ad_banner():
+    """광고 블록은 한 번만 만들어 요소 하나로 출력"""
+    global _AD_BANNER_HTML
+    if _AD_BANNER_HTML is None:
+        ads = [
+            {
+                "img": "https://search.pstatic.net/common/?autoRotate=true&type=w560_sharpen&src=https%3A%2F%2Fldb-phinf.pstatic.net%2F20180518_269%2F1526627900915a2haI_PNG%2FDhZnKmpdc0bNIHMpMyeDLuUE.png",
+                "title": "🏢 대치래미안공인중개사사무소",
+                "phone": "0507-1408-0123",
+                "desc": "📍 서울 강남구 대치동",
+                "link": "https://naver.me/xslBVRJX"
+            },
+            {
+                "img": "https://search.pstatic.net/common/?src=https%3A%2F%2Fldb-phinf.pstatic.net%2F20250331_213%2F1743412607070OviNF_JPEG%2F1000049538.jpg",
+                "title": "🏡 메종공인중개사사무소",
+                "phone": "0507-1431-4203",
+                "desc": "🏠 전문 부동산 상담",
+                "link": "https://naver.me/IgJnnCcG"
+            },
+            {
+                "img": "https://search.pstatic.net/common/?autoRotate=true&type=w560_sharpen&src=https%3A%2F%2Fldb-phinf.pstatic.net%2F20200427_155%2F15879809374237E6dq_PNG%2FALH-zx7fy26wJg1T6EUOHC0W.png",
+                "title": "👑 로얄공인중개사사무소",
+                "phone": "02-569-8889",
+                "desc": "🌟 신뢰할 수 있는 거래",
+                "link": "https://naver.me/5GGPXQe8"
+            }
+        ]
+        cards = "".join(f"""
+<div style="background-color: #fffbea; border-radius: 15px; padding: 15px; margin-bottom: 20px; box-shadow: 0 4px 10px rgba(0, 0, 0, 0.06);">
+    <div style="display: flex; align-items: center;">
+        <img src="{ad['img']}" style="width: 3cm; height: 2cm; object-fit: cover; border-radius: 8px; margin-right: 15px;" />
+        <div>
+            <p style="margin-bottom: 5px; font-size: 16px; font-weight: 600;">{ad['title']}</p>
+            <p style="margin: 0;">☎ <strong>{ad['phone']}</strong></p>
+            <p style="margin: 0;">{ad['desc']}</p>
+            <a href="{ad['link']}" target="_blank" style="color: #b45309; font-weight: bold;">🔗 바로가기</a>
         </div>
-        """, unsafe_allow_html=True)
-
-    st.markdown("---")
-    st.markdown("💡 **신뢰할 수 있는 부동산 전문가와 상담하세요**")
+    </div>
+</div>""" for ad in ads)
+        _AD_BANNER_HTML = f"""<hr>
+<h5 style="color: #b45309;">✨ 추천 부동산 전문가</h5>{cards}
+<hr>
+<p>💡 <strong>신뢰할 수 있는 부동산 전문가와 상담하세요</strong></p>
+"""
+    st.markdown(_AD_BANNER_HTML, unsafe_allow_html=True)
 
 
 
@@ -1299,6 +1302,7 @@ with st.sidebar:
     
     if st.button("↻ 대화 기록 초기화", use_container_width=True, type="secondary"):
         st.session_state.chat_history = []
+        st.session_state.pop("chat_visible_messages", None)
         st.rerun()
 
     st.markdown("<hr>", unsafe_allow_html=True)
@@ -1330,28 +1334,14 @@ with st.sidebar:
 # ——— 채팅 UI ———
 st.markdown('<div class="chat-container">', unsafe_allow_html=True)
 
-# 채팅 기록 표시
-for message in st.session_state.chat_history:
-    if message["role"] == "user":
-        st.markdown(f"""
-        <div class="user-message">
-            <div class="user-bubble">
-                {message["content"]}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    elif message["role"] == "assistant":
-        st.markdown(f"""
-        <div class="ai-message">
-            <div class="ai-bubble">
-                {message["content"]}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # AI 답변 후 광고 배너 표시
-        display_ad_banner()
+# 채팅 기록 표시 (말풍선 HTML은 메시지에 저장해 두고 재사용, 최근 메시지 창만 표시)
+for message in window_chat_history(st.session_state.chat_history, on_expand=st.rerun):
+    if message["role"] in ("user", "assistant"):
+        st.markdown(get_message_html(message), unsafe_allow_html=True)
+
+# 광고 배너는 마지막 AI 답변 뒤에 한 번만 표시
+if st.session_state.chat_history and st.session_state.chat_history[-1]["role"] == "assistant":
+    display_ad_banner()
 
 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -979,9 +979,10 @@ def main():
                 </div>
             </div>
             """, unsafe_allow_html=True)
-            
-            # AI 답변 후 광고 배너 표시
-            display_ad_banner()
+
+    # 광고 배너는 마지막 AI 답변 뒤에 한 번만 표시
+    if st.session_state.chat_history and st.session_state.chat_history[-1]["role"] == "assistant":
+        display_ad_banner()
 
     st.markdown('</div>', unsafe_allow_html=True)
 
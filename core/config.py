@@ -1,5 +1,6 @@
 # 설정 및 상수 관리
 import logging
+import os
 
 # 로그 레벨 설정
 logging.basicConfig(level=logging.WARNING)
@@ -16,8 +17,24 @@ EMBEDDING_MODEL_NAME = "snunlp/KR-SBERT-V40K-klueNLI-augSTS"
 # OpenAI 모델 설정
 OPENAI_MODEL = "gpt-4o"
 OPENAI_TEMPERATURE = 0.3
+# 로컬 OpenAI 호환 스텁 서버 (tools/openai_stub_server.py) - 부하/지연 테스트용
+LLM_STUB_ENABLED = os.getenv("LLM_STUB_ENABLED", "0") == "1"
+LLM_STUB_URL = os.getenv("LLM_STUB_URL", "http://127.0.0.1:8089/v1")
+if LLM_STUB_ENABLED:
+    os.environ.setdefault("OPENAI_API_KEY", "local-stub")  # 스텁은 키를 확인하지 않음
+
+# OpenAI 호환 엔드포인트 (비우면 OpenAI 기본 주소)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or (LLM_STUB_URL if LLM_STUB_ENABLED else None)
 MAX_TOKENS = 3000
 
+# 쿼리 변환 캐시 설정 (모델명/프롬프트 버전이 키에 포함되어 바뀌면 자동 무효화)
+CONVERSION_PROMPT_VERSION = "v1"
+CONVERSION_CACHE_BACKEND = "sqlite"  # "sqlite" (워커 간 공유) 또는 "memory"
+CONVERSION_CACHE_PATH = "query_conversion_cache.sqlite3"
+CONVERSION_CACHE_MAX_ENTRIES = 5000
+CONVERSION_CACHE_TOUCH_SEC = 60.0  # SQLite 적중 시 last_used_at이 이보다 오래됐을 때만 갱신(쓰기)
+CONVERSION_COST_PER_CALL_USD = 0.0026  # gpt-4o 변환 1회 추정 비용 (입력 ~250 + 출력 ~200 토큰)
+
 # 법률 용어 매핑
 TERM_MAPPING = {
     "집주인": "임대인", "세입자": "임차인", "전세금": "임대차보증금",
@@ -38,12 +55,194 @@ LEGAL_INDICATORS = [
     "법률", "판례", "법령", "소송", "계약서"
 ]
 
+# 쿼리 확장 규칙 (트리거 → 대체 용어, 변형 쿼리로 검색 후 결과 융합)
+QUERY_EXPANSION_RULES = {
+    "보증금": ["임대차보증금", "전세금"],
+    "집주인": ["임대인"],
+    "세입자": ["임차인"],
+    "월세": ["차임"],
+    "계약서": ["임대차계약서"],
+    "소송": ["민사소송", "소송절차"],
+    "손해배상": ["배상청구"],
+    "명도": ["명도청구", "퇴거"],
+    "깡통전세": ["전세사기"],
+    "사기": ["전세사기", "임대차사기", "보증금사기"],
+}
+NEWS_EXPANSION_TRIGGERS = ["전세", "부동산", "임대", "사기"]
+NEWS_EXPANSION_QUERY = "전세사기"
+MAX_QUERY_VARIANTS = 4  # 원본 포함
+QUERY_VARIANT_WEIGHT = 0.5  # 원본 쿼리 대비 변형 쿼리 가중치
+RRF_K = 60
+
+# 추측 검색 설정 (GPT 쿼리 변환과 원본 쿼리 검색을 동시에 실행)
+SPECULATIVE_RETRIEVAL = True
+GPT_CONVERSION_TIMEOUT_SEC = 1.5  # 검색 시작부터 변환 결과를 기다리는 최대 시간
+SPECULATIVE_MERGE_MODE = "merge"  # "merge": 변환/원본 결과 병합, "substitute": 변환 결과로 교체
+QUERY_CONVERSION_THREADS = 4      # GPT 변환 스레드 수 (다 차면 대기열에 쌓지 않고 원본 쿼리로만 검색)
+
 # 검색 설정
 LEGAL_SEARCH_K = 5
 NEWS_SEARCH_K = 4
 MAX_LEGAL_DOCS = 8
 MAX_NEWS_DOCS = 3
 
+# 검색 결과 다양화 설정 (원문 단위 중복 제거 + MMR)
+DIVERSIFY_ENABLED = True
+MMR_FETCH_K = 20
+MMR_LAMBDA = 0.7
+
+# 법률 DB 샤딩 설정 (샤드 디렉토리가 없으면 단일 컬렉션 사용)
+LEGAL_SHARD_ROOT = "chroma_db_law_shards"
+LEGAL_SHARD_BY = "doc_class"  # "doc_class" 또는 "year"
+SHARD_TIMEOUT_SEC = 2.0
+
+# 검색 CPU 단계 프로세스 풀 (워커마다 임베딩 모델 로드 + 메모리 맵 인덱스 공유)
+# 인덱스는 python tools/export_mmap_index.py 로 Chroma DB에서 내보냄 (없는 인덱스는 기존 스레드 내 검색)
+RETRIEVAL_PROCESS_POOL = os.getenv("RETRIEVAL_PROCESS_POOL", "0") == "1"
+RETRIEVAL_POOL_WORKERS = os.cpu_count() or 2
+RETRIEVAL_POOL_TIMEOUT_SEC = 10.0
+RETRIEVAL_POOL_MAX_RESTARTS = 3  # 워커가 죽어 풀이 깨졌을 때 다시 띄우는 최대 횟수
+RETRIEVAL_WORKER_TORCH_THREADS = 1  # 워커끼리 코어를 나눠 쓰도록 워커당 토치 스레드 수 제한
+MMAP_INDEX_DIRS = {
+    "legal": "chroma_db_law_real_final/mmap_index",
+    "news": "ja_chroma_db/mmap_index",
+}
+
+# 참고자료 토큰 예산 설정 (관련도 순으로 채우고 문장 경계에서 자름)
+CONTEXT_PACKING_ENABLED = True
+CONTEXT_TOKEN_BUDGET = 3000
+CONTEXT_DOC_MAX_TOKENS = 500  # 문서 하나가 쓸 수 있는 최대 토큰
+CONTEXT_MIN_DOC_TOKENS = 60  # 이보다 적게 남으면 문서를 넣지 않음
+
+# 프롬프트 캐시 친화 배치 (고정 지시문을 접두로, 참고자료는 식별자 순 정렬)
+PROMPT_CACHE_MODE = True
+
+# 후속 질문 검색 재사용 (세션별 직전 검색 결과)
+SESSION_RETRIEVAL_REUSE = True
+FOLLOWUP_CUES = [
+    "그 판례", "그 사례", "그 경우", "그 내용", "그럼", "그러면", "그건", "그거", "거기서",
+    "위에서", "앞에서", "방금", "말씀하신", "해당 판례", "더 자세히", "좀 더",
+]
+FOLLOWUP_MAX_CHARS = 40              # 지시어가 있고 이보다 짧으면 직전 문서 그대로 재사용
+FOLLOWUP_MIN_SIMILARITY = 0.4        # 단, 직전 질문과 이만큼은 비슷해야 함 (지시어만 있는 화제 전환 방지)
+FOLLOWUP_REUSE_SIMILARITY = 0.92     # 직전 질문과 거의 같은 질문이면 재사용
+FOLLOWUP_NARROW_SIMILARITY = 0.75    # 같은 주제면 변환 없이 좁은 검색만 보충
+FOLLOWUP_CONTEXT_TTL_SEC = 1800
+SESSION_RETRIEVAL_MAX_SESSIONS = 2000
+DOC_VECTOR_CACHE_SIZE = 20000        # 후속 질문 재정렬용 문서 벡터 캐시
+
+# 복잡도 기반 모델 라우팅 (간단한 질문은 빠른 티어로)
+MODEL_ROUTING_ENABLED = True
+FAST_MODEL = "gpt-4o-mini"
+FAST_MAX_TOKENS = 1200
+ROUTING_SIMPLE_MAX_CHARS = 30          # 이보다 긴 질문은 복잡도 +1
+ROUTING_SIMPLE_MAX_TERM_HITS = 2       # 용어 사전 매칭이 이보다 많으면 +1
+ROUTING_SIMPLE_MAX_DISTANCE = 0.6      # 최상위 검색 거리가 이보다 멀면(근거 약함) +1
+ROUTING_COMPLEX_MIN_PRECEDENTS = 3     # 판례가 이만큼 이상 걸리면 +1
+ROUTING_FAST_MAX_SCORE = 0             # 복잡도 점수가 이 이하면 빠른 티어
+ROUTING_LOG_PATH = "model_routing_log.jsonl"
+ROUTING_LOG_MAX_BYTES = 20 * 1024 * 1024  # 넘으면 .1, .2 ... 로 밀어냄
+ROUTING_LOG_BACKUPS = 3
+
+# 단계별 지연 추적 (전처리/임베딩/벡터 검색/점수/포맷/LLM 첫 토큰·전체를 스팬으로, OTLP/JSON 파일로 내보내기)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_EXPORT_PATH = "rag_traces.jsonl"
+TRACE_SERVICE_NAME = "switchon-rag"
+TRACE_FLUSH_INTERVAL_SEC = 1.0             # 끝난 스팬을 모아 백그라운드 스레드에서 트레이스별로 쓰는 주기
+TRACE_QUEUE_MAX_SPANS = 10000              # 쓰기가 밀려 이보다 쌓이면 새 스팬은 버림
+TRACE_EXPORT_MAX_BYTES = 100 * 1024 * 1024  # 넘으면 .1, .2 ... 로 밀어냄
+TRACE_EXPORT_BACKUPS = 3
+
+# LLM 호출 복원력 (타임아웃/재시도/헤징/서킷 브레이커)
+LLM_CLIENT_TIMEOUT_SEC = 60.0        # HTTP 클라이언트 타임아웃 (멈춘 연결 정리용)
+CHAT_FIRST_TOKEN_TIMEOUT_SEC = 20.0  # 답변 첫 토큰까지 제한 시간
+CONVERSION_TIMEOUT_SEC = 8.0         # 쿼리 변환 호출 제한 시간
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BASE_SEC = 0.5             # full jitter 백오프: uniform(0, min(MAX, BASE * 2^n))
+LLM_RETRY_MAX_SEC = 4.0
+LLM_HEDGE_ENABLED = True             # 최근 지연 p95가 지나면 같은 요청을 한 번 더 보냄
+LLM_HEDGE_PERCENTILE = 95
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_MIN_DELAY_SEC = 0.3
+BREAKER_FAILURE_THRESHOLD = 5        # 연속 실패 N회면 열림
+BREAKER_RECOVERY_SEC = 30.0
+LLM_CALL_THREADS = 32                # 첫 응답 대기/헤징 스레드 수 (다 차면 새 호출은 기다리지 않고 거절)
+
+# 요청 수용 제어 (임베딩/검색 CPU 작업과 LLM 호출의 동시 실행 수 제한, 세션별 공정 대기열)
+ADMISSION_ENABLED = True
+EMBED_POOL_CONCURRENCY = max(2, os.cpu_count() or 2)  # 동시에 검색(임베딩 + Chroma)하는 요청 수
+EMBED_POOL_MAX_QUEUE = 32
+LLM_POOL_CONCURRENCY = 16                             # 동시에 답변을 스트리밍하는 요청 수
+LLM_POOL_MAX_QUEUE = 64
+ADMISSION_QUEUE_TIMEOUT_SEC = 15.0                    # 대기열에서 이보다 오래 기다리면 거절
+ADMISSION_BUSY_MESSAGE = "⏳ 지금 질문이 몰려 답변을 드리기 어렵습니다. 잠시 후 다시 질문해 주세요."
+
+# 헤드리스 추론 서비스 (core/engine_server.py) - URL을 지정하면 Streamlit UI는 얇은 클라이언트로 동작
+ENGINE_SERVICE_URL = os.getenv("ENGINE_SERVICE_URL", "")  # 예: http://127.0.0.1:8700 (비우면 UI 프로세스 안에서 실행)
+ENGINE_REQUEST_TIMEOUT_SEC = 120.0    # 클라이언트가 다음 토큰을 기다리는 최대 시간
+# 서비스의 블로킹 작업 스레드 - 수용 제어 풀이 실행/대기시킬 수 있는 요청 수만큼 (+ 모델 로딩 등 여유)
+# 다 차면 실행기 큐에 쌓지 않고 바로 혼잡 응답
+ENGINE_EXECUTOR_THREADS = EMBED_POOL_CONCURRENCY + EMBED_POOL_MAX_QUEUE + LLM_POOL_CONCURRENCY + LLM_POOL_MAX_QUEUE + 4
+ENGINE_MAX_BODY_BYTES = 64 * 1024
+
+# 세션 대화 기록 백엔드 ("sqlite": 워커 간 공유 WAL 파일, "redis": Redis 호환 저장소, "memory": 프로세스 메모리)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_DB_PATH = "chat_sessions.sqlite3"
+SESSION_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_PERSIST_TTL_SEC = 7 * 24 * 3600  # 공유 백엔드의 유휴 세션 보관 기간
+
+# 메모리 세션 저장소 상한 (유휴 세션 정리 + LRU 축출)
+SESSION_IDLE_TTL_SEC = 3600
+SESSION_STORE_MAX_SESSIONS = 5000
+SESSION_STORE_MAX_BYTES = 64 * 1024 * 1024  # 메시지 본문 기준 추정치
+SESSION_SWEEP_INTERVAL_SEC = 60
+
+# 대화 기록 롤링 요약 압축 (오래된 턴은 요약 1개로, 최근 턴만 원문 유지)
+MEMORY_COMPACTION_ENABLED = True
+MEMORY_SUMMARY_MODEL = "gpt-4o-mini"
+MEMORY_SUMMARY_MAX_TOKENS = 400
+MEMORY_RECENT_TOKEN_BUDGET = 1500  # 원문으로 남길 최근 턴의 토큰 예산
+MEMORY_MIN_RECENT_MESSAGES = 2     # 예산을 넘어도 직전 1턴(질문+답변)은 유지
+MEMORY_MAX_RECENT_MESSAGES = 6
+MEMORY_MAX_MESSAGES = 20           # 압축이 밀렸을 때의 상한 (압축 미사용 시 기존 동작)
+
+# 사이드바 예시 질문 (답변을 미리 계산해 두는 고정 질문)
+EXAMPLE_QUESTIONS = [
+    "전세사기 당했을 때 대처방법은?",
+    "보증금을 돌려받을 수 있을까요?",
+    "임차권등기명령이란 무엇인가요?",
+    "집주인이 등기이전을 안 해줄 때 어떻게 하나요?",
+    "집이 경매로 넘어갔을 때 전세보증금은 어떻게 되나요?"
+]
+
+# 예시 질문 답변 캐시 설정 (인덱스/모델/프롬프트 버전이 바뀌면 백그라운드 재생성)
+WARM_ANSWERS_ENABLED = True
+ANSWER_CACHE_PATH = "warm_answers.json"
+ANSWER_PROMPT_VERSION = "v1"  # 답변 프롬프트를 바꾸면 올릴 것
+WARM_ANSWER_MAX_ATTEMPTS = 3         # 같은 버전에서 생성 실패한 질문을 다시 시도하는 최대 횟수
+WARM_ANSWER_RETRY_BASE_SEC = 300.0   # 재시도 간격 (실패할 때마다 두 배)
+
+# 답변 스트리밍 설정 (chain.stream으로 토큰 단위 표시, 첫 토큰/전체 지연 시간 표시)
+STREAMING_ENABLED = True
+
+# 채팅 렌더링 창 (말풍선 HTML은 메시지마다 한 번만 만들고, 다시 그릴 때는 최근 메시지 창만 표시)
+WINDOWED_CHAT_RENDER = True
+CHAT_VISIBLE_MESSAGES = 20  # 이보다 오래된 메시지는 "이전 대화 더 보기"로 펼침
+
+# 조각 단위 재실행 (채팅/상태 패널만 다시 실행, 0이면 기존처럼 매 턴 전체 스크립트 재실행 - 전후 비교용)
+FRAGMENT_RERUNS = os.getenv("FRAGMENT_RERUNS", "1") == "1"
+STATUS_REFRESH_SEC = 10  # 상태 패널만 주기적으로 갱신
+RUN_METRICS_LOG = True  # 턴마다 스크립트 실행 횟수와 CPU 시간 출력
+
+# 정적 파일 (tools/build_static_assets.py로 CSS와 광고 이미지를 내용 해시 파일명으로 미리 만들어 둠, 없으면 인라인 출력)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")  # Streamlit은 main.py 옆 static/만 제공
+STATIC_MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+STREAMLIT_STATIC_URL = "app/static"  # Streamlit 정적 파일 경로 - 이미지 외에는 text/plain + nosniff로 보내 CSS로 쓸 수 없음
+STATIC_BASE_URL = os.getenv("STATIC_BASE_URL", STREAMLIT_STATIC_URL)  # 예: http://127.0.0.1:8700/static (추론 서비스가 장기 캐시 헤더로 제공)
+STATIC_CACHE_MAX_AGE_SEC = 365 * 24 * 3600  # 해시 파일명은 내용이 바뀌면 이름도 바뀌므로 1년 캐시
+AD_IMAGE_SIZE = (228, 152)  # 광고 이미지 표시 크기(3cm x 2cm)의 2배 - 고해상도 화면 대응
+AD_IMAGE_QUALITY = 80
+
 # 화면 설정
 PAGE_TITLE = "AI 스위치온 - 판례 검색 시스템"
 PAGE_ICON = "🏠"
@@ -0,0 +1,82 @@
+"""
+헤드리스 추론 서비스(engine_server.py) HTTP 클라이언트 - Streamlit UI를 얇은 클라이언트로 만들 때 사용
+
+stream/invoke가 메모리 체인과 같은 형태라 main.py의 질문 처리 흐름을 그대로 씀
+"""
+import json
+
+import requests
+
+from admission_control import AdmissionRejected
+from config import ENGINE_SERVICE_URL, ENGINE_REQUEST_TIMEOUT_SEC, ADMISSION_BUSY_MESSAGE
+
+
+CONNECT_TIMEOUT_SEC = 5.0
+
+
+def iter_sse_events(response):
+    """SSE 응답을 (event, data) 단위로 - 도착하는 대로 읽도록 chunk_size=None"""
+    event = "message"
+    data_lines = []
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+        elif not line and data_lines:
+            yield event, json.loads("\n".join(data_lines))
+            event = "message"
+            data_lines = []
+
+
+class EngineClient:
+    """추론 서비스 클라이언트 (chain.stream / chain.invoke 대체)"""
+
+    def __init__(self, base_url=ENGINE_SERVICE_URL, timeout=ENGINE_REQUEST_TIMEOUT_SEC):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def health(self):
+        """서비스 상태 - 연결 실패 시 ready=False"""
+        try:
+            response = requests.get(f"{self.base_url}/health", timeout=CONNECT_TIMEOUT_SEC)
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            return {"status": "unreachable", "ready": False, "legal_db": False, "news_db": False, "error": str(e)}
+
+    def retrieve(self, question, session_id=None):
+        """참고자료 검색만 (답변 생성 없음)"""
+        response = requests.post(
+            f"{self.base_url}/retrieve",
+            json={"question": question, "session_id": session_id},
+            timeout=(CONNECT_TIMEOUT_SEC, self.timeout),
+        )
+        if response.status_code == 503 and response.json().get("error") == "busy":
+            raise AdmissionRejected(response.json().get("detail", ADMISSION_BUSY_MESSAGE))
+        response.raise_for_status()
+        return response.json()
+
+    def stream(self, inputs, config=None):
+        """답변 토큰 생성기 - 서비스가 혼잡하면 AdmissionRejected"""
+        session_id = ((config or {}).get("configurable") or {}).get("session_id")
+        with requests.post(
+            f"{self.base_url}/chat",
+            json={"question": inputs["question"], "session_id": session_id},
+            stream=True,
+            timeout=(CONNECT_TIMEOUT_SEC, self.timeout),
+        ) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            for event, data in iter_sse_events(response):
+                if event == "token":
+                    yield data["text"]
+                elif event == "done":
+                    return
+                elif event == "error":
+                    if data.get("code") == "busy":
+                        raise AdmissionRejected(data["message"])
+                    raise RuntimeError(data["message"])
+        raise ConnectionError("추론 서비스 응답이 완료 전에 끊겼습니다")
+
+    def invoke(self, inputs, config=None):
+        return "".join(self.stream(inputs, config))
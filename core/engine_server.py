@@ -0,0 +1,361 @@
+"""
+헤드리스 추론 서비스 (ASGI) - RAG 검색과 메모리 체인을 Streamlit UI와 분리해 실행
+
+엔드포인트:
+    GET  /health    준비 상태, DB 연결, 수용 제어 풀/세션 저장소 지표 (준비 전에는 503)
+    POST /retrieve  {"question", "session_id"?} → 참고자료, 검색 문서 id/단계별 시간, 라우팅 결정
+    POST /chat      {"question", "session_id"} → SSE 토큰 스트림 (event: token / done / error)
+    GET  /static/*  빌드된 CSS/광고 이미지 (tools/build_static_assets.py, 해시 파일명은 장기 캐시)
+
+실행 (워커 프로세스마다 임베딩 모델과 벡터 DB를 한 번씩 올림, 대화 기록은 SESSION_BACKEND로 공유):
+    uvicorn engine_server:app --host 0.0.0.0 --port 8700 --workers 4
+UI 연결:
+    ENGINE_SERVICE_URL=http://127.0.0.1:8700 STATIC_BASE_URL=http://127.0.0.1:8700/static streamlit run main.py
+"""
+# SQLite 호환성 설정
+__import__('pysqlite3')
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import asyncio
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    PROMPT_CACHE_MODE, WARM_ANSWERS_ENABLED, ADMISSION_BUSY_MESSAGE,
+    ENGINE_EXECUTOR_THREADS, ENGINE_MAX_BODY_BYTES, STATIC_DIR, STATIC_CACHE_MAX_AGE_SEC,
+)
+from database_utils import initialize_embeddings_and_databases, initialize_legal_shards, initialize_retrieval_pool
+from rag_system import OptimizedConditionalRAGSystem, optimized_retrieve_and_format
+from chat_chain import create_chat_chain_with_memory, get_session_history, finish_turn, session_store_gauges
+from answer_cache import WarmAnswerStore, make_answer_fn
+from model_router import extract_route_features, route_request
+from admission_control import AdmissionRejected, admission_metrics, admission_session
+
+
+mimetypes.add_type("image/webp", ".webp")
+
+# 검색/체인 호출은 블로킹이라 스레드에서 실행 (동시 실행 수는 수용 제어 풀이 제한)
+_executor = ThreadPoolExecutor(max_workers=ENGINE_EXECUTOR_THREADS, thread_name_prefix="engine")
+_executor_busy = 0  # 이벤트 루프에서만 읽고 씀
+
+
+def _run_blocking(fn, *args):
+    """스레드에서 실행 - 스레드가 모두 차 있으면 실행기 큐에 쌓지 않고 바로 AdmissionRejected"""
+    global _executor_busy
+    if _executor_busy >= ENGINE_EXECUTOR_THREADS:
+        raise AdmissionRejected(f"engine 스레드 가득 참 ({_executor_busy}개)")
+    _executor_busy += 1
+    future = asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+    def done(_):
+        global _executor_busy
+        _executor_busy -= 1
+
+    future.add_done_callback(done)
+    return future
+
+
+class BadRequest(ValueError):
+    """요청 본문이 잘못됨 (400)"""
+
+
+class InferenceEngine:
+    """워커 프로세스당 하나 - 임베딩 모델, 벡터 DB, 채팅 체인을 시작 시 한 번만 로드"""
+
+    def __init__(self):
+        self.state = "starting"
+        self.error = None
+        self.rag_system = None
+        self.chain = None
+        self.warm_store = None
+        self.legal_db = False
+        self.news_db = False
+
+    def load(self):
+        try:
+            embedding_model, legal_db, news_db, system_ready = initialize_embeddings_and_databases()
+            legal_shards = initialize_legal_shards() if system_ready else None
+            retrieval_pool = initialize_retrieval_pool() if system_ready else None
+            if not system_ready or not (legal_db or news_db or legal_shards):
+                raise RuntimeError("벡터 DB 초기화 실패")
+
+            self.rag_system = OptimizedConditionalRAGSystem(
+                legal_db, news_db, embedding_model, legal_shards, retrieval_pool
+            )
+            self.chain = create_chat_chain_with_memory(self.rag_system)
+            if WARM_ANSWERS_ENABLED:
+                self.warm_store = WarmAnswerStore()
+                if self.warm_store.is_stale():
+                    self.warm_store.refresh_in_background(make_answer_fn(self.rag_system))
+            self.legal_db = bool(legal_db or legal_shards)
+            self.news_db = bool(news_db)
+            self.state = "ready"
+            print("✅ 추론 서비스 준비 완료")
+        except Exception as e:
+            self.state = "error"
+            self.error = str(e)
+            print(f"❌ 추론 서비스 초기화 실패: {e}")
+
+    def retrieve(self, question, session_id=None):
+        """참고자료 검색 + 라우팅 결정 (답변 생성 없음)"""
+        trace = {}
+        with admission_session(session_id):
+            context = optimized_retrieve_and_format(
+                question, self.rag_system, order_by_id=PROMPT_CACHE_MODE, trace=trace, session_id=session_id
+            )
+        route = route_request(extract_route_features(question, trace))
+        return {
+            "context": context,
+            "search_type": trace.get("search_type"),
+            "doc_ids": trace.get("doc_ids", []),
+            "context_tokens": trace.get("context_tokens"),
+            "timings": {stage: round(seconds, 4) for stage, seconds in trace.get("timings", {}).items()},
+            "route": {"tier": route.tier, "model": route.model, "score": route.score, "reasons": list(route.reasons)},
+        }
+
+    def chat_tokens(self, question, session_id):
+        """답변 토큰 생성기 - 예시 질문은 미리 계산된 답변, 끝까지 받으면 대화 기록 정리"""
+        answer = self.warm_store.get(question) if self.warm_store is not None else None
+        if answer is not None:
+            history = get_session_history(session_id)
+            history.add_user_message(question)
+            history.add_ai_message(answer)
+            finish_turn(session_id)
+            yield answer
+            return
+
+        config = {"configurable": {"session_id": session_id}}
+        yield from self.chain.stream({"question": question}, config=config)
+        finish_turn(session_id)
+
+
+engine = InferenceEngine()
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_request(receive, require_session=False):
+    """JSON 본문 읽기 - (question, session_id)"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionResetError("클라이언트 연결 종료")
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if len(body) > ENGINE_MAX_BODY_BYTES:
+            raise BadRequest("요청 본문이 너무 큽니다")
+
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise BadRequest("JSON 본문이 아닙니다")
+    question = request.get("question") if isinstance(request, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        raise BadRequest("question이 필요합니다")
+    session_id = request.get("session_id")
+    if require_session and not session_id:
+        raise BadRequest("session_id가 필요합니다")
+    return question, session_id
+
+
+async def _iterate_in_thread(make_iterator, stop):
+    """블로킹 생성기를 스레드에서 돌리며 항목을 이벤트 루프로 전달 (stop이 켜지면 생성기를 닫음)"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def pump():
+        iterator = make_iterator()
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (False, item))
+            loop.call_soon_threadsafe(queue.put_nowait, (True, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (True, e))
+        finally:
+            iterator.close()  # 중간에 멈춰도 LLM 풀 자리 반납
+
+    _run_blocking(pump)
+    try:
+        while True:
+            done, item = await queue.get()
+            if done:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+async def _watch_disconnect(receive, stop, disconnected):
+    """본문을 다 읽은 뒤에는 연결 종료 알림만 옴 - 받으면 생성 중단"""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            stop.set()
+            return
+
+
+async def _health(send):
+    payload = {
+        "status": engine.state,
+        "ready": engine.state == "ready",
+        "legal_db": engine.legal_db,
+        "news_db": engine.news_db,
+        "error": engine.error,
+        "admission": admission_metrics(),
+        "sessions": session_store_gauges(),
+        "executor": {"threads": ENGINE_EXECUTOR_THREADS, "busy": _executor_busy},
+    }
+    await _send_json(send, 200 if payload["ready"] else 503, payload)
+
+
+async def _static(path, send):
+    """빌드된 정적 파일 - 내용 해시 파일명은 1년 immutable 캐시, 매니페스트는 매번 확인"""
+    filename = path[len("/static/"):]
+    static_root = os.path.realpath(STATIC_DIR)
+    file_path = os.path.realpath(os.path.join(static_root, filename))
+    if not file_path.startswith(static_root + os.sep) or not os.path.isfile(file_path):
+        await _send_json(send, 404, {"error": "not_found"})
+        return
+
+    with open(file_path, "rb") as f:
+        body = f.read()
+    content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    cache_control = "no-cache" if filename == "manifest.json" else f"public, max-age={STATIC_CACHE_MAX_AGE_SEC}, immutable"
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (b"cache-control", cache_control.encode()),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _retrieve(receive, send):
+    question, session_id = await _read_request(receive)
+    try:
+        result = await _run_blocking(engine.retrieve, question, session_id)
+    except AdmissionRejected as e:
+        await _send_json(send, 503, {"error": "busy", "message": ADMISSION_BUSY_MESSAGE, "detail": str(e)})
+        return
+    await _send_json(send, 200, result)
+
+
+async def _chat(receive, send):
+    question, session_id = await _read_request(receive, require_session=True)
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),  # 프록시 버퍼링 끄기
+        ],
+    })
+
+    stop = threading.Event()
+    disconnected = asyncio.Event()
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, stop, disconnected))
+    start_time = time.perf_counter()
+    ttft = None
+    try:
+        async for token in _iterate_in_thread(lambda: engine.chat_tokens(question, session_id), stop):
+            if disconnected.is_set():
+                return
+            if not token:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start_time
+            await send({"type": "http.response.body", "body": _sse("token", {"text": token}), "more_body": True})
+        final = _sse("done", {"ttft": ttft, "total": time.perf_counter() - start_time})
+    except AdmissionRejected as e:
+        print(f"⏳ 요청 거절: {e}")
+        final = _sse("error", {"code": "busy", "message": ADMISSION_BUSY_MESSAGE})
+    except Exception as e:
+        print(f"❌ 답변 생성 오류: {e}")
+        final = _sse("error", {"code": "error", "message": str(e)})
+    finally:
+        watcher.cancel()
+    if not disconnected.is_set():
+        await send({"type": "http.response.body", "body": final, "more_body": False})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # 모델 로딩은 오래 걸리므로 백그라운드에서 - 그동안 /health는 starting(503)
+            asyncio.get_running_loop().run_in_executor(_executor, engine.load)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+_ROUTES = {
+    ("GET", "/health"): _health,
+    ("POST", "/retrieve"): _retrieve,
+    ("POST", "/chat"): _chat,
+}
+
+
+async def app(scope, receive, send):
+    """ASGI 진입점"""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    # 정적 파일은 모델 로딩과 무관하게 바로 제공
+    if scope["method"] == "GET" and scope["path"].startswith("/static/"):
+        await _static(scope["path"], send)
+        return
+
+    handler = _ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        await _send_json(send, 404, {"error": "not_found"})
+        return
+    if handler is not _health and engine.state != "ready":
+        await _send_json(send, 503, {"error": engine.state, "message": engine.error or "추론 서비스 준비 중"})
+        return
+
+    try:
+        if handler is _health:
+            await handler(send)
+        else:
+            await handler(receive, send)
+    except BadRequest as e:
+        await _send_json(send, 400, {"error": "bad_request", "message": str(e)})
+    except ConnectionResetError:
+        pass
@@ -7,21 +7,25 @@ __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
+import time
 import uuid
 import streamlit as st
 
-# 모듈 임포트
-from config import PAGE_TITLE, PAGE_ICON
-from database_utils import initialize_embeddings_and_databases
+# 모듈 임포트 (임베딩 모델/벡터 DB/체인 모듈은 UI 프로세스 안에서 실행할 때만 불러옴 - 추론 서비스 사용 시 얇은 클라이언트)
+from config import (
+    PAGE_TITLE, PAGE_ICON, STREAMING_ENABLED, WARM_ANSWERS_ENABLED, ADMISSION_BUSY_MESSAGE, ENGINE_SERVICE_URL,
+    FRAGMENT_RERUNS, STATUS_REFRESH_SEC,
+)
 from styles import load_custom_css
-from rag_system import OptimizedConditionalRAGSystem
-from chat_chain import create_chat_chain_with_memory
+from admission_control import AdmissionRejected, admission_metrics
+from engine_client import EngineClient
 from ui_components import (
-    render_header, render_sidebar, render_system_status,
+    render_header, render_sidebar, render_sidebar_actions, render_system_status,
     render_service_info, render_disclaimer, render_chat_messages,
-    render_chat_input, render_footer
+    render_chat_input, render_footer, render_streaming_answer
 )
 from ads import display_ad_banner
+from fragments import fragment, track_run, start_turn, in_app_run
 
 
 def initialize_session_state():
@@ -32,6 +36,144 @@ def initialize_session_state():
         st.session_state.chat_history = []
 
 
+@st.cache_resource
+def get_engine_client():
+    """추론 서비스 클라이언트 (ENGINE_SERVICE_URL 지정 시)"""
+    return EngineClient(ENGINE_SERVICE_URL)
+
+
+@st.cache_resource
+def get_warm_answer_store():
+    """예시 질문 답변 저장소 (프로세스당 하나)"""
+    from answer_cache import WarmAnswerStore
+
+    return WarmAnswerStore()
+
+
+def serve_warm_answer(prompt, warm_store):
+    """미리 계산된 답변이 있으면 대화 기록과 메모리에 바로 추가"""
+    from chat_chain import get_session_history, finish_turn
+
+    start_time = time.perf_counter()
+    answer = warm_store.get(prompt)
+    if answer is None:
+        return False
+    
+    history = get_session_history(st.session_state.session_id)
+    history.add_user_message(prompt)
+    history.add_ai_message(answer)
+    finish_turn(st.session_state.session_id)
+    st.session_state.chat_history.append({
+        "role": "assistant",
+        "content": answer,
+        "metrics": {"ttft": None, "total": time.perf_counter() - start_time, "cached": True},
+    })
+    return True
+
+
+@fragment("status", run_every=STATUS_REFRESH_SEC)
+def status_panel(system_ready, legal_db, news_db, health=None):
+    """시스템 상태 패널 - 수용 제어 풀/세션 저장소 지표(추론 서비스 사용 시 /health)를 다시 읽어 표시
+
+    health: 전체 실행에서 이미 받은 /health 응답 - 전체 실행 중에는 재사용하고 주기 갱신 때만 다시 요청
+    """
+    if ENGINE_SERVICE_URL:
+        status = health if health is not None and in_app_run() else get_engine_client().health()
+        system_ready = status.get("ready", False)
+        legal_db, news_db = status.get("legal_db"), status.get("news_db")
+        admission, sessions = status.get("admission"), status.get("sessions")
+    else:
+        from chat_chain import session_store_gauges
+
+        admission, sessions = admission_metrics(), session_store_gauges()
+    render_system_status(system_ready, legal_db, news_db, admission, sessions)
+
+
+def answer_prompt(prompt, chain, warm_store):
+    """질문 한 턴 처리 - 답변(또는 안내 메시지)을 대화 기록에 추가"""
+    # 사용자 메시지 저장
+    st.session_state.chat_history.append({"role": "user", "content": prompt})
+    
+    if warm_store is not None and serve_warm_answer(prompt, warm_store):
+        return
+    
+    if chain is None:
+        st.session_state.chat_history.append({
+            "role": "assistant",
+            "content": "죄송합니다. AI 시스템이 아직 준비되지 않았습니다. 잠시 후 다시 시도해주세요."
+        })
+        return
+    
+    config = {"configurable": {"session_id": st.session_state.session_id}}
+    start_time = time.perf_counter()
+    
+    try:
+        if STREAMING_ENABLED:
+            # 답변을 기다리지 않고 토큰이 도착하는 대로 표시
+            render_chat_messages([{"role": "user", "content": prompt}])
+            response, metrics = render_streaming_answer(
+                chain.stream({"question": prompt}, config=config), start_time
+            )
+        else:
+            with st.spinner("🤖 AI가 판례를 검색하고 답변을 생성하고 있습니다..."):
+                response = chain.invoke({"question": prompt}, config=config)
+            metrics = {"ttft": None, "total": time.perf_counter() - start_time}
+        
+        st.session_state.chat_history.append({"role": "assistant", "content": response, "metrics": metrics})
+        # 다음 턴 입력 토큰을 줄이도록 오래된 턴은 백그라운드에서 요약 (추론 서비스는 서버에서 처리)
+        if not ENGINE_SERVICE_URL:
+            from chat_chain import finish_turn
+
+            finish_turn(st.session_state.session_id)
+    except AdmissionRejected as e:
+        # 요청이 몰려 대기열이 가득 찬 경우 - 오류 대신 혼잡 안내
+        print(f"⏳ 요청 거절: {e}")
+        st.session_state.chat_history.append({"role": "assistant", "content": ADMISSION_BUSY_MESSAGE})
+    except Exception as e:
+        error_message = f"죄송합니다. 답변 생성 중 오류가 발생했습니다: {str(e)}"
+        st.session_state.chat_history.append({"role": "assistant", "content": error_message})
+
+
+@fragment("chat")
+def chat_panel(chain, warm_store):
+    """채팅 영역 - 사이드바 버튼, 메시지 목록, 광고, 입력창, 답변 생성"""
+    # 사이드바 버튼 (이 조각이 사이드바에 그려서 눌러도 전체 앱을 다시 실행하지 않음)
+    render_sidebar_actions()
+
+    # 채팅 메시지 렌더링
+    render_chat_messages(st.session_state.chat_history)
+    
+    # 이번 턴 말풍선과 광고 자리 (입력창보다 위에 표시)
+    turn_slot = st.empty()
+    ad_slot = st.empty()
+
+    # 질문 입력 처리 (사이드바 예시 질문은 버튼에서 이미 턴 시작)
+    typed_prompt = render_chat_input()
+    if typed_prompt:
+        start_turn()
+    prompt = st.session_state.pop("sidebar_prompt", None) or typed_prompt
+
+    # 질문 처리
+    if prompt:
+        turn_start = len(st.session_state.chat_history)
+        with turn_slot.container():
+            answer_prompt(prompt, chain, warm_store)
+        
+        if not FRAGMENT_RERUNS:
+            # 답변 생성 후 페이지 새로고침
+            st.rerun()
+        
+        # 조각 모드에서는 다시 실행하지 않고 이번 턴만 최종 상태로 다시 그림
+        with turn_slot.container():
+            render_chat_messages(st.session_state.chat_history[turn_start:])
+
+    # AI 답변 후 광고 배너 표시
+    if st.session_state.chat_history and st.session_state.chat_history[-1]["role"] == "assistant":
+        with ad_slot.container():
+            display_ad_banner()
+
+
+@track_run("app")
 def main():
     """메인 애플리케이션 함수"""
     
@@ -49,31 +191,55 @@ def main():
     # 헤더 렌더링
     render_header()
 
-    # 시스템 초기화
-    with st.spinner("🔄 AI 시스템 초기화 중..."):
-        embedding_model, legal_db, news_db, system_ready = initialize_embeddings_and_databases()
-
     # 세션 상태 초기화
     initialize_session_state()
 
-    # RAG 시스템 및 채팅 체인 생성
-    if system_ready and (legal_db or news_db):
-        try:
-            rag_system = OptimizedConditionalRAGSystem(legal_db, news_db)
-            chain = create_chat_chain_with_memory(rag_system)
-        except Exception as e:
-            st.error(f"❌ RAG 시스템 오류: {str(e)}")
+    if ENGINE_SERVICE_URL:
+        # 검색/답변 생성은 추론 서비스(engine_server.py)에서 - UI는 모델을 올리지 않는 얇은 클라이언트
+        health = get_engine_client().health()
+        system_ready = health.get("ready", False)
+        legal_db, news_db = health.get("legal_db"), health.get("news_db")
+        chain = get_engine_client() if system_ready else None
+        rag_system = None
+    else:
+        from database_utils import initialize_embeddings_and_databases, initialize_legal_shards, initialize_retrieval_pool
+        from rag_system import OptimizedConditionalRAGSystem
+        from chat_chain import create_chat_chain_with_memory
+
+        # 시스템 초기화
+        with st.spinner("🔄 AI 시스템 초기화 중..."):
+            embedding_model, legal_db, news_db, system_ready = initialize_embeddings_and_databases()
+            legal_shards = initialize_legal_shards() if system_ready else None
+            retrieval_pool = initialize_retrieval_pool() if system_ready else None
+
+        # RAG 시스템 및 채팅 체인 생성
+        if system_ready and (legal_db or news_db or legal_shards):
+            try:
+                rag_system = OptimizedConditionalRAGSystem(
+                    legal_db, news_db, embedding_model, legal_shards, retrieval_pool
+                )
+                chain = create_chat_chain_with_memory(rag_system)
+            except Exception as e:
+                st.error(f"❌ RAG 시스템 오류: {str(e)}")
+                chain = None
+                rag_system = None
+        else:
             chain = None
             rag_system = None
-    else:
-        chain = None
-        rag_system = None
+        health = None
+
+    # 예시 질문 답변 캐시 (버전이 바뀌었으면 백그라운드 재생성, 추론 서비스 사용 시 서비스가 처리)
+    warm_store = get_warm_answer_store() if WARM_ANSWERS_ENABLED and not ENGINE_SERVICE_URL else None
+    if warm_store is not None and rag_system is not None and warm_store.is_stale():
+        from answer_cache import make_answer_fn
+
+        warm_store.refresh_in_background(make_answer_fn(rag_system))
 
-    # 사이드바 렌더링
+    # 사이드바 머리말 (버튼은 채팅 조각에서)
     render_sidebar()
     
-    # 시스템 상태 표시
-    render_system_status(system_ready, legal_db, news_db)
+    # 시스템 상태 표시 (조각 - 주기적으로 상태만 갱신)
+    status_panel(system_ready, legal_db, news_db, health)
     
     # 서비스 안내
     render_service_info()
@@ -81,19 +247,12 @@ def main():
     # 주의사항
     render_disclaimer()
 
-    # 채팅 메시지 렌더링
-    render_chat_messages(st.session_state.chat_history)
+    # 채팅 영역 (조각 - 질문을 보내면 이 부분만 다시 실행)
+    chat_panel(chain, warm_store)
     
-    # AI 답변 후 광고 배너 표시
-    if st.session_state.chat_history and st.session_state.chat_history[-1]["role"] == "assistant":
-        display_ad_banner()
+    # 푸터
+    render_footer()
 
-    # 질문 입력 처리
-    prompt = st.session_state.pop("sidebar_prompt", None)
-    if not prompt:
-        prompt = render_chat_input()
 
-    # 질문 처리
-    if prompt:
-        # 사용자 메시지 저장
-        st.session_state.chat_history.append({"role": "user", "content": prompt
+if __name__ == "__main__":
+    main()
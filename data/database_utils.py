@@ -7,7 +7,13 @@ import zipfile
 import streamlit as st
 from sentence_transformers import SentenceTransformer
 from langchain_chroma import Chroma
-from config import DATABASE_URLS, EMBEDDING_MODEL_NAME
+from config import (
+    DATABASE_URLS, EMBEDDING_MODEL_NAME, LEGAL_SHARD_ROOT, SHARD_TIMEOUT_SEC, RETRIEVAL_PROCESS_POOL, MMAP_INDEX_DIRS,
+)
+from shard_search import discover_shards, ShardedLegalSearcher
+from mmap_index import index_exists
+from retrieval_pool import RetrievalProcessPool
+from tracing import tracer
 
 
 @st.cache_resource
@@ -58,45 +64,84 @@ def download_and_extract_databases(verbose=True):
 
 @st.cache_resource
 def initialize_embeddings_and_databases():
-    """임베딩 모델과 벡터 DB 초기화"""
-    try:
-        # 1. 벡터 DB 다운로드
-        print("📥 벡터 DB 다운로드 중...")
-        download_success = download_and_extract_databases(verbose=False)
-        if not download_success:
+    """임베딩 모델과 벡터 DB 초기화 (단계별 스팬: 다운로드, 모델 로딩, DB 연결)"""
+    with tracer.span("init.embeddings_and_databases") as init_span:
+        try:
+            # 1. 벡터 DB 다운로드
+            print("📥 벡터 DB 다운로드 중...")
+            with tracer.span("init.download"):
+                download_success = download_and_extract_databases(verbose=False)
+            if not download_success:
+                init_span.set_attribute("init.ready", False)
+                return None, None, None, False
+            
+            # 2. 임베딩 모델 초기화
+            print("🔄 임베딩 모델 로딩 중...")
+            with tracer.span("init.embedding_model", {"init.model": EMBEDDING_MODEL_NAME}):
+                embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+            print("✅ 임베딩 모델 로딩 완료")
+            
+            # 3. Chroma DB 연결
+            legal_db = None
+            news_db = None
+            
+            with tracer.span("init.chroma") as span:
+                if os.path.exists("chroma_db_law_real_final"):
+                    try:
+                        legal_db = Chroma(
+                            persist_directory="chroma_db_law_real_final",
+                            embedding_function=embedding_model
+                        )
+                        print("✅ 법률 DB 연결 완료")
+                    except Exception as e:
+                        print(f"⚠️ 법률 DB 연결 실패: {e}")
+                
+                if os.path.exists("ja_chroma_db"):
+                    try:
+                        news_db = Chroma(
+                            persist_directory="ja_chroma_db",
+                            embedding_function=embedding_model
+                        )
+                        print("✅ 뉴스 DB 연결 완료")
+                    except Exception as e:
+                        print(f"⚠️ 뉴스 DB 연결 실패: {e}")
+                span.set_attributes({"init.legal_db": legal_db is not None, "init.news_db": news_db is not None})
+            
+            init_span.set_attribute("init.ready", True)
+            return embedding_model, legal_db, news_db, True
+            
+        except Exception as e:
+            print(f"❌ 초기화 실패: {e}")
+            init_span.record_error(e)
             return None, None, None, False
-        
-        # 2. 임베딩 모델 초기화
-        print("🔄 임베딩 모델 로딩 중...")
-        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        print("✅ 임베딩 모델 로딩 완료")
-        
-        # 3. Chroma DB 연결
-        legal_db = None
-        news_db = None
-        
-        if os.path.exists("chroma_db_law_real_final"):
-            try:
-                legal_db = Chroma(
-                    persist_directory="chroma_db_law_real_final",
-                    embedding_function=embedding_model
-                )
-                print("✅ 법률 DB 연결 완료")
-            except Exception as e:
-                print(f"⚠️ 법률 DB 연결 실패: {e}")
-        
-        if os.path.exists("ja_chroma_db"):
-            try:
-                news_db = Chroma(
-                    persist_directory="ja_chroma_db",
-                    embedding_function=embedding_model
-                )
-                print("✅ 뉴스 DB 연결 완료")
-            except Exception as e:
-                print(f"⚠️ 뉴스 DB 연결 실패: {e}")
-        
-        return embedding_model, legal_db, news_db, True
-        
+
+
+@st.cache_resource
+def initialize_legal_shards():
+    """샤딩된 법률 DB 워커 프로세스 기동 (샤드가 없으면 None)"""
+    shard_dirs = discover_shards(LEGAL_SHARD_ROOT)
+    if not shard_dirs:
+        return None
+
+    try:
+        print(f"🧩 법률 DB 샤드 {len(shard_dirs)}개 워커 기동 중...")
+        return ShardedLegalSearcher(shard_dirs, timeout=SHARD_TIMEOUT_SEC)
+    except Exception as e:
+        print(f"⚠️ 샤드 워커 기동 실패, 단일 법률 DB 사용: {e}")
+        return None
+
+
+@st.cache_resource
+def initialize_retrieval_pool():
+    """검색 프로세스 풀 기동 (꺼져 있거나 메모리 맵 인덱스가 없으면 None)"""
+    if not RETRIEVAL_PROCESS_POOL:
+        return None
+    if not any(index_exists(path) for path in MMAP_INDEX_DIRS.values()):
+        print("⚠️ 메모리 맵 인덱스가 없어 검색 프로세스 풀을 쓰지 않습니다 (tools/export_mmap_index.py로 생성)")
+        return None
+
+    try:
+        return RetrievalProcessPool(MMAP_INDEX_DIRS)
     except Exception as e:
-        print(f"❌ 초기화 실패: {e}")
-        return None, None, None, False
+        print(f"⚠️ 검색 프로세스 풀 기동 실패, 요청 스레드에서 검색: {e}")
+        return None
@@ -0,0 +1,12 @@
+"""
+도구 스크립트용 모듈 경로 설정 (core, data, AI, UI 모듈을 평면 import 할 수 있게 함)
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for _sub_dir in ("core", "data", "AI", "UI"):
+    _path = os.path.join(ROOT_DIR, _sub_dir)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,79 @@
+"""
+채팅 렌더링 비용 측정 - 대화 길이별로 한 번 다시 그릴 때 출력 요소 수, 전송 바이트, 시간 비교
+
+st.markdown/st.caption 호출을 기록하는 대체 객체로 render_chat_messages만 실행합니다.
+전체 다시 그리기(기존)는 대화 길이에 비례하고, 최근 메시지 창 렌더링은 길이와 무관하게 일정해야 합니다.
+
+사용법:
+    python tools/bench_chat_render.py --lengths 10,50,100,200,400
+"""
+import argparse
+import time
+
+import _bootstrap  # noqa: F401
+
+import ui_components
+
+
+class RecordingStreamlit:
+    """render_chat_messages가 쓰는 Streamlit API만 흉내 내며 출력량 기록"""
+
+    def __init__(self):
+        self.session_state = {}
+        self.elements = 0
+        self.bytes = 0
+
+    def markdown(self, body, unsafe_allow_html=False):
+        self.elements += 1
+        self.bytes += len(body.encode("utf-8"))
+
+    def caption(self, body):
+        self.markdown(body)
+
+    def button(self, label, **kwargs):
+        self.markdown(label)
+        return False
+
+
+def make_history(turns, answer_chars):
+    answer = ("임차권등기명령을 신청한 뒤 보증금 반환 소송을 진행할 수 있습니다. " * 40)[:answer_chars]
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"질문 {i}: 집주인이 보증금을 안 돌려줘요"})
+        history.append({"role": "assistant", "content": f"{answer} ({i})", "metrics": {"ttft": 0.8, "total": 6.2}})
+    return history
+
+
+def measure(history, windowed, reruns):
+    ui_components.WINDOWED_CHAT_RENDER = windowed
+    recorder = RecordingStreamlit()
+    ui_components.st = recorder
+    ui_components.render_chat_messages(history)  # 첫 렌더링 (말풍선 HTML 생성)
+
+    recorder.elements = recorder.bytes = 0
+    start_time = time.perf_counter()
+    for _ in range(reruns):
+        ui_components.render_chat_messages(history)
+    elapsed = (time.perf_counter() - start_time) / reruns
+    return recorder.elements // reruns, recorder.bytes // reruns, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 렌더링 비용 측정")
+    parser.add_argument("--lengths", default="10,50,100,200,400", help="대화 메시지 수 목록")
+    parser.add_argument("--answer-chars", type=int, default=1500)
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'메시지':>8}{'기존 요소':>10}{'기존 KB':>10}{'기존 ms':>10}{'창 요소':>10}{'창 KB':>10}{'창 ms':>10}")
+    for length in (int(n) for n in args.lengths.split(",")):
+        history = make_history(length // 2, args.answer_chars)
+        full = measure(history, False, args.reruns)
+        windowed = measure(history, True, args.reruns)
+        print(f"{length:>8}"
+              f"{full[0]:>10}{full[1] / 1024:>10.1f}{full[2] * 1000:>10.2f}"
+              f"{windowed[0]:>10}{windowed[1] / 1024:>10.1f}{windowed[2] * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
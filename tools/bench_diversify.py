@@ -0,0 +1,122 @@
+"""
+검색 결과 다양화 벤치마크 - 프롬프트 토큰 절감량과 원문 커버리지 비교
+
+사용법:
+    python tools/bench_diversify.py                      # 합성 데이터
+    python tools/bench_diversify.py --db chroma_db_law_real_final
+"""
+import argparse
+import time
+
+import _bootstrap  # noqa: F401
+import numpy as np
+from langchain_core.documents import Document
+
+from config import LEGAL_SEARCH_K, MMR_FETCH_K, MMR_LAMBDA, EMBEDDING_MODEL_NAME
+from diversifier import diversify_hits, get_dedup_key
+from document_formatter import format_docs_optimized
+from token_utils import count_tokens
+from vector_search import SearchHit, encode_queries, query_with_vectors
+
+
+BENCH_QUERIES = [
+    "전세사기 당했을 때 대처방법은?",
+    "임대인이 임대차보증금을 반환하지 않을 때",
+    "임차권등기명령 신청 요건",
+    "경매 시 임차인의 우선변제권",
+    "임대차계약 갱신요구권 행사",
+]
+
+
+def make_synthetic_hits(rng, num_cases=30, chunks_per_case=4, dim=768):
+    """같은 판례에서 나온 유사 청크가 상위를 차지하는 합성 검색 결과"""
+    query = rng.normal(size=dim).astype(np.float32)
+    hits = []
+    for case in range(num_cases):
+        # 앞쪽 판례일수록 쿼리와 가까움
+        center = query * (1.0 - case / num_cases) + rng.normal(size=dim).astype(np.float32)
+        for chunk in range(chunks_per_case):
+            vector = center + 0.05 * rng.normal(size=dim).astype(np.float32)
+            text = f"판례 {case} 청크 {chunk}: " + "임대인은 임대차보증금을 반환할 의무가 있다. " * 40
+            doc = Document(page_content=text, metadata={"case_id": f"2020다{1000 + case}"})
+            distance = float(1 - vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query)))
+            hits.append(SearchHit(doc=doc, distance=distance, vector=vector))
+    hits.sort(key=lambda h: h.distance)
+    return query, hits[:MMR_FETCH_K]
+
+
+def coverage(hits):
+    return len({get_dedup_key(h.doc) or id(h) for h in hits})
+
+
+def prompt_tokens(hits):
+    return count_tokens(format_docs_optimized([h.doc for h in hits], "legal_only"))
+
+
+def compare(query_vector, hits, k):
+    """상위 k개 그대로 vs 다양화 결과 비교"""
+    baseline = hits[:k]
+    start = time.perf_counter()
+    diversified = diversify_hits(query_vector, hits, k, MMR_LAMBDA)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # 다양화 결과와 같은 커버리지를 상위 k 방식으로 얻으려면 필요한 토큰
+    target = coverage(diversified)
+    needed = len(hits)
+    for n in range(k, len(hits) + 1):
+        if coverage(hits[:n]) >= target:
+            needed = n
+            break
+
+    return {
+        "baseline_tokens": prompt_tokens(baseline),
+        "baseline_coverage": coverage(baseline),
+        "diversified_tokens": prompt_tokens(diversified),
+        "diversified_coverage": target,
+        "equal_coverage_tokens": prompt_tokens(hits[:needed]),
+        "mmr_ms": elapsed_ms,
+    }
+
+
+def iter_real_cases(db_path):
+    from sentence_transformers import SentenceTransformer
+    from langchain_chroma import Chroma
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    db = Chroma(persist_directory=db_path, embedding_function=model)
+    vectors = encode_queries(model, BENCH_QUERIES)
+    for vector, hits in zip(vectors, query_with_vectors(db, vectors, MMR_FETCH_K)):
+        yield vector, hits
+
+
+def iter_synthetic_cases(seed):
+    rng = np.random.default_rng(seed)
+    for _ in BENCH_QUERIES:
+        yield make_synthetic_hits(rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 결과 다양화 토큰 절감 벤치마크")
+    parser.add_argument("--db", help="실제 Chroma DB 경로 (생략 시 합성 데이터)")
+    parser.add_argument("--k", type=int, default=LEGAL_SEARCH_K)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cases = iter_real_cases(args.db) if args.db else iter_synthetic_cases(args.seed)
+    results = [compare(query_vector, hits, args.k) for query_vector, hits in cases]
+
+    print(f"{'쿼리':<6}{'기존 토큰':>10}{'기존 원문':>10}{'다양화 토큰':>12}{'다양화 원문':>12}{'동일 커버리지 토큰':>18}{'MMR ms':>9}")
+    for i, r in enumerate(results):
+        print(f"{i + 1:<6}{r['baseline_tokens']:>10}{r['baseline_coverage']:>10}"
+              f"{r['diversified_tokens']:>12}{r['diversified_coverage']:>12}"
+              f"{r['equal_coverage_tokens']:>18}{r['mmr_ms']:>9.2f}")
+
+    saved = sum(r["equal_coverage_tokens"] - r["diversified_tokens"] for r in results)
+    total = sum(r["equal_coverage_tokens"] for r in results)
+    print(f"\n📉 동일 커버리지 기준 절감 토큰: {saved} / {total} ({saved / max(total, 1):.1%})")
+    print(f"📚 평균 원문 수: 기존 {np.mean([r['baseline_coverage'] for r in results]):.1f}"
+          f" → 다양화 {np.mean([r['diversified_coverage'] for r in results]):.1f}")
+
+
+if __name__ == "__main__":
+    main()
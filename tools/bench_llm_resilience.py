@@ -0,0 +1,78 @@
+"""
+LLM 복원력 계층 벤치마크 - 지연 꼬리/오류를 주입한 로컬 스텁 서버 대상으로
+기존 호출(타임아웃·재시도 없음)과 복원력 계층(타임아웃/재시도/헤징/브레이커)의 지연 분포 비교
+
+사용법:
+    python tools/openai_stub_server.py --quiet --ttft 0.3 --tokens-per-sec 0 --slow-rate 0.03 --slow-extra 5 --error-rate 0.02
+    python tools/bench_llm_resilience.py --requests 300 --concurrency 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _bootstrap  # noqa: F401
+
+
+def summarize(label, latencies, errors, wall_seconds):
+    values = sorted(latencies)
+
+    def pick(q):
+        return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+    print(f"{label:<10}{len(values):>6}{errors:>6}{pick(50):>9.3f}{pick(95):>9.3f}{pick(99):>9.3f}"
+          f"{(values[-1] if values else float('nan')):>9.3f}{len(values) / wall_seconds:>9.1f}")
+
+
+def run(label, call, requests, concurrency):
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            call()
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(requests)))
+    wall_seconds = time.perf_counter() - start
+    latencies = [latency for latency, error in results if error is None]
+    summarize(label, latencies, sum(1 for _, error in results if error is not None), wall_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 복원력 계층 벤치마크 (로컬 스텁 대상)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8089/v1")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=2.0, help="복원력 계층 호출 제한 시간(초)")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_BASE_URL"] = args.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "local-stub")
+
+    from langchain_openai import ChatOpenAI
+    from config import OPENAI_MODEL, LLM_CLIENT_TIMEOUT_SEC
+    from llm_resilience import ResilientLLMCaller
+
+    messages = [{"role": "user", "content": "임차권등기명령이란 무엇인가요?"}]
+    # 기존 설정 그대로 (타임아웃 없음, 클라이언트 기본 재시도)
+    plain_llm = ChatOpenAI(model=OPENAI_MODEL, base_url=args.base_url, max_tokens=20)
+    guarded_llm = ChatOpenAI(model=OPENAI_MODEL, base_url=args.base_url, max_tokens=20,
+                             timeout=LLM_CLIENT_TIMEOUT_SEC, max_retries=0)
+    caller = ResilientLLMCaller("bench", args.timeout)
+
+    print(f"🧪 {args.base_url} 대상 {args.requests}건, 동시성 {args.concurrency} (지연: 초)\n")
+    print(f"{'방식':<10}{'성공':>6}{'실패':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'건/초':>9}")
+    run("기존", lambda: plain_llm.invoke(messages), args.requests, args.concurrency)
+    run("복원력", lambda: caller.invoke(lambda: guarded_llm.invoke(messages)), args.requests, args.concurrency)
+
+    metrics = caller.metrics()
+    print(f"\n📊 복원력 계층: 재시도 {metrics['retries']}회, 헤지 {metrics['hedges_sent']}회 "
+          f"(헤지 승 {metrics['hedge_wins']}회), 타임아웃 {metrics['timeouts']}회, "
+          f"브레이커 거부 {metrics['rejected']}회, 상태 {metrics['breaker_state']}")
+
+
+if __name__ == "__main__":
+    main()
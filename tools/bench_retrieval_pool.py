@@ -0,0 +1,112 @@
+"""
+검색 프로세스 풀 벤치마크 - 요청 스레드 실행(GIL 공유) vs 워커 프로세스 실행의 처리량 비교
+
+같은 메모리 맵 인덱스와 같은 검색 단계(임베딩 → 점수 계산 → 융합 → MMR)를
+동시성 N으로 돌려 질문/초를 비교합니다. 프로세스 쪽은 코어 수에 맞춰 늘어나야 합니다.
+
+사용법:
+    python tools/bench_retrieval_pool.py --docs 100000 --workers 1,2,4,8
+    python tools/bench_retrieval_pool.py --index-dir chroma_db_law_real_final/mmap_index
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _bootstrap  # noqa: F401
+import numpy as np
+
+from config import EMBEDDING_MODEL_NAME, EXAMPLE_QUESTIONS, LEGAL_SEARCH_K
+from mmap_index import MmapVectorIndex, write_index
+from query_expansion import build_legal_query_variants
+from retrieval_pool import RetrievalProcessPool, search_index
+
+
+def build_synthetic_index(index_dir, num_docs, dim, seed=0, batch_size=10000):
+    """임의 벡터 인덱스 (판례 id는 3청크마다 하나 - 중복 제거 경로도 거치게)"""
+    rng = np.random.default_rng(seed)
+
+    def batches():
+        for start in range(0, num_docs, batch_size):
+            rows = range(start, min(start + batch_size, num_docs))
+            vectors = rng.normal(size=(len(rows), dim)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            yield (
+                [f"doc-{i}" for i in rows],
+                [f"합성 판례 본문 {i}" for i in rows],
+                [{"case_id": f"2020다{i // 3}"} for i in rows],
+                vectors,
+            )
+
+    return write_index(index_dir, batches())
+
+
+def make_queries(count):
+    base = [build_legal_query_variants(question) for question in EXAMPLE_QUESTIONS]
+    return [base[i % len(base)] for i in range(count)]
+
+
+def run_threads(model, index, queries, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start_time = time.perf_counter()
+        list(executor.map(lambda variants: search_index(model, index, variants, LEGAL_SEARCH_K), queries))
+        return time.perf_counter() - start_time
+
+
+def run_processes(pool, queries, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start_time = time.perf_counter()
+        list(executor.map(lambda variants: pool.search("bench", variants, LEGAL_SEARCH_K), queries))
+        return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 프로세스 풀 처리량 벤치마크")
+    parser.add_argument("--index-dir", help="기존 메모리 맵 인덱스 (없으면 합성 인덱스 생성)")
+    parser.add_argument("--docs", type=int, default=100000, help="합성 인덱스 문서 수")
+    parser.add_argument("--dim", type=int, default=768, help="합성 인덱스 차원 (임베딩 모델과 같아야 함)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--workers", default=None, help="비교할 동시성 목록 (예: 1,2,4,8, 기본: 코어 수까지 2배씩)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        levels = [int(n) for n in args.workers.split(",")]
+    else:
+        levels = [n for n in (1, 2, 4, 8, 16, 32, 64) if n < cores] + [cores]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_dir = args.index_dir
+        if index_dir is None:
+            index_dir = os.path.join(tmp_dir, "bench_index")
+            count = build_synthetic_index(index_dir, args.docs, args.dim)
+            print(f"🧪 합성 인덱스: 문서 {count}개 × {args.dim}차원")
+
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(args.model)
+        index = MmapVectorIndex(index_dir)
+        queries = make_queries(args.queries)
+        run_threads(model, index, queries[:4], 1)  # 워밍업
+
+        print(f"\n코어 {cores}개, 질문 {len(queries)}개 (질문당 변형 쿼리 포함)")
+        print(f"{'동시성':>6}{'스레드 q/s':>12}{'프로세스 q/s':>14}{'배율':>8}")
+        baseline = None
+        for level in levels:
+            thread_qps = len(queries) / run_threads(model, index, queries, level)
+
+            pool = RetrievalProcessPool({"bench": index_dir}, workers=level, model_name=args.model)
+            try:
+                run_processes(pool, queries[:level], level)  # 워커별 워밍업
+                process_qps = len(queries) / run_processes(pool, queries, level)
+            finally:
+                pool.close()
+
+            baseline = baseline or process_qps
+            print(f"{level:>6}{thread_qps:>12.1f}{process_qps:>14.1f}{process_qps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+용어 엔진 마이크로벤치마크 - 기존 반복 `in`/`str.replace` 방식 vs 단일 패스 자동자
+
+사용법:
+    python tools/bench_term_engine.py --repeat 20000
+"""
+import argparse
+import timeit
+
+import _bootstrap  # noqa: F401
+
+from config import TERM_MAPPING, LEGAL_INDICATORS, QUERY_EXPANSION_RULES, NEWS_EXPANSION_TRIGGERS
+from term_engine import get_term_engine
+
+
+BENCH_QUERIES = [
+    "집주인이 보증금을 안 줘요",
+    "전세금 돌려받으려면 소송 해야 하나요?",
+    "깡통전세 사기 당한 것 같은데 고소하고 싶어요",
+    "세입자인데 월세 계약서를 다시 써야 하나요",
+    "집이 경매로 넘어갔을 때 전세보증금은 어떻게 되나요?",
+    "임차권등기명령이란 무엇인가요?",
+]
+
+
+def legacy_process(query):
+    """기존 방식: 사전마다 따로 훑는 순차 처리"""
+    is_legal = any(term in query for term in LEGAL_INDICATORS)
+    converted = query
+    for common_term, legal_term in TERM_MAPPING.items():
+        if common_term in converted:
+            converted = converted.replace(common_term, legal_term)
+    triggers = [trigger for trigger in QUERY_EXPANSION_RULES if trigger in query]
+    news = any(term in query for term in NEWS_EXPANSION_TRIGGERS)
+    return is_legal, converted, triggers, news
+
+
+def engine_process(query, engine):
+    """자동자 방식: 한 번 스캔한 결과를 재사용"""
+    scan = engine.scan(query)
+    return scan.has_legal_indicator(), scan.replace_terms(), scan.expansion_triggers(), scan.has_news_trigger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="용어 엔진 마이크로벤치마크")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = get_term_engine()
+    build_ms = timeit.timeit(lambda: type(engine)(
+        TERM_MAPPING, LEGAL_INDICATORS, QUERY_EXPANSION_RULES, NEWS_EXPANSION_TRIGGERS
+    ), number=100) * 10
+    print(f"🔧 자동자 컴파일: {build_ms:.3f}ms (프로세스당 1회)\n")
+
+    print("🔁 치환 결과 비교 (기존 → 자동자)")
+    for query in BENCH_QUERIES:
+        legacy = legacy_process(query)[1]
+        engine_result = engine_process(query, engine)[1]
+        marker = "  " if legacy == engine_result else "≠ "
+        print(f"{marker}{query}\n     기존:   {legacy}\n     자동자: {engine_result}")
+
+    legacy_us = timeit.timeit(
+        lambda: [legacy_process(q) for q in BENCH_QUERIES], number=args.repeat
+    ) / (args.repeat * len(BENCH_QUERIES)) * 1e6
+    engine_us = timeit.timeit(
+        lambda: [engine_process(q, engine) for q in BENCH_QUERIES], number=args.repeat
+    ) / (args.repeat * len(BENCH_QUERIES)) * 1e6
+
+    print(f"\n⏱️ 쿼리당 평균: 기존 {legacy_us:.2f}µs, 자동자 {engine_us:.2f}µs ({legacy_us / engine_us:.2f}x)")
+
+    # 사전 크기에 따른 확장성 - 기존 방식은 용어 수에 비례, 자동자는 쿼리 길이에만 비례
+    print("\n📈 사전 크기별 쿼리당 평균 (합성 용어 추가)")
+    repeat = max(args.repeat // 10, 100)
+    for extra in (0, 300, 3000):
+        mapping = dict(TERM_MAPPING, **{f"합성용어{i}": f"법률용어{i}" for i in range(extra)})
+        indicators = LEGAL_INDICATORS + [f"지표어{i}" for i in range(extra)]
+        scaled_engine = type(engine)(mapping, indicators, QUERY_EXPANSION_RULES, NEWS_EXPANSION_TRIGGERS)
+
+        def legacy_scaled():
+            for query in BENCH_QUERIES:
+                any(term in query for term in indicators)
+                converted = query
+                for common_term, legal_term in mapping.items():
+                    if common_term in converted:
+                        converted = converted.replace(common_term, legal_term)
+
+        def engine_scaled():
+            for query in BENCH_QUERIES:
+                scan = scaled_engine.scan(query)
+                scan.has_legal_indicator()
+                scan.replace_terms()
+
+        per_query = 1e6 / (repeat * len(BENCH_QUERIES))
+        legacy_scaled_us = timeit.timeit(legacy_scaled, number=repeat) * per_query
+        engine_scaled_us = timeit.timeit(engine_scaled, number=repeat) * per_query
+        print(f"   용어 {len(mapping) + len(indicators):>5}개: 기존 {legacy_scaled_us:8.2f}µs, 자동자 {engine_scaled_us:6.2f}µs")
+
+
+if __name__ == "__main__":
+    main()
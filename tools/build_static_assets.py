@@ -0,0 +1,93 @@
+"""
+정적 파일 빌드 - 커스텀 CSS와 광고 이미지를 내용 해시 파일명으로 STATIC_DIR에 저장
+
+사용법:
+    python tools/build_static_assets.py
+    python tools/build_static_assets.py --skip-images      # CSS만
+
+CSS는 app.<해시>.css 파일 하나로, 광고 이미지는 빌드 시 내려받아 표시 크기(AD_IMAGE_SIZE)로 줄인 WebP로 저장하고
+manifest.json에 기록합니다. 앱은 매니페스트가 있으면 링크/로컬 이미지만 출력합니다 (CSS나 광고를 바꾸면 다시 실행 후 앱 재시작).
+이전 빌드 파일은 지우지 않으므로 실행 중인 앱이 보던 파일도 계속 제공됩니다.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+
+import _bootstrap  # noqa: F401
+
+import requests
+from PIL import Image, ImageOps
+
+from config import STATIC_DIR, STATIC_MANIFEST_PATH, AD_IMAGE_SIZE, AD_IMAGE_QUALITY
+from styles import CUSTOM_CSS
+from ads import ADS
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_hashed(prefix, suffix, data):
+    """해시 파일명으로 저장 (이미 있으면 그대로) - 파일명 반환"""
+    filename = f"{prefix}.{content_hash(data)}.{suffix}"
+    path = os.path.join(STATIC_DIR, filename)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return filename
+
+
+def build_css():
+    # 줄 앞뒤 공백과 빈 줄만 제거
+    lines = (line.strip() for line in CUSTOM_CSS.splitlines())
+    data = "\n".join(line for line in lines if line).encode("utf-8")
+    filename = write_hashed("app", "css", data)
+    inline_bytes = len(f"<style>{CUSTOM_CSS}</style>".encode("utf-8"))
+    print(f"🎨 CSS: {filename} ({len(data) / 1024:.1f}KB, 실행마다 출력하던 인라인 {inline_bytes / 1024:.1f}KB → 링크 태그)")
+    return filename
+
+
+def build_ad_image(source_url, timeout=15):
+    """원격 이미지를 내려받아 표시 크기로 잘라 줄인 WebP 저장 - 파일명 반환 (실패 시 None)"""
+    try:
+        response = requests.get(source_url, timeout=timeout)
+        response.raise_for_status()
+        image = Image.open(io.BytesIO(response.content)).convert("RGB")
+    except (requests.RequestException, OSError) as e:
+        print(f"⚠️ 이미지 내려받기 실패 (원격 URL 유지): {source_url[:60]}... {e}")
+        return None
+
+    # object-fit: cover와 같게 가운데를 잘라 맞춤
+    resized = ImageOps.fit(image, AD_IMAGE_SIZE, Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, format="WEBP", quality=AD_IMAGE_QUALITY, method=6)
+    filename = write_hashed("ad", "webp", buffer.getvalue())
+    print(f"🖼️ {filename}: {image.width}x{image.height} {len(response.content) / 1024:.1f}KB → "
+          f"{resized.width}x{resized.height} {buffer.tell() / 1024:.1f}KB")
+    return filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSS/광고 이미지 정적 파일 빌드")
+    parser.add_argument("--skip-images", action="store_true", help="광고 이미지는 빌드하지 않음 (원격 URL 사용)")
+    args = parser.parse_args()
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    manifest = {"css": build_css(), "images": {}}
+    if not args.skip_images:
+        for ad in ADS:
+            filename = build_ad_image(ad["img"])
+            if filename:
+                manifest["images"][ad["img"]] = filename
+
+    tmp_path = STATIC_MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATIC_MANIFEST_PATH)
+    print(f"✅ 매니페스트 저장: {STATIC_MANIFEST_PATH} (CSS 1개, 이미지 {len(manifest['images'])}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+대량 질의응답 실행기 - JSONL 질문 파일을 동시에 처리하고 처리량/지연 백분위를 출력
+
+입력 JSONL 한 줄: {"id": "q1", "question": "..."} (id는 생략 가능, 문자열 한 줄도 허용)
+출력 JSONL 한 줄: id, question, answer, doc_ids, search_type, timings(단계별 초), error
+
+사용법:
+    python tools/bulk_qa.py questions.jsonl -o answers.jsonl --concurrency 8
+    python tools/bulk_qa.py questions.jsonl --base-url http://127.0.0.1:8089/v1   # 로컬 스텁으로 오프라인 실행
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import _bootstrap  # noqa: F401
+
+
+STAGES = ("convert", "search", "format", "ttft", "generate", "total")
+
+
+def load_questions(path, limit=None):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            record.setdefault("id", str(line_no))
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def percentile(sorted_values, q):
+    """최근접 순위 백분위 (q: 0~100)"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def answer_one(record, rag_system, answer_chain, order_by_id, retrieval_only):
+    """질문 하나 처리 - 검색/포맷팅 단계 시간은 trace, 답변 생성은 스트리밍으로 TTFT 측정"""
+    from rag_system import optimized_retrieve_and_format
+    from model_router import extract_route_features, route_request
+    from admission_control import admission_session
+
+    trace = {}
+    result = {"id": record["id"], "question": record["question"], "answer": None, "error": None}
+    start_time = time.perf_counter()
+    try:
+        with admission_session(record["id"]):
+            context = optimized_retrieve_and_format(record["question"], rag_system, order_by_id=order_by_id, trace=trace)
+        timings = trace["timings"]
+        route = route_request(extract_route_features(record["question"], trace))
+        result["tier"] = route.tier
+
+        if not retrieval_only:
+            generate_start = time.perf_counter()
+            chunks = []
+            inputs = {"context": context, "question": record["question"], "chat_history": [], "route": route}
+            for chunk in answer_chain.stream(inputs):
+                if not chunks:
+                    timings["ttft"] = time.perf_counter() - generate_start
+                chunks.append(chunk)
+            timings["generate"] = time.perf_counter() - generate_start
+            result["answer"] = "".join(chunks)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    trace.setdefault("timings", {})["total"] = time.perf_counter() - start_time
+    result.update({
+        "doc_ids": trace.get("doc_ids", []),
+        "search_type": trace.get("search_type"),
+        "context_tokens": trace.get("context_tokens"),
+        "timings": {stage: round(seconds, 4) for stage, seconds in trace["timings"].items()},
+    })
+    return result
+
+
+def print_summary(results, wall_seconds, concurrency):
+    succeeded = [r for r in results if not r["error"]]
+    print(f"\n📊 처리 결과: {len(succeeded)}/{len(results)}건 성공, 동시성 {concurrency}, 총 {wall_seconds:.2f}초")
+    print(f"   처리량: {len(results) / max(wall_seconds, 1e-9):.2f} 질문/초")
+
+    print(f"\n   {'단계':<10}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (초)")
+    for stage in STAGES:
+        values = sorted(r["timings"][stage] for r in succeeded if stage in r["timings"])
+        if not values:
+            continue
+        row = "".join(f"{percentile(values, q):>9.3f}" for q in (50, 90, 95, 99, 100))
+        print(f"   {stage:<10}{row}")
+
+    tiers = {}
+    for r in succeeded:
+        if "ttft" in r["timings"]:
+            tiers.setdefault(r.get("tier"), []).append(r["timings"]["generate"])
+    for tier, values in sorted(tiers.items()):
+        values.sort()
+        print(f"   🧭 {tier} 티어: {len(values)}건, 생성 p50 {percentile(values, 50):.3f}초, p95 {percentile(values, 95):.3f}초")
+
+    from llm_resilience import llm_resilience_metrics
+    for metrics in llm_resilience_metrics():
+        print(f"   🛡️ {metrics['name']} LLM: 호출 {metrics['calls']}회, 재시도 {metrics['retries']}회, "
+              f"헤지 {metrics['hedges_sent']}회, 타임아웃 {metrics['timeouts']}회, "
+              f"브레이커 거부 {metrics['rejected']}회 ({metrics['breaker_state']})")
+
+    from admission_control import admission_metrics
+    for name, metrics in admission_metrics().items():
+        p95_wait = metrics["p95_wait"] or 0.0
+        print(f"   🚦 {name} 풀: 수용 {metrics['admitted']}건 (대기 {metrics['queued']}건, 대기 p95 {p95_wait:.3f}초), "
+              f"거절 {metrics['rejected'] + metrics['timed_out']}건")
+
+    errors = [r for r in results if r["error"]]
+    for r in errors[:5]:
+        print(f"❌ {r['id']}: {r['error']}")
+    if len(errors) > 5:
+        print(f"   ... 외 {len(errors) - 5}건")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대량 질의응답 실행기")
+    parser.add_argument("input", help="질문 JSONL 파일")
+    parser.add_argument("-o", "--output", default="bulk_qa_results.jsonl", help="결과 JSONL 파일")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 N개 질문만 실행")
+    parser.add_argument("--base-url", default=None, help="OpenAI 호환 엔드포인트 (예: 로컬 스텁 서버)")
+    parser.add_argument("--retrieval-only", action="store_true", help="답변 생성 없이 검색/포맷팅만 측정")
+    args = parser.parse_args()
+
+    # 설정 모듈이 import 시점에 환경 변수를 읽으므로 모듈 import 전에 지정
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "local-stub")
+
+    from config import PROMPT_CACHE_MODE
+    from chat_chain import create_answer_chain
+    from database_utils import initialize_embeddings_and_databases, initialize_legal_shards, initialize_retrieval_pool
+    from rag_system import OptimizedConditionalRAGSystem
+
+    records = load_questions(args.input, args.limit)
+    print(f"📝 질문 {len(records)}개 로드: {args.input}")
+
+    embedding_model, legal_db, news_db, system_ready = initialize_embeddings_and_databases()
+    if not system_ready:
+        raise SystemExit("❌ 벡터 DB 초기화 실패")
+    rag_system = OptimizedConditionalRAGSystem(
+        legal_db, news_db, embedding_model, initialize_legal_shards(), initialize_retrieval_pool()
+    )
+    answer_chain = None if args.retrieval_only else create_answer_chain()
+
+    results = []
+    start_time = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="bulk-qa") as executor:
+        futures = [
+            executor.submit(answer_one, record, rag_system, answer_chain, PROMPT_CACHE_MODE, args.retrieval_only)
+            for record in records
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            results.append(result)
+            status = "❌" if result["error"] else "✅"
+            print(f"{status} [{done}/{len(records)}] {result['id']} {result['timings']['total']:.2f}초")
+    wall_seconds = time.perf_counter() - start_time
+
+    print_summary(results, wall_seconds, args.concurrency)
+    print(f"\n💾 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+LLM 복원력 계층 동작 검증 (네트워크 없이 가짜 호출로 실행)
+
+1) 서킷 브레이커 half_open 시험 호출이 호출 스레드 포화로 보내지지 못해도 브레이커가 막히지 않는지
+   (포화 → LLMSaturatedError, 스레드가 비면 다음 호출이 시험 호출로 나가 브레이커가 닫히는지)
+
+사용법:
+    python tools/check_llm_resilience.py
+"""
+import threading
+import time
+
+import _bootstrap  # noqa: F401
+
+import llm_resilience
+from llm_resilience import CircuitBreaker, LLMSaturatedError, ResilientLLMCaller
+
+
+def check_saturated_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_sec=0.05)
+    caller = ResilientLLMCaller("check", timeout=1.0, max_retries=0, hedge=False, breaker=breaker)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.1)
+
+    # 호출 스레드를 모두 점유한 상태에서 시험 호출
+    held = 0
+    while llm_resilience._call_slots.acquire(blocking=False):
+        held += 1
+    try:
+        try:
+            caller.invoke(lambda: "ok")
+            raise AssertionError("포화 상태에서 호출이 실행됨")
+        except LLMSaturatedError:
+            pass
+        assert breaker.state == "half_open", breaker.state
+        assert not breaker._trial_in_flight, "포화로 보내지 못한 시험 호출 자리가 반납되지 않음"
+    finally:
+        for _ in range(held):
+            llm_resilience._call_slots.release()
+
+    assert caller.invoke(lambda: "ok") == "ok"
+    assert breaker.state == "closed", breaker.state
+    print(f"✅ half_open 시험 호출 포화 후 복구: 스레드 {held}개 점유 → 거절, 해제 후 시험 호출 성공, 브레이커 closed")
+
+
+def check_saturation_does_not_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_sec=30)
+    caller = ResilientLLMCaller("check", timeout=1.0, max_retries=2, hedge=False, breaker=breaker)
+    held = 0
+    while llm_resilience._call_slots.acquire(blocking=False):
+        held += 1
+    try:
+        for _ in range(3):
+            try:
+                caller.invoke(lambda: "ok")
+            except LLMSaturatedError:
+                pass
+    finally:
+        for _ in range(held):
+            llm_resilience._call_slots.release()
+    assert breaker.state == "closed", breaker.state
+    assert caller.counters["saturated"] == 3 and caller.counters["retries"] == 0, caller.counters
+    print("✅ 포화 거절은 재시도/브레이커 실패로 세지 않음")
+
+
+def main():
+    check_saturated_half_open_trial()
+    check_saturation_does_not_open_breaker()
+    # 다른 스레드에서 남은 호출이 없는지 (스레드 자리 누수 확인)
+    time.sleep(0.05)
+    free = 0
+    while llm_resilience._call_slots.acquire(blocking=False):
+        free += 1
+    for _ in range(free):
+        llm_resilience._call_slots.release()
+    assert free == llm_resilience.LLM_CALL_THREADS, free
+    print(f"✅ 호출 스레드 자리 {free}/{llm_resilience.LLM_CALL_THREADS}개 모두 반납됨 (활성 스레드 {threading.active_count()}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Chroma DB를 검색 프로세스 풀용 메모리 맵 인덱스로 내보내기
+
+사용법:
+    python tools/export_mmap_index.py                       # MMAP_INDEX_DIRS의 법률/뉴스 DB 모두
+    python tools/export_mmap_index.py --only legal --batch-size 2000
+
+DB가 바뀌면 다시 실행해야 합니다 (RETRIEVAL_PROCESS_POOL=1일 때 워커가 이 파일들을 mmap으로 공유).
+"""
+import argparse
+import os
+import time
+
+import _bootstrap  # noqa: F401
+
+from config import MMAP_INDEX_DIRS
+from mmap_index import write_index
+from reshard_legal_db import open_source_collection
+
+
+def iter_batches(collection, batch_size):
+    total = collection.count()
+    for offset in range(0, total, batch_size):
+        batch = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+        yield batch["ids"], batch["documents"], batch["metadatas"], batch["embeddings"]
+        print(f"   {min(offset + batch_size, total)}/{total} 처리")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma DB → 메모리 맵 인덱스 내보내기")
+    parser.add_argument("--only", choices=sorted(MMAP_INDEX_DIRS), help="하나의 인덱스만 내보내기")
+    parser.add_argument("--collection", help="원본 컬렉션 이름 (하나뿐이면 생략 가능)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, index_dir in MMAP_INDEX_DIRS.items():
+        if args.only and name != args.only:
+            continue
+        source_dir = os.path.dirname(index_dir)
+        if not os.path.isdir(source_dir):
+            print(f"⚠️ {name}: {source_dir} 없음 - 건너뜀")
+            continue
+
+        start_time = time.perf_counter()
+        collection = open_source_collection(source_dir, args.collection)
+        print(f"📦 {name}: 컬렉션 '{collection.name}' → {index_dir}")
+        count = write_index(index_dir, iter_batches(collection, args.batch_size))
+        size_mb = sum(os.path.getsize(os.path.join(index_dir, f)) for f in os.listdir(index_dir)) / 1024 / 1024
+        print(f"✅ {name}: 문서 {count}개, {size_mb:.1f}MB, {time.perf_counter() - start_time:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
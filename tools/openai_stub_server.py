@@ -0,0 +1,267 @@
+"""
+OpenAI 호환 로컬 스텁 서버 - 부하/지연 테스트용 (표준 라이브러리만 사용)
+
+앱에서 쓰는 채팅 완성 엔드포인트(/v1/chat/completions, 스트리밍 포함)를 흉내 내고
+첫 토큰 지연(TTFT), 초당 토큰 수, 오류/지연 꼬리 주입을 설정할 수 있습니다.
+쿼리 변환 요청("원래 질문:" 포함)에는 원래 질문을 그대로 돌려줍니다.
+
+사용법:
+    python tools/openai_stub_server.py --port 8089 --ttft 0.4 --tokens-per-sec 50
+    python tools/openai_stub_server.py --error-rate 0.05 --slow-rate 0.02 --slow-extra 5
+
+앱 연결:
+    LLM_STUB_ENABLED=1 streamlit run core/main.py
+    (또는 OPENAI_BASE_URL=http://127.0.0.1:8089/v1)
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import _bootstrap  # noqa: F401
+
+from token_utils import count_tokens
+
+
+STUB_ANSWER = (
+    "[질문 해석 안내] 질문하신 내용을 법률 용어로 바꾸면 '임대차 계약 종료 후 임차보증금 반환 청구'로 볼 수 있어요. "
+    "##### 🔹 **유사 판례 요약** 1. 임대인이 보증금을 반환하지 않은 사안에서 법원은 임차인의 반환 청구를 인정했습니다. "
+    "**[참고: 판례-000000]** "
+    "##### ✔️ **행동방침 제안** 1단계: 내용증명 발송 2단계: 임차권등기명령 신청 3단계: 보증금 반환 소송 제기 "
+    "###### ※ **유의사항** 임차권등기 전에 이사하면 대항력을 잃을 수 있으니 주의하세요. "
+)
+CONVERSION_PATTERN = re.compile(r"원래 질문:\s*(.+)")
+TOKEN_PATTERN = re.compile(r"\S+\s*")
+
+
+class StubBehavior:
+    """지연/오류 주입 설정과 요청 통계"""
+
+    def __init__(self, ttft, ttft_jitter, tokens_per_sec, answer_tokens,
+                 error_rate, error_status, drop_rate, slow_rate, slow_extra, seed=None):
+        self.ttft = ttft
+        self.ttft_jitter = ttft_jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.answer_tokens = answer_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.slow_rate = slow_rate
+        self.slow_extra = slow_extra
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self.counters = {"requests": 0, "streamed": 0, "errors": 0, "dropped": 0, "slow": 0}
+
+    def roll(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+    def first_token_delay(self):
+        with self._lock:
+            delay = self.ttft + self._random.uniform(-self.ttft_jitter, self.ttft_jitter)
+        if self.roll(self.slow_rate):
+            self.count("slow")
+            delay += self.slow_extra
+        return max(delay, 0.0)
+
+    def drop_position(self, num_tokens):
+        with self._lock:
+            return self._random.randrange(num_tokens)
+
+    def token_interval(self):
+        return 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def next_id(self):
+        return f"chatcmpl-stub-{next(self._ids)}"
+
+
+def build_reply_tokens(messages, max_tokens, answer_tokens):
+    """응답 토큰 목록 - 쿼리 변환 요청이면 원래 질문, 아니면 고정 답변을 원하는 길이로 반복"""
+    last_user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if isinstance(last_user, list):
+        last_user = " ".join(part.get("text", "") for part in last_user if isinstance(part, dict))
+
+    match = CONVERSION_PATTERN.search(last_user)
+    if match:
+        tokens = TOKEN_PATTERN.findall(match.group(1).strip())
+    else:
+        pieces = TOKEN_PATTERN.findall(STUB_ANSWER)
+        tokens = list(itertools.islice(itertools.cycle(pieces), answer_tokens))
+    if max_tokens:
+        tokens = tokens[:max_tokens]
+    return tokens
+
+
+def count_prompt_tokens(messages):
+    total = 0
+    for message in messages:
+        content = message.get("content") or ""
+        total += count_tokens(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)) + 4
+    return total
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    behavior = None
+    quiet = False
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _write_event(self, payload):
+        data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        self._write_chunk(f"data: {data}\n\n".encode("utf-8"))
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "local"}]})
+        elif self.path.rstrip("/") in ("", "/health"):
+            self._send_json(200, {"status": "ok", **self.behavior.counters})
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        behavior = self.behavior
+        behavior.count("requests")
+
+        if behavior.roll(behavior.error_rate):
+            behavior.count("errors")
+            status = behavior.error_status
+            headers = {"Retry-After": "1"} if status == 429 else None
+            self._send_json(status, {"error": {"message": "injected error", "type": "server_error", "code": status}}, headers)
+            return
+
+        messages = request.get("messages", [])
+        max_tokens = request.get("max_completion_tokens") or request.get("max_tokens")
+        tokens = build_reply_tokens(messages, max_tokens, behavior.answer_tokens)
+        usage = {
+            "prompt_tokens": count_prompt_tokens(messages),
+            "completion_tokens": len(tokens),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        response_id = behavior.next_id()
+        model = request.get("model", "stub")
+        created = int(time.time())
+
+        time.sleep(behavior.first_token_delay())
+
+        if not request.get("stream"):
+            time.sleep(behavior.token_interval() * max(len(tokens) - 1, 0))
+            self._send_json(200, {
+                "id": response_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        behavior.count("streamed")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": response_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        drop_at = behavior.drop_position(len(tokens)) if tokens and behavior.roll(behavior.drop_rate) else None
+        try:
+            self._write_event(chunk({"role": "assistant", "content": ""}))
+            interval = behavior.token_interval()
+            for i, token in enumerate(tokens):
+                if i == drop_at:
+                    # 스트림 도중 연결 끊김 재현
+                    behavior.count("dropped")
+                    self.close_connection = True
+                    return
+                if i:
+                    time.sleep(interval)
+                self._write_event(chunk({"content": token}))
+            self._write_event(chunk({}, "stop"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._write_event({
+                    "id": response_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": usage,
+                })
+            self._write_event("[DONE]")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 로컬 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft", type=float, default=0.4, help="첫 토큰까지 지연(초)")
+    parser.add_argument("--ttft-jitter", type=float, default=0.1, help="TTFT ± 무작위 편차(초)")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="토큰 생성 속도 (0이면 지연 없음)")
+    parser.add_argument("--answer-tokens", type=int, default=300, help="일반 답변 토큰 수")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류 응답 비율")
+    parser.add_argument("--error-status", type=int, default=500, help="주입할 오류 HTTP 상태 (429면 Retry-After 포함)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="스트리밍 도중 연결을 끊는 비율")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="지연 꼬리(추가 지연) 주입 비율")
+    parser.add_argument("--slow-extra", type=float, default=5.0, help="지연 꼬리 요청의 추가 지연(초)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true", help="요청 로그 출력 안 함")
+    args = parser.parse_args()
+
+    StubHandler.behavior = StubBehavior(
+        args.ttft, args.ttft_jitter, args.tokens_per_sec, args.answer_tokens,
+        args.error_rate, args.error_status, args.drop_rate, args.slow_rate, args.slow_extra, args.seed,
+    )
+    StubHandler.quiet = args.quiet
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"🧪 OpenAI 스텁 서버: http://{args.host}:{args.port}/v1 "
+          f"(TTFT {args.ttft}s, {args.tokens_per_sec} 토큰/초, 오류 {args.error_rate:.0%}, 지연 꼬리 {args.slow_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 요청 통계: {StubHandler.behavior.counters}")
+
+
+if __name__ == "__main__":
+    main()
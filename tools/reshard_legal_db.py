@@ -0,0 +1,130 @@
+"""
+기존 법률 Chroma DB를 여러 샤드로 재분할
+
+사용법:
+    python tools/reshard_legal_db.py chroma_db_law_real_final --by doc_class
+    python tools/reshard_legal_db.py chroma_db_law_real_final --by year --year-bucket 5
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+
+import _bootstrap  # noqa: F401
+import chromadb
+
+from config import LEGAL_SHARD_ROOT, LEGAL_SHARD_BY
+from document_formatter import classify_doc
+from shard_search import SHARD_MANIFEST
+
+
+YEAR_META_KEYS = ["선고일자", "decision_date", "date", "year", "case_id"]
+YEAR_PATTERN = re.compile(r"(19|20)\d{2}")
+
+
+def get_decision_year(meta):
+    """메타데이터에서 선고 연도 추출 (없으면 None)"""
+    for key in YEAR_META_KEYS:
+        match = YEAR_PATTERN.search(str(meta.get(key, "")))
+        if match:
+            return int(match.group(0))
+    return None
+
+
+def shard_key(meta, shard_by, year_bucket):
+    meta = meta or {}
+    if shard_by == "doc_class":
+        return classify_doc(meta)
+
+    year = get_decision_year(meta)
+    if year is None:
+        return "year_unknown"
+    start = year - year % year_bucket
+    return f"year_{start}" if year_bucket == 1 else f"year_{start}_{start + year_bucket - 1}"
+
+
+def open_source_collection(source_dir, collection_name):
+    client = chromadb.PersistentClient(path=source_dir)
+    if collection_name:
+        return client.get_collection(collection_name)
+
+    collections = client.list_collections()
+    if len(collections) != 1:
+        raise SystemExit(f"컬렉션이 {len(collections)}개입니다. --collection 으로 지정하세요.")
+    first = collections[0]
+    return client.get_collection(first if isinstance(first, str) else first.name)
+
+
+def reshard(source_dir, output_root, shard_by, year_bucket, collection_name, batch_size):
+    source = open_source_collection(source_dir, collection_name)
+    total = source.count()
+    print(f"📦 원본 컬렉션 '{source.name}': {total}개 문서")
+
+    if os.path.exists(output_root):
+        shutil.rmtree(output_root)
+    os.makedirs(output_root)
+
+    shard_collections = {}
+    shard_counts = {}
+
+    for offset in range(0, total, batch_size):
+        batch = source.get(
+            limit=batch_size,
+            offset=offset,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        grouped = {}
+        for doc_id, text, meta, embedding in zip(
+            batch["ids"], batch["documents"], batch["metadatas"], batch["embeddings"]
+        ):
+            key = shard_key(meta, shard_by, year_bucket)
+            group = grouped.setdefault(key, {"ids": [], "documents": [], "metadatas": [], "embeddings": []})
+            group["ids"].append(doc_id)
+            group["documents"].append(text)
+            group["metadatas"].append(dict(meta or {}, shard=key))
+            group["embeddings"].append(list(embedding))
+
+        for key, group in grouped.items():
+            if key not in shard_collections:
+                client = chromadb.PersistentClient(path=os.path.join(output_root, key))
+                shard_collections[key] = client.get_or_create_collection(
+                    source.name, metadata=source.metadata
+                )
+                shard_counts[key] = 0
+            shard_collections[key].add(**group)
+            shard_counts[key] += len(group["ids"])
+
+        print(f"   {min(offset + batch_size, total)}/{total} 처리")
+
+    for key, count in shard_counts.items():
+        manifest = {
+            "collection": source.name,
+            "shard_by": shard_by,
+            "key": key,
+            "count": count,
+            "source": os.path.abspath(source_dir),
+        }
+        with open(os.path.join(output_root, key, SHARD_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print("✅ 재분할 완료")
+    for key, count in sorted(shard_counts.items()):
+        print(f"   - {key}: {count}개")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="법률 Chroma DB 샤드 재분할")
+    parser.add_argument("source", help="원본 Chroma 디렉토리")
+    parser.add_argument("--output", default=LEGAL_SHARD_ROOT, help="샤드 루트 디렉토리 (기존 내용 삭제)")
+    parser.add_argument("--by", choices=["doc_class", "year"], default=LEGAL_SHARD_BY)
+    parser.add_argument("--year-bucket", type=int, default=1, help="연도 샤드 하나에 묶을 연도 수")
+    parser.add_argument("--collection", help="원본 컬렉션 이름 (하나뿐이면 생략 가능)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    reshard(args.source, args.output, args.by, args.year_bucket, args.collection, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
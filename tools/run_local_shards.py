@@ -0,0 +1,106 @@
+"""
+로컬 멀티 프로세스 샤드 검색 테스트 환경
+
+합성 벡터로 임시 샤드를 만들고 워커 프로세스를 띄운 뒤,
+1) scatter-gather 병합 결과가 전체 brute-force top-k와 같은지,
+2) 워커 하나를 멈췄을 때 샤드 타임아웃 안에 부분 결과가 반환되는지 확인합니다.
+
+사용법:
+    python tools/run_local_shards.py --shards 4 --docs 2000
+"""
+import argparse
+import json
+import os
+import signal
+import tempfile
+import time
+
+import _bootstrap  # noqa: F401
+import chromadb
+import numpy as np
+
+from shard_search import SHARD_MANIFEST, ShardedLegalSearcher, discover_shards
+
+
+COLLECTION_NAME = "langchain"
+
+
+def build_synthetic_shards(root, num_shards, num_docs, dim, rng):
+    """임의 벡터로 샤드 디렉토리 생성 - 전체 벡터 행렬 반환"""
+    vectors = rng.normal(size=(num_docs, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"doc-{i}" for i in range(num_docs)]
+
+    for shard in range(num_shards):
+        shard_dir = os.path.join(root, f"shard_{shard}")
+        members = list(range(shard, num_docs, num_shards))
+        client = chromadb.PersistentClient(path=shard_dir)
+        collection = client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+        collection.add(
+            ids=[ids[i] for i in members],
+            documents=[f"합성 판례 {i}" for i in members],
+            metadatas=[{"case_id": f"2020다{i}"} for i in members],
+            embeddings=vectors[members].tolist(),
+        )
+        with open(os.path.join(shard_dir, SHARD_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump({"collection": COLLECTION_NAME, "key": f"shard_{shard}", "count": len(members)}, f)
+
+    return ids, vectors
+
+
+def check_merge(searcher, ids, vectors, queries, k):
+    """scatter-gather 결과와 brute-force 정답 비교"""
+    start = time.perf_counter()
+    results = searcher.search(queries, k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    recalls = []
+    for query, hits in zip(queries, results):
+        expected = {ids[i] for i in np.argsort(-(vectors @ query))[:k]}
+        found = {hit.doc.id for hit in hits}
+        recalls.append(len(expected & found) / k)
+    print(f"🔎 병합 검증: 쿼리 {len(queries)}개, recall@{k} 평균 {np.mean(recalls):.3f}, {elapsed_ms:.1f}ms")
+
+
+def check_timeout(searcher, queries, k):
+    """워커 하나를 일시 정지시켜 샤드 타임아웃 동작 확인"""
+    shard_dir, process = next(iter(searcher.processes.items()))
+    os.kill(process.pid, signal.SIGSTOP)
+    try:
+        start = time.perf_counter()
+        results = searcher.search(queries[:1], k)
+        elapsed = time.perf_counter() - start
+    finally:
+        os.kill(process.pid, signal.SIGCONT)
+
+    shards_seen = {hit.doc.metadata.get("shard") for hit in results[0]}
+    print(f"⏱️ 타임아웃 검증: {os.path.basename(shard_dir)} 정지, {elapsed:.2f}초 후 반환 "
+          f"(타임아웃 {searcher.timeout:.2f}초), 응답 샤드 {sorted(shards_seen)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 샤드 scatter-gather 테스트")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as root:
+        ids, vectors = build_synthetic_shards(root, args.shards, args.docs, args.dim, rng)
+        queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        searcher = ShardedLegalSearcher(discover_shards(root), timeout=args.timeout)
+        try:
+            check_merge(searcher, ids, vectors, queries, args.k)
+            check_timeout(searcher, queries, args.k)
+        finally:
+            searcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+세션 저장소 소크 테스트 - 합성 세션 수만 개를 만들면서 RSS와 저장소 게이지 추적
+
+상한이 있는 저장소는 RSS가 평평해야 하고, --unbounded(기존 dict 방식)는 계속 늘어남
+
+사용법:
+    python tools/soak_session_store.py --sessions 50000
+    python tools/soak_session_store.py --sessions 50000 --unbounded
+"""
+import argparse
+import gc
+import os
+import resource
+import time
+import uuid
+
+import _bootstrap  # noqa: F401
+
+from session_store import SessionHistoryStore
+
+
+def current_rss_mb():
+    """현재 RSS (리눅스는 /proc, 그 외는 최대 RSS로 대체)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="세션 저장소 소크 테스트")
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--turns", type=int, default=2, help="세션당 질문/답변 턴 수")
+    parser.add_argument("--answer-chars", type=int, default=1500, help="합성 답변 길이(글자)")
+    parser.add_argument("--report-every", type=int, default=5000)
+    parser.add_argument("--unbounded", action="store_true", help="상한 없이 (기존 dict 방식과 같은 증가 확인)")
+    args = parser.parse_args()
+
+    if args.unbounded:
+        store = SessionHistoryStore(ttl=float("inf"), max_sessions=float("inf"), max_bytes=float("inf"))
+    else:
+        store = SessionHistoryStore()
+    answer = ("임차권등기명령 신청 후 보증금 반환 소송을 진행할 수 있습니다. " * 64)[:args.answer_chars]
+
+    print(f"🧪 합성 세션 {args.sessions}개 × {args.turns}턴 "
+          f"({'상한 없음' if args.unbounded else f'상한 {store.max_sessions}세션 / {store.max_bytes // 1024 // 1024}MB'})")
+    print(f"{'세션':>8}{'저장 세션':>10}{'추정 MB':>10}{'RSS MB':>10}{'LRU 축출':>10}")
+
+    start_rss = current_rss_mb()
+    start_time = time.perf_counter()
+    for i in range(1, args.sessions + 1):
+        session_id = str(uuid.uuid4())
+        for turn in range(args.turns):
+            history = store.get(session_id)
+            history.add_user_message(f"질문 {turn}: 집주인이 보증금을 안 돌려줘요 ({session_id[:8]})")
+            history.add_ai_message(answer + session_id)  # 세션마다 별도 문자열
+            store.refresh(session_id)
+
+        if i % args.report_every == 0:
+            gc.collect()
+            gauges = store.gauges()
+            print(f"{i:>8}{gauges['sessions']:>10}{gauges['approx_bytes'] / 1024 / 1024:>10.1f}"
+                  f"{current_rss_mb():>10.1f}{gauges['evicted_lru']:>10}")
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\n📊 RSS {start_rss:.1f}MB → {current_rss_mb():.1f}MB, {args.sessions / elapsed:.0f} 세션/초")
+
+
+if __name__ == "__main__":
+    main()
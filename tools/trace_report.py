@@ -0,0 +1,80 @@
+"""
+추적 파일(OTLP/JSON, TRACE_EXPORT_PATH) 단계별 지연 집계
+
+사용법:
+    python tools/trace_report.py                                   # 스팬 이름별 건수/오류/p50/p90/p95/p99/max
+    python tools/trace_report.py --by rag.conversion_method        # 속성 값별로 나눠 집계
+    python tools/trace_report.py --since 3600                      # 최근 1시간만
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+
+import _bootstrap  # noqa: F401
+
+from config import TRACE_EXPORT_PATH
+from bulk_qa import percentile
+
+
+def attribute_value(value):
+    """OTLP AnyValue → 파이썬 값"""
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [attribute_value(item) for item in value["arrayValue"].get("values", [])]
+    return None
+
+
+def iter_spans(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    yield from scope_spans.get("spans", [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추적 파일 단계별 지연 집계")
+    parser.add_argument("path", nargs="?", default=TRACE_EXPORT_PATH)
+    parser.add_argument("--by", help="이 속성 값별로 나눠 집계 (예: rag.search_type, llm.tier)")
+    parser.add_argument("--since", type=float, help="최근 N초 안에 시작한 스팬만")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ 추적 파일 없음: {args.path}")
+        return
+
+    since_ns = (time.time() - args.since) * 1e9 if args.since else 0
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    traces = set()
+    for span in iter_spans(args.path):
+        if int(span["startTimeUnixNano"]) < since_ns:
+            continue
+        attributes = {a["key"]: attribute_value(a["value"]) for a in span.get("attributes", [])}
+        key = span["name"]
+        if args.by:
+            key = f"{key} [{attributes.get(args.by, '-')}]"
+        durations[key].append((int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6)
+        if span.get("status", {}).get("code") == 2:
+            errors[key] += 1
+        traces.add(span["traceId"])
+
+    print(f"📊 스팬 {sum(len(v) for v in durations.values())}개, 트레이스 {len(traces)}개 ({args.path})")
+    width = max((len(key) for key in durations), default=10) + 2
+    print(f"\n   {'단계':<{width}}{'건수':>7}{'오류':>6}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for key in sorted(durations):
+        values = sorted(durations[key])
+        row = "".join(f"{percentile(values, q):>10.1f}" for q in (50, 90, 95, 99, 100))
+        print(f"   {key:<{width}}{len(values):>7}{errors[key]:>6}{row}")
+
+
+if __name__ == "__main__":
+    main()
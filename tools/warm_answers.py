@@ -0,0 +1,39 @@
+"""
+예시 질문 답변 사전 계산 (빌드/배포 시점 실행)
+
+사용법:
+    python tools/warm_answers.py           # 버전이 바뀐 경우에만 재생성
+    python tools/warm_answers.py --force
+"""
+import argparse
+
+import _bootstrap  # noqa: F401
+
+from answer_cache import WarmAnswerStore, make_answer_fn
+from database_utils import initialize_embeddings_and_databases, initialize_legal_shards, initialize_retrieval_pool
+from rag_system import OptimizedConditionalRAGSystem
+
+
+def main():
+    parser = argparse.ArgumentParser(description="예시 질문 답변 사전 계산")
+    parser.add_argument("--force", action="store_true", help="버전이 같아도 다시 생성")
+    args = parser.parse_args()
+
+    store = WarmAnswerStore()
+    if not args.force and not store.is_stale():
+        print(f"✅ 예시 답변이 최신 버전입니다 ({store.version})")
+        return
+
+    embedding_model, legal_db, news_db, system_ready = initialize_embeddings_and_databases()
+    if not system_ready:
+        raise SystemExit("❌ 벡터 DB 초기화 실패")
+
+    rag_system = OptimizedConditionalRAGSystem(
+        legal_db, news_db, embedding_model, initialize_legal_shards(), initialize_retrieval_pool()
+    )
+    answers = store.precompute(make_answer_fn(rag_system), force=args.force)
+    print(f"💾 {len(answers)}/{len(store.questions)}개 답변 저장 → {store.path} (버전 {store.version})")
+
+
+if __name__ == "__main__":
+    main()